@@ -0,0 +1,160 @@
+#! /usr/bin/env python3
+import datetime
+import heapq
+import threading
+import time
+
+
+class Clock:
+    """
+    The real clock. Anything that reads the time or sleeps takes one of these
+    (or uses the module clock), so that a VirtualClock can be swapped in.
+    """
+    virtual = False
+
+    @property
+    def scheduler(self):
+        """The timer scheduler that goes with the clock (None to use the default)."""
+        return None
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+    def perf_counter_ns(self):
+        return time.perf_counter_ns()
+
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+class VirtualTimer:
+    """
+    A timer on a VirtualClock, with the same interface as threading.Timer.
+    """
+
+    def __init__(self, clock, interval, function):
+        self.interval = interval
+        self.function = function
+        self._clock = clock
+        self._started = False
+        self._armed = False
+        self._cancelled = False
+
+    def start(self):
+        if self._started:
+            raise RuntimeError("timers can only be started once")
+        self._started = True
+        if not self._cancelled:
+            self._clock._arm(self)
+
+    def cancel(self):
+        self._cancelled = True
+        self._armed = False
+
+    def is_alive(self):
+        return self._armed
+
+
+class VirtualClock(Clock):
+    """
+    A clock that only moves when it is advanced (or slept on), starting from the
+    given time after the epoch. Timers made by the clock fire in order of their
+    deadlines as the clock is advanced past them, on the thread advancing it, with
+    the clock set to each deadline as it fires. If step is given, every reading of
+    the clock moves it on by that much, so that loops which spin until a time has
+    passed still finish (timers only fire on advance though).
+    """
+    virtual = True
+
+    def __init__(self, start=0.0, epoch=None, step=0.0):
+        self._now = start
+        self.epoch = datetime.datetime(2000, 1, 1) if epoch is None else epoch
+        """The wall clock time at 0 on the clock."""
+        self.step = step
+        self._timers = []  # heap of (deadline, order, timer)
+        self._order = 0
+        self._lock = threading.RLock()
+
+    @property
+    def scheduler(self):
+        return self
+
+    def _read(self):
+        with self._lock:
+            self._now += self.step
+            return self._now
+
+    def monotonic(self):
+        return self._read()
+
+    def perf_counter(self):
+        return self._read()
+
+    def perf_counter_ns(self):
+        return int(self._read() * 1e9)
+
+    def time(self):
+        return self.epoch.timestamp() + self._read()
+
+    def now(self):
+        return self.epoch + datetime.timedelta(seconds=self._read())
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def timer(self, length, callback):
+        return VirtualTimer(self, length, callback)
+
+    def _arm(self, timer):
+        with self._lock:
+            timer._armed = True
+            heapq.heappush(self._timers, (self._now + timer.interval, self._order, timer))
+            self._order += 1
+
+    @property
+    def pending(self):
+        """The number of timers waiting to fire."""
+        with self._lock:
+            return len([t for _, _, t in self._timers if t._armed])
+
+    def advance(self, seconds):
+        """
+        Moves the clock on, firing any timers that become due on the way.
+        """
+        with self._lock:
+            target = self._now + seconds
+        while True:
+            with self._lock:
+                if len(self._timers) == 0 or self._timers[0][0] > target:
+                    self._now = max(self._now, target)
+                    return
+                deadline, _, timer = heapq.heappop(self._timers)
+                if not timer._armed:
+                    continue
+                self._now = max(self._now, deadline)
+                timer._armed = False
+            timer.function()
+
+
+_clock = Clock()
+
+
+def use_clock(clock):
+    """
+    Sets the clock used by anything not given its own (None for the real clock).
+    """
+    global _clock
+    _clock = Clock() if clock is None else clock
+
+
+def get_clock():
+    return _clock
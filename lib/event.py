@@ -1,10 +1,89 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+import time
+import weakref
+
+_profiling = False
+_registry = weakref.WeakSet()
+
+
+def enable_profiling(enabled=True):
+    """
+    Turns profiling on or off for every event that hasn't been set either way itself.
+    """
+    global _profiling
+    _profiling = enabled
+
+
+def events():
+    """
+    Gets every event that is still alive.
+    """
+    return list(_registry)
+
+
+def profile_report():
+    """
+    Gets the profile of every event whose handlers have been called while profiled,
+    one line per handler (times in ms).
+    """
+    lines = []
+    for ev in sorted(events(), key=lambda e: e.name):
+        stats = ev.stats()
+        if len(stats) == 0:
+            continue
+        lines.append("{}:".format(ev.name))
+        for name, st in sorted(stats.items(), key=lambda i: -i[1].total):
+            lines.append("  {}".format(st))
+    return "\n".join(lines)
+
+
+def reset_profiles():
+    for ev in events():
+        ev.reset_stats()
+
+
+class HandlerStats:
+    __slots__ = ["name", "calls", "total", "max", "errors"]
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0
+        """The total time spent in the handler (seconds)."""
+        self.max = 0
+        self.errors = 0
+        """The number of calls that raised."""
+
+    @property
+    def mean(self):
+        if self.calls == 0:
+            return 0
+        return self.total / self.calls
+
+    def record(self, duration, failed):
+        self.calls += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if failed:
+            self.errors += 1
+
+    def __repr__(self):
+        return "{}: calls={} total={:.3f} mean={:.3f} max={:.3f} errors={}".format(
+            self.name, self.calls, self.total * 1000, self.mean * 1000, self.max * 1000,
+            self.errors)
+
+
 class EventException(Exception):
     def __init__(self, funcex, msg=None):
         self._message = msg if msg is not None else "One or more exceptions occured while firing the event"
         self._exc = funcex
     
     def __repr__(self):
-        return "{} (Function exceptions: {})".format(self._message, ",".join(self._exc))
+        return "{} (Function exceptions: {})".format(self._message, ",".join(repr(e) for e in self._exc))
 
 class Event:
     """
@@ -15,17 +94,39 @@ class Event:
     event -= func OR event.unbind(func)
     When the event is raised, all the arguments passed are passed
     straight to the functions that are called. 
+    Handlers can also be run off the firing thread, either on an executor
+    (fire_in) or an asyncio loop (fire_async), and a handler can be bound
+    as always deferred or always inline whichever way the event is fired.
+    When profiled, the calls, time taken and exceptions of each handler are
+    counted, and every event can be reported on through profile_report.
     """
     
-    def __init__(self):
+    def __init__(self, executor=None, name=None, profile=None):
         self._event_funcs = {}
+        self._deferred = {}
+        self.executor = executor
+        """The executor that fire runs deferred handlers on (None runs them inline)."""
+        self.name = "event {:x}".format(id(self)) if name is None else name
+        self.profile = profile
+        """Whether to profile the handlers (None follows enable_profiling)."""
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        _registry.add(self)
 
-    def bind(self, func):
+    def bind(self, func, deferred=None):
+        """
+        Binds the function to the event. If deferred is True, the function is always
+        run off the firing thread (by fire too, when the event has an executor), if it
+        is False it is always run on the firing thread, and if None it follows the way
+        the event is fired.
+        """
         assert callable(func)
         hsh = str(hash(func))
         if hsh in self._event_funcs.keys():
             raise KeyError("Function {} already registered to event".format(func.__name__))
         self._event_funcs[hsh] = func
+        if deferred is not None:
+            self._deferred[hsh] = deferred
 
     def unbind(self, func):
         assert callable(func)
@@ -33,6 +134,7 @@ class Event:
         if hsh not in self._event_funcs.keys():
             raise KeyError("Function {} not registered to event".format(func.__name__))
         del self._event_funcs[hsh]
+        self._deferred.pop(hsh, None)
     
     def __iadd__(self, func):
         self.bind(func)
@@ -42,16 +144,167 @@ class Event:
         self.unbind(func)
         return self
     
+    def _split(self, deferring):
+        """
+        Splits the functions into those to run inline and those to defer.
+        """
+        inline = []
+        deferred = []
+        for hsh, f in list(self._event_funcs.items()):
+            if self._deferred.get(hsh, deferring):
+                deferred.append(f)
+            else:
+                inline.append(f)
+        return inline, deferred
+
+    @property
+    def profiling(self):
+        return _profiling if self.profile is None else self.profile
+
+    def _record(self, func, duration, failed):
+        # keyed the same way as the bound functions, so that handlers sharing a
+        # name (lambdas, or a method bound on several instances) are kept apart
+        hsh = str(hash(func))
+        with self._stats_lock:
+            st = self._stats.get(hsh)
+            if st is None:
+                st = self._stats[hsh] = HandlerStats(getattr(func, "__qualname__", repr(func)))
+            st.record(duration, failed)
+
+    def _call(self, func, *args, **kwargs):
+        if not self.profiling:
+            return func(*args, **kwargs)
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._record(func, time.perf_counter() - start, failed)
+
+    async def _await(self, func, *args, **kwargs):
+        if not self.profiling:
+            return await func(*args, **kwargs)
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._record(func, time.perf_counter() - start, failed)
+
+    def stats(self):
+        """
+        Gets the HandlerStats of each profiled handler, keyed the same way as the
+        bound functions (the stats are named after the handler).
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def handler_stats(self, func):
+        """
+        Gets the HandlerStats of the given handler (None if it hasn't been profiled).
+        """
+        with self._stats_lock:
+            return self._stats.get(str(hash(func)))
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {}
+
+    def _call_all(self, funcs, args, kwargs, results, exc):
+        for f in funcs:
+            try:
+                results.append(self._call(f, *args, **kwargs))
+            except Exception as ex:
+                exc.append(ex)
+
     def fire(self, *args, **kwargs):
         """
         Fires the event and calls each function with the
         variables in args and kwargs.
+        Functions bound as deferred are submitted to the event's executor
+        (if it has one), and their futures are returned.
         """
+        inline, deferred = self._split(False)
+        if self.executor is None:
+            inline += deferred
+            deferred = []
         exc = []
-        for f in self._event_funcs.values():
-            try:
-                f(*args, **kwargs)
-            except Exception as ex:
-                exc.append(ex)
+        self._call_all(inline, args, kwargs, [], exc)
+        futures = [self.executor.submit(self._call, f, *args, **kwargs) for f in deferred]
         if len(exc) > 0:
             raise EventException(exc)
+        return futures
+
+    def fire_in(self, executor, *args, **kwargs):
+        """
+        Fires the event, running the functions on the executor (apart from those
+        bound as inline, which are run straight away). Returns a future for the
+        list of results, which fails with an EventException if any function raised.
+        """
+        inline, deferred = self._split(True)
+        results = []
+        exc = []
+        self._call_all(inline, args, kwargs, results, exc)
+        futures = [executor.submit(self._call, f, *args, **kwargs) for f in deferred]
+        out = concurrent.futures.Future()
+        if len(futures) == 0:
+            _set_outcome(out, results, exc)
+            return out
+        lock = threading.Lock()
+        left = [len(futures)]
+
+        def done(_):
+            with lock:
+                left[0] -= 1
+                if left[0] > 0:
+                    return
+            for f in futures:
+                if f.exception() is not None:
+                    exc.append(f.exception())
+                else:
+                    results.append(f.result())
+            _set_outcome(out, results, exc)
+        for f in futures:
+            f.add_done_callback(done)
+        return out
+
+    async def fire_async(self, *args, **kwargs):
+        """
+        Fires the event from a coroutine. Coroutine functions are awaited, and other
+        functions are run in the event's executor (or the loop's default one),
+        apart from those bound as inline, which are run straight away. Returns the
+        list of results, raising an EventException if any function raised.
+        """
+        loop = asyncio.get_running_loop()
+        inline, deferred = self._split(True)
+        results = []
+        exc = []
+        self._call_all([f for f in inline if not asyncio.iscoroutinefunction(f)],
+                       args, kwargs, results, exc)
+        waits = [self._await(f, *args, **kwargs)
+                 for f in inline if asyncio.iscoroutinefunction(f)]
+        for f in deferred:
+            if asyncio.iscoroutinefunction(f):
+                waits.append(self._await(f, *args, **kwargs))
+            else:
+                waits.append(loop.run_in_executor(
+                    self.executor, functools.partial(self._call, f, *args, **kwargs)))
+        for r in await asyncio.gather(*waits, return_exceptions=True):
+            if isinstance(r, Exception):
+                exc.append(r)
+            else:
+                results.append(r)
+        if len(exc) > 0:
+            raise EventException(exc)
+        return results
+
+
+def _set_outcome(future, results, exc):
+    if len(exc) > 0:
+        future.set_exception(EventException(exc))
+    else:
+        future.set_result(results)
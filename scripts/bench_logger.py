@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+# Benchmarks the cost of log calls for disabled levels, both on their own and
+# in the keypad scan loop (run against the simulated hardware with no settle
+# waits, so that the loop's own overhead is what gets measured), and the cost of
+# recording the disabled levels into a trace buffer instead.
+# Run from the scripts folder: python3 bench_logger.py [seconds]
+import os
+import sys
+import threading
+import time
+import types
+sys.path.append("../src")
+sys.path.append("../lib")
+
+import sim_gpio
+sim_gpio.install()
+
+import gpio_wrapper
+import interface_wrapper
+import logger
+from scan_scheduler import ScanScheduler
+
+BENCH_TIME = 2
+CALLS = 1000000
+
+
+def eager(log):
+    """
+    Puts the log methods back to always checking the level, as they did before
+    disabled levels were rebound.
+    """
+    for name in ["logt", "logd", "log", "logw"]:
+        setattr(log, name, types.MethodType(getattr(logger.Logger, name), log))
+
+
+def bench_calls(log):
+    start = time.perf_counter()
+    for i in range(CALLS):
+        log.logt("state readings: {:b}", i)
+    return (time.perf_counter() - start) / CALLS
+
+
+def bench_loop(log, seconds):
+    sim_gpio.reset(propagation_delay=0, switch_delay=0, bounce_time=0)
+    iface = interface_wrapper.InterfaceWrapper(log, scheduler=ScanScheduler(1e9))
+    timer = threading.Timer(seconds, lambda: setattr(iface, "_run_loop", False))
+    timer.start()
+    start = time.perf_counter()
+    iface.main_loop()
+    duration = time.perf_counter() - start
+    cycles = iface.stats.cycles
+    iface.cleanup()
+    return duration / cycles
+
+
+def run(seconds):
+    gpio_wrapper.HARDWARE_WAIT = 0
+    log = logger.Logger(os.devnull)
+    log.trace_level = logger.INFO
+    rebound_call = bench_calls(log)
+    rebound_loop = bench_loop(log, seconds)
+    log.trace_buffer = logger.TraceBuffer()
+    buffered_call = bench_calls(log)
+    buffered_loop = bench_loop(log, seconds)
+    log.trace_buffer = None
+    eager(log)
+    eager_call = bench_calls(log)
+    eager_loop = bench_loop(log, seconds)
+    log.cleanup()
+
+    print("disabled logt call:  {:.0f} ns (was {:.0f} ns)".format(
+        rebound_call * 1e9, eager_call * 1e9))
+    print("scan cycle:          {:.2f} us (was {:.2f} us)".format(
+        rebound_loop * 1e6, eager_loop * 1e6))
+    print("buffered logt call:  {:.0f} ns, scan cycle: {:.2f} us".format(
+        buffered_call * 1e9, buffered_loop * 1e6))
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else BENCH_TIME)
@@ -0,0 +1,68 @@
+#! /usr/bin/env python3
+# Benchmarks the keypad scan loop against the simulated hardware.
+# Run from the scripts folder: python3 bench_scan.py [seconds]
+import os
+import sys
+import threading
+import time
+sys.path.append("../src")
+sys.path.append("../lib")
+
+import sim_gpio
+sim_gpio.install()
+
+import interface_wrapper
+import logger
+
+BENCH_TIME = 5
+PRESS_KEYS = ["1", "5", "9", "0"]
+PRESS_HOLD = 0.2
+
+
+def run(seconds):
+    sim = sim_gpio.reset()
+    iface = interface_wrapper.InterfaceWrapper(logger.Logger(os.devnull))
+    latencies = []
+    pressed_at = [None]
+
+    def received(digit):
+        if pressed_at[0] is not None:
+            latencies.append(time.monotonic() - pressed_at[0])
+            pressed_at[0] = None
+    iface.digit_received.bind(received)
+
+    def presser():
+        end = time.monotonic() + seconds
+        i = 0
+        while time.monotonic() < end:
+            pressed_at[0] = time.monotonic()
+            sim.press(PRESS_KEYS[i % len(PRESS_KEYS)])
+            time.sleep(PRESS_HOLD)
+            sim.release()
+            time.sleep(PRESS_HOLD)
+            i += 1
+        iface._run_loop = False
+    thread = threading.Thread(target=presser)
+
+    start = time.monotonic()
+    thread.start()
+    iface.main_loop()
+    duration = time.monotonic() - start
+    thread.join()
+    iface.cleanup()
+
+    print("scan cycles:     {}".format(sim.latch_count))
+    print("cycles/second:   {:.1f}".format(sim.latch_count / duration))
+    print("gpio calls:      {}".format(sim.gpio_calls))
+    if latencies:
+        latencies.sort()
+        print("keys detected:   {}".format(len(latencies)))
+        print("latency median:  {:.1f} ms".format(
+            latencies[len(latencies) // 2] * 1000))
+        print("latency max:     {:.1f} ms".format(latencies[-1] * 1000))
+    else:
+        print("no keys detected")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else BENCH_TIME)
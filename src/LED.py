@@ -9,6 +9,7 @@ LED_GPIO = [
     20,
     26
 ]
+LED_STEP = 0.12 # set_leds turns on one LED for every 12% of the timeout
 
 def setup_leds():
     GPIO.setmode(GPIO.BCM)
@@ -29,3 +30,10 @@ def set_leds(percent):
             on_LED -= 1
         else:
             GPIO.output(LED_GPIO[i], False)
+
+
+def change_points():
+    """
+    :return: the fractions of the timeout at which set_leds turns on another LED
+    """
+    return [LED_STEP * (i + 1) for i in range(len(LED_GPIO)) if LED_STEP * (i + 1) < 1]
@@ -0,0 +1,220 @@
+#! /usr/bin/env python3
+import asyncio
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from key_dispatch import DigitDispatcher, KeyEvent
+from timeout import use_timer_scheduler
+
+
+def _report_errors(func):
+    def call():
+        try:
+            func()
+        except Exception:
+            traceback.print_exc()
+    return call
+
+
+def _on_loop(loop):
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class AsyncTimer:
+    """
+    A timer run by an event loop's call_later, with the same interface as
+    threading.Timer. It can be started and cancelled from any thread. The function
+    is called in the executor if given (so that it can block without holding up the
+    loop), or else on the loop.
+    """
+
+    def __init__(self, loop, interval, function, executor=None):
+        self.loop = loop
+        self.interval = interval
+        self.function = function
+        self.executor = executor
+        self._handle = None
+        self._started = False
+        self._finished = False
+        self._cancelled = False
+
+    def _call(self, func):
+        if _on_loop(self.loop):
+            func()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(func)
+
+    def start(self):
+        if self._started:
+            raise RuntimeError("timers can only be started once")
+        self._started = True
+        self._call(self._schedule)
+
+    def _schedule(self):
+        if not self._cancelled:
+            self._handle = self.loop.call_later(self.interval, self._run)
+
+    def _run(self):
+        self._finished = True
+        if self.executor is None:
+            self.function()
+        else:
+            self.loop.run_in_executor(self.executor, _report_errors(self.function))
+
+    def cancel(self):
+        self._cancelled = True
+        if self._handle is not None:
+            self._call(self._handle.cancel)
+
+    def is_alive(self):
+        return self._started and not self._finished and not self._cancelled
+
+
+class AsyncTimerScheduler:
+    """
+    Gives timeouts AsyncTimers on the loop instead of a thread each, calling the
+    timeout handlers in the executor if given.
+    """
+
+    def __init__(self, loop, executor=None):
+        self.loop = loop
+        self.executor = executor
+
+    def timer(self, length, callback):
+        return AsyncTimer(self.loop, length, callback, self.executor)
+
+
+class LoopDispatcher(DigitDispatcher):
+    """
+    Hands the digits found by the scan cycle over to the handler executor, so that
+    the handlers run in order with the timeout handlers and without blocking the
+    loop (or over to the loop itself if no executor is given).
+    """
+
+    def __init__(self, event, loop, logger=None, tracer=None, executor=None):
+        super().__init__(event, logger, tracer=tracer)
+        self.loop = loop
+        self.executor = executor
+
+    def start(self):
+        pass
+
+    def push(self, digit, trace=None):
+        key = KeyEvent(digit, time.perf_counter(), trace)
+        try:
+            if self.executor is not None:
+                self.executor.submit(self._deliver, key)
+            elif self.loop.is_closed():
+                raise RuntimeError("loop closed")
+            else:
+                self.loop.call_soon_threadsafe(self._deliver, key)
+        except RuntimeError:  # shut down
+            self.dropped += 1
+            return False
+        return True
+
+    def stop(self, timeout=1):
+        pass
+
+
+class AsyncRuntime:
+    """
+    Runs the lock on a single asyncio event loop instead of a thread per timeout.
+    The scan cycles are paced with asyncio sleeps and run in a one worker executor
+    (so the blocking GPIO calls and settle waits stay in order and off the loop),
+    and the timeouts become call_later handles. The digit and timeout handlers do
+    file and GPIO I/O too, so they are run in a second one worker executor, which
+    keeps them in order with each other without holding up the scan or the loop.
+    install must be called before any timeouts are created.
+    """
+
+    def __init__(self, logger, loop=None):
+        self.logger = logger
+        self.loop = asyncio.new_event_loop() if loop is None else loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan")
+        """Runs the blocking work (the scan cycles and anything passed to run_blocking)."""
+        self.handler_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="handlers")
+        """Runs the digit and timeout handlers."""
+        self._running = False
+
+    def install(self):
+        """
+        Makes new timeouts run on the loop.
+        """
+        use_timer_scheduler(AsyncTimerScheduler(self.loop, self.handler_executor))
+
+    def attach(self, iface):
+        """
+        Makes the interface wrapper deliver its digits through the handler executor.
+        """
+        if iface.dispatcher is not None:
+            iface.dispatcher.stop()
+        iface.dispatcher = LoopDispatcher(
+            iface.digit_received, self.loop, self.logger, iface.tracer,
+            self.handler_executor)
+
+    async def run_blocking(self, func, *args):
+        """
+        Runs a blocking function in the executor and waits for its result.
+        """
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def scan_loop(self, target):
+        """
+        Runs the scan cycles of the target (an InterfaceWrapper or LockController)
+        until stopped, paced by its scheduler.
+        """
+        self.logger.log("Async main loop started")
+        target.scheduler.start()
+        try:
+            while self._running:
+                changed, delay = target.scheduler.advance()
+                if changed:
+                    self.logger.logd("no key activity, dropped to idle scan rate")
+                await asyncio.sleep(delay)
+                target.scheduler.woke()
+                await self.run_blocking(target.scan_cycle)
+        except Exception as ex:
+            self.logger.loge(ex)
+
+    def run(self, target):
+        """
+        Runs the loop until stopped or interrupted.
+        """
+        self._running = True
+        asyncio.set_event_loop(self.loop)
+        task = self.loop.create_task(self.scan_loop(target))
+        try:
+            self.loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            self.logger.log("Beginning shutdown")
+            self._running = False
+            if task.done():  # the interrupt ended the task itself
+                if not task.cancelled():
+                    task.exception()  # already dealt with, so don't report it
+                return
+            try:
+                self.loop.run_until_complete(task)  # finish the current cycle
+            except KeyboardInterrupt:
+                pass
+
+    def stop(self):
+        """
+        Stops the scan loop after its current cycle (safe from any thread).
+        """
+        self._running = False
+
+    def cleanup(self):
+        """
+        Stops the loop and executors, and puts new timeouts back on the shared timer wheel.
+        """
+        self._running = False
+        use_timer_scheduler(None)
+        self.executor.shutdown(wait=True)
+        self.handler_executor.shutdown(wait=True)
+        if not self.loop.is_running() and not self.loop.is_closed():
+            self.loop.close()
@@ -1,9 +1,11 @@
 #! /usr/bin/env python3
 import datetime
-import time
+import gzip
 import os
 from timeout import *
+from clock import get_clock
 import subprocess
+from log_rotate import RotatingFile
 
 pi_leds_available = True
 _pi_leds_import_error = None
@@ -17,6 +19,7 @@ DIGIT_TIMEOUT_LENGTH = 3
 PWORD_FILE = "password.txt"
 ACCESS_LOG_FILE = "access_log.csv"
 GNUPLOT_FILE = "gnuplot_data.csv"
+GRAPH_FILE = "access_times_graph.jpg"
 DEFAULT_PWORD = "1234"
 IMMEDIATE_REJECT = True
 TIME_LOCKOUT_BEGIN = datetime.time(0, 0)  # hour, minute
@@ -27,9 +30,24 @@ MAX_ATTEMPTS = 5
 PRINT_MSGS = True
 
 
+def access_log_time(line):
+    """
+    The timestamp of an access log line (for the age of a rotated access log).
+    """
+    return datetime.datetime.strptime(line.split(",")[1], "%Y-%m-%dT%H:%M:%S").timestamp()
+
+
 class CodeLock:
-    def __init__(self, iface, logger, stdout, DEMO_MODE=False):
+    def __init__(self, iface, logger, stdout, DEMO_MODE=False, pword_file=None,
+                 access_log_file=None, gnuplot_file=None, clock=None,
+                 access_log_rotation=None, graph_file=None):
         self.DEMO_MODE = DEMO_MODE
+        self.clock = get_clock() if clock is None else clock
+        """The clock used for the timeouts and timestamps."""
+        self.pword_file = PWORD_FILE if pword_file is None else pword_file
+        self.access_log_file = ACCESS_LOG_FILE if access_log_file is None else access_log_file
+        self.gnuplot_file = GNUPLOT_FILE if gnuplot_file is None else gnuplot_file
+        self.graph_file = GRAPH_FILE if graph_file is None else graph_file
         self.iface = iface  # store interface wrapper
         self.logger = logger  # store logger
         self.stdout = stdout  # store standard output
@@ -40,38 +58,45 @@ class CodeLock:
         # bind to digit recevied event
         self.iface.digit_received.bind(self.digit_received_handler)
         self._digit_timeout_time = None
-        self.digit_timeout = Timeout(0.1)  # the digit timeout
+        # the digit timeout, with a progress point wherever the LED bar changes
+        self.digit_timeout = ProgressTimeout(
+            DIGIT_TIMEOUT_LENGTH, pi_leds.change_points() if pi_leds_available else [],
+            clock=self.clock)
         self.digit_timeout.elapsed.bind(self.digit_timeout_elapsed)
+        self.digit_timeout.progress.bind(self.digit_timeout_progress)
 
         self.password = []  # password store
-        if os.path.isfile(PWORD_FILE):  # file exists, read and use
-            with open(PWORD_FILE) as f:
+        if os.path.isfile(self.pword_file):  # file exists, read and use
+            with open(self.pword_file) as f:
                 self.password = f.read().strip()  # reads and cleans up
             self.logger.log("password read as {}", self.password)
         else:
             self.password = DEFAULT_PWORD  # use default password
             self.logger.log("password defaulted to {}", self.password)
-            with open(PWORD_FILE, "w") as f:
+            with open(self.pword_file, "w") as f:
                 f.write(self.password)  # write new password.txt
-            self.logger.log("wrote new password file to {}", PWORD_FILE)
+            self.logger.log("wrote new password file to {}", self.pword_file)
 
-        self.access_log = open(ACCESS_LOG_FILE, "a+")
+        if access_log_rotation is None:
+            self.access_log = open(self.access_log_file, "a+")
+        else:  # a dict of RotatingFile arguments
+            self.access_log = RotatingFile(self.access_log_file, "a+", clock=self.clock,
+                                           started=access_log_time, **access_log_rotation)
         self.access_log_append("startup", None)
 
         self.current_input = []  # current digit input
         self.locked_out = False  # whether the user is locked out
-        # the locked out timeout (supposed to go from 59-0, but should output
-        # each second)
-        self.locked_timeout = Timeout(1)
+        # the locked out timeout, ticking each second from 59-0
+        self.locked_timeout = PeriodicTimeout(1, LOCKED_OUT_TIME, clock=self.clock)
         self.locked_timeout.elapsed.bind(self.locked_timeout_elapsed)
         self.incorrect_attempts = 0  # the number of incorrect attempts
         self.locked_time_left = 0  # the amount of time left for the user to be locked out
         self.ignore_digits = False
-        self.correct_clear_timeout = Timeout(3)
+        self.correct_clear_timeout = Timeout(3, clock=self.clock)
         self.correct_clear_timeout.elapsed.bind(self.clear_timeout_elapsed)
-        self.incorrect_clear_timeout = Timeout(1)
+        self.incorrect_clear_timeout = Timeout(1, clock=self.clock)
         self.incorrect_clear_timeout.elapsed.bind(self.clear_timeout_elapsed)
-        self.cover_digit_timeout = Timeout(1)
+        self.cover_digit_timeout = Timeout(1, clock=self.clock)
         self.cover_digit_timeout.elapsed.bind(self.cover_digit_timeout_elapsed)
 
         if pi_leds_available:
@@ -85,7 +110,21 @@ class CodeLock:
 
     def access_log_append(self, event_name, success):
         self.access_log.write(
-            "{},{:%Y-%m-%dT%H:%M:%S},{}\n".format(event_name, datetime.datetime.now(), success))
+            "{},{:%Y-%m-%dT%H:%M:%S},{}\n".format(event_name, self.clock.now(), success))
+
+    def access_log_lines(self):
+        """
+        Reads the lines of the access log, starting from its oldest rotated segment
+        (if it is rotated), so that a run split across a rotation is read in full.
+        """
+        paths = []
+        if isinstance(self.access_log, RotatingFile):
+            paths = self.access_log.segments()
+        paths.append(self.access_log_file)
+        for path in paths:
+            with (gzip.open(path, "rt") if path.endswith(".gz") else open(path)) as f:
+                for l in f:
+                    yield l
 
     def password_entered(self, correct, count_attempt=True):
         """
@@ -116,8 +155,8 @@ class CodeLock:
             self.iface.flash_red_led()
             if self.incorrect_attempts == MAX_ATTEMPTS:
                 self.lockout()
-            self.logger.log("password incorrect, attempts: {}, LED pulsed".format(
-                self.incorrect_attempts))
+            self.logger.log("password incorrect, attempts: {}, LED pulsed",
+                            self.incorrect_attempts)
 
     def lockout(self):
         """
@@ -126,25 +165,23 @@ class CodeLock:
         self.incorrect_attempts = 0
         self.locked_out = True
         self.locked_time_left = LOCKED_OUT_TIME
-        self.locked_timeout.start()
+        self.locked_timeout.restart()
         self.logger.log("user locked out, beginning countdown")
 
     def locked_timeout_elapsed(self):
         """
-        Handles the elapsed event of the lockout timeout.
+        Handles each tick of the lockout timeout.
         """
-        self.locked_time_left -= 1
-        self.logger.logd(
-            "locked out time left: {}".format(self.locked_time_left))
+        self.locked_time_left = LOCKED_OUT_TIME - self.locked_timeout.ticks
+        if self.locked_timeout.missed > 0:
+            self.logger.logw("lockout countdown has missed {} ticks", self.locked_timeout.missed)
+        self.logger.logd("locked out time left: {}", self.locked_time_left)
         self.stdout.overwrite_text = "LOCKED ({})".format(
             self.locked_time_left)
         if self.locked_time_left <= 0:
             self.locked_out = False
             self.overwrite_text = ""
             self.logger.log("locked timeout finished, disabling")
-        else:
-            self.locked_timeout.start()
-            self.logger.logd("restarted timeout second counter")
 
     def clear_timeout_elapsed(self):
         self.cover_digit_timeout.reset()
@@ -158,7 +195,7 @@ class CodeLock:
         """
         Handles the event when the user inputs a digit into the keypad.
         """
-        self.logger.log("received digit '{}'".format(digit))
+        self.logger.log("received digit '{}'", digit)
         if self.ignore_digits:
             self.logger.log("currently ignoring digits, skipping")
             return
@@ -166,7 +203,7 @@ class CodeLock:
             self.logger.log("locked out, ignoring digit")
             return
         if TIME_LOCKOUT_BEGIN != TIME_LOCKOUT_END:
-            now = datetime.datetime.now().time()
+            now = self.clock.now().time()
             if not (TIME_LOCKOUT_BEGIN <= now <= TIME_LOCKOUT_END):
                 self.logger.log("time lockout out of bounds, ignoring digit")
                 return
@@ -175,8 +212,10 @@ class CodeLock:
         self.stdout.overwrite_text = ("*" * len(self.current_input)) + digit
         self.cover_digit_timeout.restart()
         self.current_input.append(digit)
-        self._digit_timeout_time = time.time()
+        self._digit_timeout_time = self.clock.time()
         self.digit_timeout.restart()
+        if pi_leds_available:
+            pi_leds.set_leds(0)
         if len(self.password) == len(self.current_input):
             for i in range(len(self.password)):
                 if self.password[i] != self.current_input[i]:
@@ -187,21 +226,24 @@ class CodeLock:
             if self.password[_i] != self.current_input[_i]:
                 self.password_entered(False)
 
+    def digit_timeout_progress(self, point):
+        """
+        Handles the progress event of the digit timeout, updating the LED bar.
+        """
+        self.logger.logd("digit timeout: {:.0%} of the time has passed", point)
+        if pi_leds_available:
+            pi_leds.set_leds(point)
+
     def digit_timeout_elapsed(self):
         """
         Handles the elapsed event of the digit timeout.
         """
-        now = time.time()
+        now = self.clock.time()
         passed = now - self._digit_timeout_time
         self.logger.logd(
             "digit timeout: {} seconds have passed since last input", passed)
-        if pi_leds_available:
-            pi_leds.set_leds(max(0, min(passed / DIGIT_TIMEOUT_LENGTH, 1)))
-        if passed >= DIGIT_TIMEOUT_LENGTH:
-            self.password_entered(False, False)
-            self.stdout.overwrite_text = ""
-        else:
-            self.digit_timeout.restart()
+        self.password_entered(False, False)
+        self.stdout.overwrite_text = ""
 
     def cleanup(self):
         """
@@ -218,20 +260,19 @@ class CodeLock:
         self.access_log.close()
         data = []
         try:
-            with open(ACCESS_LOG_FILE) as f:
-                for l in f:
-                    spl = l.strip().split(",")
-                    if spl[0] == "startup":
-                        data.clear()
-                    elif spl[0] == "code":
-                        ts = spl[1].split("T")[1].split(":")
-                        s = (int(ts[0]) * 3600) + \
-                            (int(ts[1]) * 60) + int(ts[2])
-                        data.append("{}\t{}".format(s, int(eval(spl[2]))))
-            with open(GNUPLOT_FILE, "w") as f:
+            for l in self.access_log_lines():
+                spl = l.strip().split(",")
+                if spl[0] == "startup":
+                    data.clear()
+                elif spl[0] == "code":
+                    ts = spl[1].split("T")[1].split(":")
+                    s = (int(ts[0]) * 3600) + \
+                        (int(ts[1]) * 60) + int(ts[2])
+                    data.append("{}\t{}".format(s, int(eval(spl[2]))))
+            with open(self.gnuplot_file, "w") as f:
                 f.write("\n".join(data))
             try:
-                subprocess.call(["./gnuplot.sh"])
+                subprocess.call(["./gnuplot.sh", self.gnuplot_file, self.graph_file])
             except Exception as ex:
                 if PRINT_MSGS:
                     import traceback
@@ -1,9 +1,12 @@
-#! /usr/bin/gnuplot -persist
+#! /usr/bin/gnuplot -c
+# Usage: gnuplot.sh [data file] [graph file]
+data = ARGC > 0 ? ARG1 : 'gnuplot_data.csv';
+graph = ARGC > 1 ? ARG2 : 'access_times_graph.jpg';
 set title 'Access Times';
 set ylabel 'Pass/Fail';
 set xlabel 'Time Since Midnight';
 set grid;
 set term jpeg;
-set output 'access_times_graph.jpg';
+set output graph;
 set yrange [-1:2];
-plot "gnuplot_data.csv" using 1:2 pt 7 ps 2;
+plot data using 1:2 pt 7 ps 2;
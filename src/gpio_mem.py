@@ -0,0 +1,70 @@
+#! /usr/bin/env python3
+import mmap
+import os
+
+GPIO_MEM_PATH = "/dev/gpiomem"
+GPIO_BLOCK_SIZE = 4096
+
+# BCM283x GPIO register offsets (bytes)
+GPSET0 = 0x1C
+GPCLR0 = 0x28
+GPLEV0 = 0x34
+
+
+class GpioMem:
+    """
+    Direct access to the GPIO register block through a memory mapped file.
+    Each set, clear or level read of bank 0 (pins 0-31) is a single word access,
+    so several pins can be changed or read at once. Pin directions are left to
+    RPi.GPIO, which keeps track of them for its own checks (e.g. edge detection).
+    """
+
+    def __init__(self, path=GPIO_MEM_PATH):
+        fd = os.open(path, os.O_RDWR | os.O_SYNC)
+        try:
+            self._mmap = mmap.mmap(fd, GPIO_BLOCK_SIZE,
+                                   mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self._words = memoryview(self._mmap).cast("I")
+
+    @staticmethod
+    def mask(pins):
+        """
+        Converts a list of pins into a bank mask.
+        """
+        m = 0
+        for p in pins:
+            m |= 1 << p
+        return m
+
+    def set_mask(self, mask):
+        """
+        Drives every pin in the mask high.
+        """
+        if mask:
+            self._words[GPSET0 // 4] = mask
+
+    def clear_mask(self, mask):
+        """
+        Drives every pin in the mask low.
+        """
+        if mask:
+            self._words[GPCLR0 // 4] = mask
+
+    def write_mask(self, mask, values):
+        """
+        Drives the pins in the mask to the matching bits in values.
+        """
+        self.set_mask(mask & values)
+        self.clear_mask(mask & ~values)
+
+    def levels(self):
+        """
+        Reads the level of every pin in the bank.
+        """
+        return self._words[GPLEV0 // 4]
+
+    def close(self):
+        self._words.release()
+        self._mmap.close()
@@ -1,29 +1,322 @@
 #! /usr/bin/env python3
 import time
 import RPi.GPIO as gpio
+from clock import get_clock
 
 HARDWARE_WAIT = 0.010
 BOUNCE_SEARCH = 0.005
+SPIN_THRESHOLD = 0.0001  # the final part of a precise wait that is spun instead of slept
+
+# Debounce engines
+DEBOUNCE_AVERAGE = "average"
+DEBOUNCE_INTEGRATE = "integrate"
+DEBOUNCE_MODE = DEBOUNCE_INTEGRATE
+DEBOUNCE_STABLE_SAMPLES = 16  # consistent samples needed by the integrator
+DEBOUNCE_STABLE_TIME = 0.002  # seconds the integrator's samples must stay consistent for
+VIRTUAL_SAMPLE_TIME = 0.00001  # seconds a virtual clock is moved on by for each sample
+
+
+def _counter_ns(clock):
+    if clock is None:
+        clock = get_clock()
+    if not clock.virtual:
+        # the real clock is read directly to keep the sample loops tight
+        return time.perf_counter_ns
+
+    def now():
+        # nothing else moves a virtual clock during the sample loops, so each
+        # sample takes its own time on it to let the loops finish
+        clock.advance(VIRTUAL_SAMPLE_TIME)
+        return clock.perf_counter_ns()
+    return now
+
+
+def debounce_average(read, clock=None):
+    """
+    Samples the read function for the full BOUNCE_SEARCH window and rounds the average.
+    If the read function returns tuples, each element is averaged separately.
+    Returns the cleaned value and the number of samples taken.
+    """
+    now = _counter_ns(clock)
+    end = now() + int(BOUNCE_SEARCH * 1e9)
+    total_states = None
+    states_caught = 0
+    while True:
+        value = read()
+        if total_states is None:
+            total_states = value
+        elif isinstance(value, tuple):
+            total_states = tuple(t + v for t, v in zip(total_states, value))
+        else:
+            total_states += value
+        states_caught += 1
+        if now() >= end:
+            break
+    if isinstance(total_states, tuple):
+        return tuple(round(t / states_caught) for t in total_states), states_caught
+    return round(total_states / states_caught), states_caught
+
+
+def debounce_integrate(read, stable=None, clock=None, stable_time=None):
+    """
+    Samples the read function until it has read the same value for DEBOUNCE_STABLE_TIME
+    and at least DEBOUNCE_STABLE_SAMPLES consecutive samples, giving up after the
+    BOUNCE_SEARCH window and using the most seen value instead. Samples are only
+    microseconds apart, so it is the time that covers a gap in the contact bounce;
+    the sample count just guards against a stall between two reads.
+    Returns the cleaned value and the number of samples taken.
+    """
+    if stable is None:
+        stable = DEBOUNCE_STABLE_SAMPLES
+    if stable_time is None:
+        stable_time = DEBOUNCE_STABLE_TIME
+    stable_ns = int(stable_time * 1e9)
+    now = _counter_ns(clock)
+    end = now() + int(BOUNCE_SEARCH * 1e9)
+    seen = {}
+    last = None
+    run = 0
+    run_start = 0
+    samples = 0
+    while True:
+        value = read()
+        current = now()
+        samples += 1
+        if value == last:
+            run += 1
+            if run >= stable and current - run_start >= stable_ns:
+                return value, samples
+        else:
+            last = value
+            run = 1
+            run_start = current
+        seen[value] = seen.get(value, 0) + 1
+        if current >= end:
+            break
+    return max(seen, key=seen.get), samples
+
+
+_debouncers = {
+    DEBOUNCE_AVERAGE: debounce_average,
+    DEBOUNCE_INTEGRATE: debounce_integrate
+}
+
+
+def precise_sleep(seconds, clock=None):
+    """
+    Sleeps for the given time, sleeping through most of it and spinning through
+    the last SPIN_THRESHOLD to make up for the OS oversleeping.
+    A virtual clock is just advanced.
+    """
+    if clock is None:
+        clock = get_clock()
+    if clock.virtual:
+        clock.sleep(seconds)
+        return
+    end = time.perf_counter() + seconds
+    if seconds > SPIN_THRESHOLD:
+        time.sleep(seconds - SPIN_THRESHOLD)
+    while time.perf_counter() < end:
+        pass
+
+
+class SettleTracker:
+    """
+    Keeps track of when the lines were last changed, so that anything depending on
+    them only waits for whatever is left of the hardware settle time.
+    """
+
+    def __init__(self, settle_time=None, clock=None):
+        self.settle_time = settle_time
+        """The settle time in seconds (None uses HARDWARE_WAIT)."""
+        self._clock = clock
+        self._changed = None
+        self.waits = 0
+        """The number of waits that had to sleep."""
+        self.skipped = 0
+        """The number of waits where the lines had already settled."""
+        self.waited = 0
+        """The total time (seconds of real time, for profiling) spent in waits."""
+
+    def mark(self):
+        """
+        Records that a line has just changed.
+        """
+        self._changed = self.clock.perf_counter()
+
+    @property
+    def clock(self):
+        return get_clock() if self._clock is None else self._clock
+
+    def remaining(self):
+        if self._changed is None:
+            return 0
+        settle_time = HARDWARE_WAIT if self.settle_time is None else self.settle_time
+        return max(0, self._changed + settle_time - self.clock.perf_counter())
+
+    def wait(self):
+        """
+        Waits until the last line change has settled. The settle time is only a
+        lower bound, so this just sleeps (oversleeping is harmless, and spinning
+        would keep the CPU busy for every line change).
+        """
+        left = self.remaining()
+        if left > 0:
+            self.waits += 1
+            start = time.perf_counter()
+            self.clock.sleep(left)
+            self.waited += time.perf_counter() - start
+        else:
+            self.skipped += 1
+
+
+settle = SettleTracker()
+"""The settle tracker shared by the gpio lines."""
+
+
+class GpioCallStats:
+    """
+    Counts the setup and output calls made to the hardware, and the ones that
+    were skipped because the line was already in the requested state.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.made = 0
+        self.skipped = 0
+
+    def __repr__(self):
+        return "gpio calls made: {}, skipped: {}".format(self.made, self.skipped)
+
+
+call_stats = GpioCallStats()
+
+_gpio_mem = None
+
+
+def use_gpio_mem(mem):
+    """
+    Sets a GpioMem register block to be used for writing and reading pin levels
+    instead of the per-pin RPi.GPIO calls (None goes back to RPi.GPIO).
+    Pin directions are always configured through RPi.GPIO.
+    """
+    global _gpio_mem
+    _gpio_mem = mem
+
+
+def get_gpio_mem():
+    return _gpio_mem
+
+
+def get_debouncer(mode=None):
+    """
+    Gets the debounce function for the given mode (defaults to DEBOUNCE_MODE).
+    """
+    return _debouncers[DEBOUNCE_MODE if mode is None else mode]
 
 
 class GpioWrapper:
-    def __init__(self, pin):
+    """
+    Wraps a single gpio line. Changes to the line are recorded with the settle
+    tracker, and anything depending on a previous change (a read or another write)
+    waits for the rest of the settle time before going ahead.
+    The direction and output level of the line are cached, so setting either to
+    what it already is does not touch the hardware.
+    Lines on separate circuits can be given their own settle tracker, so that one
+    circuit's changes don't hold up another's. The clock times the debounce window
+    (the settle tracker has its own).
+    """
+
+    def __init__(self, pin, debounce=None, settle_tracker=None, clock=None):
         self._pin = pin
-        self._io_inp = True
+        self._clock = clock
+        self.settle = settle if settle_tracker is None else settle_tracker
+        """The settle tracker for the circuit the line is on."""
+        self._io_inp = None
+        self._level = None
+        self._debounce = get_debouncer(debounce)
+        self.last_samples = 0
+        """The number of samples the last call to state needed."""
         self.input()
 
     @staticmethod
     def wait():
-        time.sleep(HARDWARE_WAIT)
+        settle.wait()
 
     @staticmethod
     def set_multiple_output(*args):
-        for t in args:
-            t[0]._apply_output(t[1])
-        GpioWrapper.wait()
+        changed = [t for t in args if t[0]._level != t[1]]
+        call_stats.skipped += len(args) - len(changed)
+        if len(changed) == 0:
+            return
+        args = changed
+        trackers = set(t[0].settle for t in args)
+        for tracker in trackers:
+            tracker.wait()
+        if _gpio_mem is not None:
+            mask = 0
+            values = 0
+            for t in args:
+                assert isinstance(t[1], bool)
+                mask |= 1 << t[0]._pin
+                if t[1]:
+                    values |= 1 << t[0]._pin
+            _gpio_mem.write_mask(mask, values)
+            for t in args:
+                t[0]._level = t[1]
+            call_stats.made += 1
+        else:
+            for t in args:
+                t[0]._apply_output(t[1])
+        for tracker in trackers:
+            tracker.mark()
+
+    @property
+    def pin(self):
+        return self._pin
+
+    @property
+    def is_input(self):
+        return self._io_inp
+
+    @property
+    def level(self):
+        """The level last written to the line (None if never written)."""
+        return self._level
+
+    @staticmethod
+    def set_multiple_io(*args):
+        """
+        Sets the direction of several lines ((line, state) pairs), with a single
+        settle wait beforehand, as a direction change can clash with a change still
+        settling (e.g. driving the data lines before the io switch has turned off).
+        """
+        changed = [t for t in args if t[0]._io_inp != (t[1] == gpio.IN)]
+        call_stats.skipped += len(args) - len(changed)
+        if len(changed) == 0:
+            return
+        trackers = set(t[0].settle for t in changed)
+        for tracker in trackers:
+            tracker.wait()
+        for t in changed:
+            t[0]._apply_io(t[1])
+        for tracker in trackers:
+            tracker.mark()
 
     def set_io(self, state):
+        if self._io_inp == (state == gpio.IN):
+            call_stats.skipped += 1
+            return
+        self.settle.wait()
+        self._apply_io(state)
+        self.settle.mark()
+
+    def _apply_io(self, state):
         gpio.setup(self._pin, state)
+        call_stats.made += 1
+        self._io_inp = state == gpio.IN
 
     def input(self):
         self.set_io(gpio.IN)
@@ -32,12 +325,21 @@ class GpioWrapper:
         self.set_io(gpio.OUT)
 
     def set_output(self, value):
+        if self._level == value:
+            call_stats.skipped += 1
+            return
+        self.settle.wait()
         self._apply_output(value)
-        GpioWrapper.wait()
+        self.settle.mark()
 
     def _apply_output(self, value):
         assert isinstance(value, bool)
-        gpio.output(self._pin, value)
+        if _gpio_mem is not None:
+            _gpio_mem.write_mask(1 << self._pin, value << self._pin)
+        else:
+            gpio.output(self._pin, value)
+        call_stats.made += 1
+        self._level = value
 
     def high(self):
         self.set_output(True)
@@ -45,15 +347,30 @@ class GpioWrapper:
     def low(self):
         self.set_output(False)
 
+    def raw_state(self):
+        """
+        Reads the line once without any contact bounce cleaning.
+        """
+        if _gpio_mem is not None:
+            return (_gpio_mem.levels() >> self._pin) & 1
+        return gpio.input(self._pin)
+
+    def add_edge_detect(self, callback, edge=None):
+        """
+        Calls the callback (with the pin number) whenever the given edge is seen on the line.
+        Defaults to both rising and falling edges.
+        """
+        if edge is None:
+            edge = gpio.BOTH
+        gpio.add_event_detect(self._pin, edge, callback=callback)
+
+    def remove_edge_detect(self):
+        gpio.remove_event_detect(self._pin)
+
     def state(self):
-        start = time.time()
-        total_states = 0
-        states_caught = 0
-        while time.time() - start < BOUNCE_SEARCH:
-            total_states += gpio.input(self._pin)
-            states_caught += 1
-        avg = total_states / states_caught
-        return round(avg)
+        self.settle.wait()
+        value, self.last_samples = self._debounce(self.raw_state, clock=self._clock)
+        return value
 
     @property
     def is_high(self):
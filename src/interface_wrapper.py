@@ -1,7 +1,17 @@
 #! /usr/bin/env python3
+import threading
+import time
 import RPi.GPIO as gpio
 from event import Event
-from gpio_wrapper import GpioWrapper
+from gpio_wrapper import GpioWrapper, get_debouncer, get_gpio_mem, use_gpio_mem, call_stats
+import gpio_wrapper
+from gpio_mem import GpioMem
+from scan_scheduler import ScanScheduler
+import scan_stats
+import output_queue
+from key_dispatch import DigitDispatcher
+from key_trace import KeyTracer, STAGE_LATCHED
+from keypad import KeypadLayout
 
 # GPIO States
 GPIO_S_HIGH = "1"
@@ -13,6 +23,21 @@ LINE_IO_SWTICH = 15
 LINE_DATA_0 = 10
 LINE_DATA_1 = 9
 LINE_DATA_2 = 11
+LINES_DATA = [LINE_DATA_0, LINE_DATA_1, LINE_DATA_2]
+
+# Edge detection
+EDGE_DETECT = False  # whether to sleep on data line edges instead of polling while idle
+# Max time to wait for an edge while a row is latched. This adds up to 20ms to every
+# idle cycle, and to the latency of the first key press from idle, in exchange for
+# not polling. Each wait also arms and disarms edge detection on the data lines
+# (sysfs and epoll setup in RPi.GPIO), which is why it is only done while idle.
+EDGE_ROW_DWELL = 0.020
+
+# Digit dispatch
+ASYNC_DISPATCH = False  # whether digit handlers run on their own thread instead of the scan thread
+
+# Register access
+USE_GPIO_MEM = False  # whether to drive the lines through the mapped register block
 
 # 8-Bit ad-hoc digits
 DPOS_DIGIT = [0, 1, 2, 3]
@@ -42,22 +67,82 @@ DIGIT_CONVERT = [
     ["*", "0", "#"],
 ]
 
+# Output names in the keypad layout
+OUTPUT_GREEN_LED = "green"
+OUTPUT_RED_LED = "red"
+OUTPUT_BUZZER = "buzzer"
+
+DEFAULT_KEYPAD = KeypadLayout(DIGIT_CONVERT, DPOS_DIGIT, {
+    OUTPUT_GREEN_LED: DPOS_GREEN_LED,
+    OUTPUT_RED_LED: DPOS_RED_LED,
+    OUTPUT_BUZZER: DPOS_BUZZER
+}, data_bits=len(LINES_DATA))
+
+
+class GpioTransaction:
+    """
+    Collects direction and level changes for a set of lines and applies them together
+    when committed (or when the with block exits). The lines cache their own direction
+    and level, so only the lines that actually change reach the hardware, and all
+    direction changes share a single settle wait, as do all level changes.
+    """
+
+    def __init__(self):
+        self._directions = {}
+        self._levels = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.commit()
+
+    def input(self, line):
+        self._directions[line] = gpio.IN
+
+    def output(self, line):
+        self._directions[line] = gpio.OUT
+
+    def set(self, line, value):
+        self._levels[line] = value
+
+    def commit(self):
+        if len(self._directions) > 0:
+            GpioWrapper.set_multiple_io(*self._directions.items())
+        if len(self._levels) > 0:
+            GpioWrapper.set_multiple_output(*self._levels.items())
+        self._directions = {}
+        self._levels = {}
+
 
 class GpioLines:
     """
     A class that contains all of the gpio lines that are used.
     This allows for a nicer abstraction of the lines and some helper methods.
+    The pins default to the LINE_* constants, and the lines share the global settle
+    tracker unless they are given their own.
     """
 
-    def __init__(self):
+    def __init__(self, data_pins=None, reg_pin=None, io_pin=None, settle_tracker=None):
+        if data_pins is None:
+            data_pins = LINES_DATA
+        self.settle = gpio_wrapper.settle if settle_tracker is None else settle_tracker
+        """The settle tracker the lines record their changes with."""
         self._lines = {
-            "reg": GpioWrapper(LINE_REG_CLK),
-            "io": GpioWrapper(LINE_IO_SWTICH),
-            "d0": GpioWrapper(LINE_DATA_0),
-            "d1": GpioWrapper(LINE_DATA_1),
-            "d2": GpioWrapper(LINE_DATA_2)
+            "reg": GpioWrapper(LINE_REG_CLK if reg_pin is None else reg_pin,
+                               settle_tracker=settle_tracker),
+            "io": GpioWrapper(LINE_IO_SWTICH if io_pin is None else io_pin,
+                              settle_tracker=settle_tracker)
         }
-        self._digit_lines = ["d0", "d1", "d2"]
+        self._digit_lines = []
+        for i in range(len(data_pins)):
+            self._lines["d{}".format(i)] = GpioWrapper(data_pins[i], settle_tracker=settle_tracker)
+            self._digit_lines.append("d{}".format(i))
+        self._digit_mask = (1 << len(self._digit_lines)) - 1
+        self._debounce = get_debouncer()
+        self.last_samples = 0
+        """The number of samples the last bulk read of the data lines needed."""
 
     @property
     def reg(self):
@@ -70,30 +155,103 @@ class GpioLines:
     def d(self, index):
         return self._lines[self._digit_lines[index]]
 
+    @property
+    def pins(self):
+        """The pins of all of the lines."""
+        return [line.pin for line in self._lines.values()]
+
+    def transaction(self):
+        return GpioTransaction()
+
+    def wait(self):
+        """
+        Waits until the last change to these lines has settled.
+        """
+        self.settle.wait()
+
     def d_output(self):
-        for d in self._digit_lines:
-            self._lines[d].output()
+        with self.transaction() as tx:
+            for d in self._digit_lines:
+                tx.output(self._lines[d])
 
     def d_input(self):
+        with self.transaction() as tx:
+            for d in self._digit_lines:
+                tx.input(self._lines[d])
+
+    def d_raw_all_high(self):
+        self.wait()
+        for d in self._digit_lines:
+            if not self._lines[d].raw_state():
+                return False
+        return True
+
+    def d_enable_edges(self, callback):
         for d in self._digit_lines:
-            self._lines[d].input()
+            self._lines[d].add_edge_detect(callback)
 
-    def d_states(self):
-        return [self._lines[d].state() for d in self._digit_lines]
+    def d_disable_edges(self):
+        for d in self._digit_lines:
+            self._lines[d].remove_edge_detect()
 
-    def d_all_high(self):
-        high = True
-        for s in self.d_states():
-            high = high and s
-        return high
+    def _d_raw_states(self):
+        mem = get_gpio_mem()
+        if mem is not None:
+            # a single register read covers every data line
+            levels = mem.levels()
+            return tuple((levels >> self._lines[d].pin) & 1 for d in self._digit_lines)
+        return tuple(self._lines[d].raw_state() for d in self._digit_lines)
 
-    def d_all_low(self):
-        return not self.d_all_high()
+    def d_sample(self):
+        """
+        Reads all of the data lines together in a single debounce window.
+        Returns the combined state, with bit n being the state of data line n.
+        """
+        self.wait()
+        states, self.last_samples = self._debounce(self._d_raw_states, clock=self.settle.clock)
+        bits = 0
+        for i in range(len(states)):
+            if states[i]:
+                bits |= 1 << i
+        return bits
+
+    def d_bits_to_states(self, bits):
+        return [(bits >> i) & 1 for i in range(len(self._digit_lines))]
+
+    def d_states(self, bits=None):
+        if bits is None:
+            bits = self.d_sample()
+        return self.d_bits_to_states(bits)
+
+    def d_all_high(self, bits=None):
+        """
+        Whether all of the data lines are high. Pass in the result of d_sample
+        to reuse an existing reading instead of sampling again.
+        """
+        if bits is None:
+            bits = self.d_sample()
+        return bits == self._digit_mask
+
+    def d_all_low(self, bits=None):
+        return not self.d_all_high(bits)
 
     def d_set_states(self, states):
-        digits = [(self._lines[self._digit_lines[i]], states[i])
-                  for i in range(len(self._digit_lines))]
-        GpioWrapper.set_multiple_output(*digits)
+        with self.transaction() as tx:
+            for i in range(len(self._digit_lines)):
+                tx.set(self._lines[self._digit_lines[i]], states[i])
+
+    def d_compile_states(self, states):
+        """
+        Pairs up the data lines with the given states, ready to be passed to d_write.
+        """
+        return tuple((self._lines[self._digit_lines[i]], states[i])
+                     for i in range(len(self._digit_lines)))
+
+    def d_write(self, pairs):
+        """
+        Writes a set of (line, state) pairs made by d_compile_states.
+        """
+        GpioWrapper.set_multiple_output(*pairs)
 
 
 class InterfaceWrapper:
@@ -101,25 +259,68 @@ class InterfaceWrapper:
     The main class used by the startup to handle the interfacing.
     """
 
-    def __init__(self, logger, DEMO_MODE=False):
+    def __init__(self, logger, DEMO_MODE=False, edge_detect=None, gpio_mem=None, scheduler=None,
+                 async_dispatch=None, keypad=None, data_pins=None, reg_pin=None, io_pin=None,
+                 settle_tracker=None):
         self.DEMO_MODE = DEMO_MODE
+        self.edge_detect = EDGE_DETECT if edge_detect is None else edge_detect
         gpio.setwarnings(False)
         gpio.setmode(gpio.BCM)
         self.logger = logger
-        self.gpio = GpioLines()
+        self._gpio_mem = None
+        if gpio_mem is None and USE_GPIO_MEM:
+            gpio_mem = GpioMem()
+        if gpio_mem is not None:
+            self._gpio_mem = gpio_mem
+            use_gpio_mem(gpio_mem)
+            self.logger.log("using mapped gpio registers")
+        self.keypad = DEFAULT_KEYPAD if keypad is None else keypad
+        """The layout of the keypad and decoder outputs."""
+        self.gpio = GpioLines(data_pins, reg_pin, io_pin, settle_tracker)
+        if len(self.gpio._digit_lines) != self.keypad.data_bits:
+            raise ValueError("Keypad layout needs {} data lines".format(self.keypad.data_bits))
+        # the line states to write for each decoder output, compiled once up front
+        self._output_writes = tuple(self.gpio.d_compile_states(st)
+                                    for st in self.keypad.output_states)
         self.gpio.reg.output()
         self.gpio.io.output()
-        self.digit_received = Event()
+        self.digit_received = Event(name="digit_received")
         """The digit received event, fired when the class detects that a digit has been pressed"""
+        self.tracer = KeyTracer()
+        """Traces the latency of each key press through to its feedback being latched."""
+        self.dispatcher = None
+        """The dispatcher firing digit_received off the scan thread (None when handlers run inline)."""
+        if ASYNC_DISPATCH if async_dispatch is None else async_dispatch:
+            self.dispatcher = DigitDispatcher(
+                self.digit_received, self.logger, tracer=self.tracer)
+            self.dispatcher.start()
         self._run_loop = True
         self._current_digit = 0
         self._digit_down = False
         self._done_line_write = False
-        # the follow store the value to apply to the given output on the next
-        # pass
-        self._led_green_apply = 0
-        self._led_red_apply = 0
-        self._buzzer_apply = 0
+        self.outputs = output_queue.OutputQueue()
+        """The queue of LED and buzzer pulses waiting for a write phase."""
+        # set from the gpio edge callback thread when in edge detect mode
+        self._edge_seen = threading.Event()
+        self.scheduler = ScanScheduler() if scheduler is None else scheduler
+        """Paces the scan cycles of the main loop."""
+        self.stats = scan_stats.ScanStats()
+        """Timing histograms of each phase of the scan loop."""
+        self._write_start = None
+        self._read_start = None
+        self._pulse_start = None
+        # the settle tracker's waited total at each phase start
+        self._write_settled = 0
+        self._read_settled = 0
+        self._pulse_settled = 0
+        self._pulse_trace = None
+        self.scan_steps = (self._start_write, self._write_lines, self._latch_high,
+                           self._latch_low, self._release_lines, self._enable_columns,
+                           self._do_read_phase)
+        """
+        The steps of one scan cycle, split wherever the next step has to wait for the
+        lines to settle, so that the steps of several locks can be interleaved.
+        """
 
         self.logger.log("interface wrapper init complete")
 
@@ -128,8 +329,12 @@ class InterfaceWrapper:
         Starts up the main loop of the interface, loop is wrapped in an exception handler that can handle both ‘Exception’ and ‘KeyboardInterrupt’.
         """
         self.logger.log("Main loop started")
+        self.scheduler.start()
         try:
             while self._run_loop:
+                if self.scheduler.wait():
+                    self.logger.logd("no key activity, dropped to idle scan rate")
+                self.stats.cycle()
                 # write phase
                 if self.DEMO_MODE:
                     input("> do write phase <")
@@ -145,29 +350,71 @@ class InterfaceWrapper:
         except KeyboardInterrupt:
             self.logger.log("Beginning shutdown")
 
+    def scan_cycle(self):
+        """
+        Runs one full scan cycle (without waiting for it to be due).
+        """
+        self.stats.cycle()
+        for step in self.scan_steps:
+            step()
+
     def _inc_current_digit(self):
         self._current_digit += 1
-        self._current_digit %= DPOS_NDIGITS
+        self._current_digit %= self.keypad.rows
 
     def _dec_current_digit(self):
         self._current_digit -= 1
-        self._current_digit %= DPOS_NDIGITS
+        self._current_digit %= self.keypad.rows
+
+    def _record_phase(self, phase, start, settled, end=None):
+        """
+        Records the time since start under the phase, less any settle waits since
+        then (settled being the tracker's waited total at the start), which are
+        recorded as a phase of their own.
+        """
+        if end is None:
+            end = time.perf_counter()
+        waited = self.gpio.settle.waited - settled
+        self.stats.record(phase, end - start - waited)
+        self.stats.record(scan_stats.PHASE_SETTLE, waited)
 
     def _start_read(self):
+        self._release_lines()
+        self._enable_columns()
+
+    def _release_lines(self):
+        self._read_start = time.perf_counter()
+        self._read_settled = self.gpio.settle.waited
         self.gpio.d_input()
         self.logger.logt("data lines set to input")
-        GpioWrapper.wait()
+
+    def _enable_columns(self):
+        start, settled = self._read_start, self._read_settled
+        if start is None:
+            start, settled = time.perf_counter(), self.gpio.settle.waited
+        self._read_start = None
+        self.gpio.wait()
         self.gpio.io.low()
         self.logger.logt("io line high")
         self.logger.logt("gpio lines configured to read")
+        self._record_phase(scan_stats.PHASE_READ_SETUP, start, settled)
 
     def _do_read_phase(self):
         if not self._done_line_write:
             self.logger.logt(
                 "skipped reading rows due to previous write not being to column")
             return
+        if self.edge_detect and self.scheduler.idle and not self._wait_for_edge():
+            self.logger.logt("no edge seen on row, skipping read")
+            return
+        start, settled = time.perf_counter(), self.gpio.settle.waited
+        bits = self.gpio.d_sample()
+        # when the key was seen, after the settle wait and debounce
+        sampled = time.perf_counter()
+        self._record_phase(scan_stats.PHASE_SAMPLE, start, settled, sampled)
         if self._digit_down:
-            if self.gpio.d_all_high():
+            self.scheduler.activity()
+            if self.gpio.d_all_high(bits):
                 self._digit_down = False
                 self._inc_current_digit()
                 self.logger.logt(
@@ -175,21 +422,51 @@ class InterfaceWrapper:
             else:
                 self.logger.logt("digit still pressed")
         else:
-            states = self.gpio.d_states()
-            self.logger.logt("state readings: {}", states)
-            active = None
-            for s in range(len(states)):
-                if not states[s]:
-                    active = s
-                    break
-            if active is not None:
+            self.logger.logt("state readings: {:b}", bits)
+            # the row written last is the one before the current digit
+            dgt = self.keypad.key_at((self._current_digit - 1) % self.keypad.rows, bits)
+            if dgt is not None:
+                if self.scheduler.activity():
+                    self.logger.logd("key pressed, back to full scan rate")
                 self._digit_down = True
                 self._dec_current_digit()
-                dgt = DIGIT_CONVERT[self._current_digit][s]
                 self.logger.logt("converted digit: {}", dgt)
-                self.digit_received.fire(dgt)
+                trace = self.tracer.begin(dgt, sampled)
+                start = time.perf_counter()
+                try:
+                    if self.dispatcher is not None:
+                        if not self.dispatcher.push(dgt, trace):
+                            self.logger.logw("digit queue full, dropped '{}'", dgt)
+                    else:
+                        self.tracer.fire(trace, self.digit_received, dgt)
+                finally:
+                    self.stats.record(scan_stats.PHASE_DISPATCH, time.perf_counter() - start)
+
+    def _edge_detected(self, channel):
+        self._edge_seen.set()
+
+    def _wait_for_edge(self):
+        """
+        Sleeps until a data line changes in the direction we are interested in
+        (low when waiting for a press, high when waiting for a release), or until
+        the row dwell time runs out. Returns whether a full read is worth doing.
+        Only used while the scheduler is idle, as arming the edges costs more than a
+        read once keys are being pressed.
+        """
+        self._edge_seen.clear()
+        # edges are armed before checking the levels so that a change between
+        # the two can't be missed
+        self.gpio.d_enable_edges(self._edge_detected)
+        try:
+            if self.gpio.d_raw_all_high() == self._digit_down:
+                return True
+            return self._edge_seen.wait(EDGE_ROW_DWELL)
+        finally:
+            self.gpio.d_disable_edges()
 
     def _start_write(self):
+        self._write_start = time.perf_counter()
+        self._write_settled = self.gpio.settle.waited
         self.gpio.io.high()
         self.logger.logt("io line low")
         self.gpio.d_output()
@@ -197,59 +474,84 @@ class InterfaceWrapper:
         self.logger.logt("gpio lines configured to write")
 
     def _do_write_phase(self):
-        low_line = None
+        self._write_lines()
+        self._latch_high()
+        self._latch_low()
+
+    def _write_lines(self):
+        start, settled = self._write_start, self._write_settled
+        if start is None:
+            start, settled = time.perf_counter(), self.gpio.settle.waited
+        self._write_start = None
         self._done_line_write = False
-        if self._led_green_apply:
-            low_line = DPOS_GREEN_LED
-            self._led_green_apply -= 1
-            self.logger.logt("low line set to green LED")
-        elif self._led_red_apply:
-            low_line = DPOS_RED_LED
-            self._led_red_apply -= 1
-            self.logger.logt("low line set to red LED")
-        elif self._buzzer_apply:
-            low_line = DPOS_BUZZER
-            self._buzzer_apply -= 1
-            self.logger.logt("low line set to buzzer")
+        low_line = self.outputs.next_slot()
+        trace = None
+        if low_line is not None:
+            trace = self.outputs.take_trace(low_line)
+            self.logger.logt("low line set to output {}", low_line)
         else:  # apply keypad input
-            low_line = DPOS_DIGIT[self._current_digit]
+            low_line = self.keypad.row_outputs[self._current_digit]
             if not self._digit_down:
                 self._inc_current_digit()
             self._done_line_write = True
             self.logger.logt("low line set to next keypad row")
-        # bin_out = bin(low_line)[2:].zfill(3)
-        # self.logger.logt("gpio states: {}", bin_out)
-        # self.gpio.d_set_states([bool(int(d)) for d in reversed(bin_out)])
-        self.gpio.d_set_states(DPOS_CONVERT[low_line])
+        self.gpio.d_write(self._output_writes[low_line])
+        self._pulse_start = time.perf_counter()
+        self._pulse_settled = self.gpio.settle.waited
+        self._pulse_trace = trace
+        self._record_phase(scan_stats.PHASE_WRITE, start, settled, self._pulse_start)
+
+    def _latch_high(self):
         self.gpio.reg.high()
+
+    def _latch_low(self):
         self.gpio.reg.low()
         #self.gpio.d_set_states([True, True, True])
         self.logger.logt("pulsed register line")
+        if self._pulse_trace is not None:
+            self.tracer.mark(self._pulse_trace, STAGE_LATCHED)
+            self._pulse_trace = None
+        self._record_phase(scan_stats.PHASE_REGISTER, self._pulse_start, self._pulse_settled)
 
     def cleanup(self):
         """
         Cleans up any variables before exit.
         """
         self._run_loop = False
-        gpio.cleanup()
+        if self.dispatcher is not None:
+            self.dispatcher.stop()
+            self.logger.log("{}", self.dispatcher)
+        self.logger.log("{}", call_stats)
+        self.logger.log("{}", self.scheduler)
+        self.logger.log("scan loop timings (ms):\n{}", self.stats.summary())
+        self.logger.log("key latencies (ms):\n{}", self.tracer.summary())
+        if self._gpio_mem is not None:
+            use_gpio_mem(None)
+            self._gpio_mem.close()
+            self._gpio_mem = None
+        # only this lock's pins, as other locks may still be running on theirs
+        gpio.cleanup(self.gpio.pins)
 
     def flash_green_led(self):
         """
         Causes the green LED to flash once (if mid-flash, it will either do nothing or just reset the duration left on the flash, depending on how the hardware works).
         """
-        self._led_green_apply = 2
+        self.outputs.request(self.keypad.outputs[OUTPUT_GREEN_LED], output_queue.PRIORITY_HIGH,
+                             trace=self.tracer.current)
         self.logger.log("green LED set to flash on next pass")
 
     def flash_red_led(self):
         """
         Causes the red LED to flash once (if mid-flash, it will either do nothing or just reset the duration left on the flash, depending on how the hardware works).
         """
-        self._led_red_apply = 2
+        self.outputs.request(self.keypad.outputs[OUTPUT_RED_LED], output_queue.PRIORITY_HIGH,
+                             trace=self.tracer.current)
         self.logger.log("red LED set to flash on next pass")
 
     def beep_buzzer(self):
         """
         Causes the buzzer to go off once (if it is already buzzing, it will either do nothing or just reset the duration left on the buzz, depending on how the hardware works).
         """
-        self._buzzer_apply = 2
+        self.outputs.request(self.keypad.outputs[OUTPUT_BUZZER], output_queue.PRIORITY_NORMAL,
+                             trace=self.tracer.current)
         self.logger.log("buzzer set to activate on next pass")
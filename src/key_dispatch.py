@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+import collections
+import threading
+import time
+
+DISPATCH_QUEUE_SIZE = 16  # key events that can be waiting before new ones are dropped
+
+
+class KeyEvent:
+    __slots__ = ["digit", "time", "trace"]
+
+    def __init__(self, digit, time, trace=None):
+        self.digit = digit
+        self.time = time
+        """The perf_counter time the key was queued."""
+        self.trace = trace
+        """The key trace id (if being traced)."""
+
+
+class DigitDispatcher:
+    """
+    Delivers digits to an event from its own thread, so that slow handlers don't hold
+    up the scan loop. The scan thread pushes key events onto a bounded queue (a deque,
+    whose append and popleft need no extra locking), and the dispatcher thread fires
+    the event for each one. If the queue is full the new key event is dropped and counted.
+    """
+
+    def __init__(self, event, logger=None, size=None, tracer=None):
+        self.event = event
+        self.logger = logger
+        self.tracer = tracer
+        self.size = DISPATCH_QUEUE_SIZE if size is None else size
+        self._queue = collections.deque()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self.dropped = 0
+        """The number of key events dropped because the queue was full."""
+        self.delivered = 0
+        self.max_depth = 0
+        """The deepest the queue has been."""
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="digit-dispatch", daemon=True)
+        self._thread.start()
+
+    def push(self, digit, trace=None):
+        """
+        Queues a digit to be fired. Returns False if it was dropped.
+        """
+        depth = len(self._queue)
+        if depth >= self.size:
+            self.dropped += 1
+            return False
+        self._queue.append(KeyEvent(digit, time.perf_counter(), trace))
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        self._wake.set()
+        return True
+
+    def _deliver(self, key):
+        try:
+            if self.tracer is not None and key.trace is not None:
+                self.tracer.fire(key.trace, self.event, key.digit)
+            else:
+                self.event.fire(key.digit)
+        except Exception as ex:
+            if self.logger is not None:
+                self.logger.loge(ex, "An exception occured in a digit handler")
+        self.delivered += 1
+
+    def _drain(self):
+        while True:
+            try:
+                key = self._queue.popleft()
+            except IndexError:
+                return
+            self._deliver(key)
+
+    def _run(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            self._drain()
+
+    def stop(self, timeout=1):
+        """
+        Stops the dispatcher thread, delivering anything still queued first.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout)
+        self._drain()
+
+    def __repr__(self):
+        return "digits delivered: {}, dropped: {}, max queue depth: {}".format(
+            self.delivered, self.dropped, self.max_depth)
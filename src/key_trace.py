@@ -0,0 +1,123 @@
+#! /usr/bin/env python3
+import collections
+import threading
+import time
+
+TRACE_HISTORY = 256  # number of key traces kept
+
+# Trace stages
+STAGE_DETECTED = "detected"
+STAGE_FIRED = "fired"
+STAGE_HANDLED = "handled"
+STAGE_LATCHED = "latched"
+STAGES = [STAGE_DETECTED, STAGE_FIRED, STAGE_HANDLED, STAGE_LATCHED]
+
+
+class KeyTrace:
+    __slots__ = ["id", "digit", "times"]
+
+    def __init__(self, trace_id, digit):
+        self.id = trace_id
+        self.digit = digit
+        self.times = {}
+        """The perf_counter time each stage was reached."""
+
+    def latency(self, stage):
+        """
+        Gets the time from detection to the stage (None if it hasn't been reached).
+        """
+        if stage not in self.times or STAGE_DETECTED not in self.times:
+            return None
+        return self.times[stage] - self.times[STAGE_DETECTED]
+
+
+class KeyTracer:
+    """
+    Follows each key press from the moment it is detected, through the digit received
+    event firing and its handlers finishing, to the feedback pulse the handlers asked for
+    being latched. Each key gets an id, and the last TRACE_HISTORY traces are kept.
+    """
+
+    def __init__(self, history=None):
+        self._traces = collections.OrderedDict()
+        self._history = TRACE_HISTORY if history is None else history
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self, digit, detected=None):
+        """
+        Starts a new trace for a detected digit, returning its id.
+        """
+        with self._lock:
+            trace = KeyTrace(self._next_id, digit)
+            self._next_id += 1
+            trace.times[STAGE_DETECTED] = time.perf_counter() if detected is None else detected
+            self._traces[trace.id] = trace
+            while len(self._traces) > self._history:
+                self._traces.popitem(last=False)
+        return trace.id
+
+    def mark(self, trace_id, stage):
+        """
+        Records the time the key reached the stage (only the first time is kept).
+        """
+        now = time.perf_counter()
+        trace = self._traces.get(trace_id)
+        if trace is not None and stage not in trace.times:
+            trace.times[stage] = now
+
+    @property
+    def current(self):
+        """The id of the key whose handlers are running on this thread (or None)."""
+        return getattr(self._local, "current", None)
+
+    def fire(self, trace_id, event, *args):
+        """
+        Fires the event for the key, marking when it fired and when the handlers finished.
+        """
+        self.mark(trace_id, STAGE_FIRED)
+        prev = self.current
+        self._local.current = trace_id
+        try:
+            event.fire(*args)
+        finally:
+            self._local.current = prev
+            self.mark(trace_id, STAGE_HANDLED)
+
+    def traces(self):
+        with self._lock:
+            return list(self._traces.values())
+
+    def latencies(self, stage):
+        return [l for l in (t.latency(stage) for t in self.traces()) if l is not None]
+
+    def percentiles(self, stage, ps=(50, 90, 99)):
+        """
+        Gets the latency percentiles (in seconds) from detection to the stage.
+        """
+        lat = sorted(self.latencies(stage))
+        if len(lat) == 0:
+            return {p: 0 for p in ps}
+        return {p: lat[min(len(lat) - 1, int(len(lat) * p / 100))] for p in ps}
+
+    def stats(self, ps=(50, 90, 99)):
+        return {s: self.percentiles(s, ps) for s in STAGES[1:]}
+
+    def summary(self):
+        lines = []
+        for stage, pc in self.stats().items():
+            lines.append("{}: n={} {}".format(stage, len(self.latencies(stage)),
+                                              " ".join("p{}={:.3f}".format(p, v * 1000) for p, v in pc.items())))
+        return "\n".join(lines)
+
+    def export_csv(self, path):
+        """
+        Writes the raw traces to a CSV file, one key per line, with the perf_counter
+        time of each stage (blank if not reached).
+        """
+        with open(path, "w") as f:
+            f.write("id,digit,{}\n".format(",".join(STAGES)))
+            for t in self.traces():
+                f.write("{},{},{}\n".format(t.id, t.digit, ",".join(
+                    "" if s not in t.times else "{:.6f}".format(t.times[s]) for s in STAGES)))
@@ -0,0 +1,60 @@
+#! /usr/bin/env python3
+
+
+class KeypadLayout:
+    """
+    Describes a keypad matrix and the decoder bus that drives it, and compiles them into
+    lookup tables when created so that the scan loop doesn't have to build anything:
+    - keys: the key names, as [row][column]
+    - row_outputs: the decoder output that pulls each row low (defaults to 0, 1, 2...)
+    - outputs: the other decoder outputs by name (e.g. {"green": 4})
+    - data_bits: the number of data lines, which both select the decoder output and read
+      the columns (defaults to the fewest that cover both)
+    """
+
+    def __init__(self, keys, row_outputs=None, outputs=None, data_bits=None):
+        self.keys = [list(r) for r in keys]
+        self.rows = len(self.keys)
+        self.columns = max(len(r) for r in self.keys)
+        self.row_outputs = list(range(self.rows)) if row_outputs is None else list(row_outputs)
+        self.outputs = {} if outputs is None else dict(outputs)
+        if len(self.row_outputs) != self.rows:
+            raise ValueError("Each keypad row needs a decoder output")
+        highest = max(self.row_outputs + list(self.outputs.values()))
+        if data_bits is None:
+            data_bits = max(self.columns, highest.bit_length())
+        if data_bits < self.columns:
+            raise ValueError("Not enough data lines to read {} columns".format(self.columns))
+        if highest >= (1 << data_bits):
+            raise ValueError("Decoder output {} can't be selected with {} data lines".format(
+                highest, data_bits))
+        self.data_bits = data_bits
+        self._compile()
+
+    def _compile(self):
+        bits = self.data_bits
+        # the line states that select each decoder output
+        self.output_states = tuple(
+            tuple(bool(o & (1 << b)) for b in range(bits)) for o in range(1 << bits))
+        self.row_states = tuple(self.output_states[o] for o in self.row_outputs)
+        # the first low column for every possible reading of the data lines
+        first_low = []
+        for reading in range(1 << bits):
+            col = None
+            for c in range(self.columns):
+                if not reading & (1 << c):
+                    col = c
+                    break
+            first_low.append(col)
+        self.first_low_column = tuple(first_low)
+        # the key pressed for each row and reading (None for no key)
+        self.key_lookup = tuple(
+            tuple(None if c is None or c >= len(self.keys[r]) else self.keys[r][c]
+                  for c in self.first_low_column)
+            for r in range(self.rows))
+
+    def key_at(self, row, reading):
+        """
+        Gets the key pressed on the row for the given data line reading, or None.
+        """
+        return self.key_lookup[row][reading]
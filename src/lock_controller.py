@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+from gpio_wrapper import SettleTracker
+from interface_wrapper import InterfaceWrapper
+from scan_scheduler import ScanScheduler
+
+
+class LockController:
+    """
+    Drives the keypads of several locks from one scan loop. Each lock is on its own
+    set of pins with its own settle tracker, and every step of a scan cycle is run
+    for all of the locks before moving on to the next step, so that while one lock's
+    lines are settling the others are being written or read. The cycles are paced by
+    a single scheduler shared with every lock, so a key on any of them brings the
+    whole loop back to the full scan rate.
+    Edge detect mode blocks on a single lock's data lines, so it can't be used here.
+    """
+
+    def __init__(self, logger, scheduler=None):
+        self.logger = logger
+        self.scheduler = ScanScheduler() if scheduler is None else scheduler
+        """Paces the scan cycles of every lock."""
+        self.locks = []
+        """The interface wrapper of each lock, in scan order."""
+        self._run_loop = True
+
+    def add_lock(self, reg_pin, io_pin, data_pins, **kwargs):
+        """
+        Creates the interface wrapper for a lock on the given pins (any other
+        InterfaceWrapper arguments are passed on) and adds it to the scan loop.
+        """
+        if kwargs.get("edge_detect"):
+            raise ValueError("Edge detect mode can't be used with several locks")
+        for iface in self.locks:
+            used = [iface.gpio.reg.pin, iface.gpio.io.pin] + \
+                [iface.gpio.d(i).pin for i in range(iface.keypad.data_bits)]
+            if set(used) & set([reg_pin, io_pin] + list(data_pins)):
+                raise ValueError("Lock pins overlap with an existing lock")
+        iface = InterfaceWrapper(self.logger, edge_detect=False, scheduler=self.scheduler,
+                                 data_pins=data_pins, reg_pin=reg_pin, io_pin=io_pin,
+                                 settle_tracker=SettleTracker(), **kwargs)
+        self.locks.append(iface)
+        self.logger.log("added lock {} on pins reg {}, io {}, data {}",
+                        len(self.locks), reg_pin, io_pin, data_pins)
+        return iface
+
+    def scan_cycle(self):
+        """
+        Runs one scan cycle of every lock, interleaving their steps.
+        """
+        for iface in self.locks:
+            iface.stats.cycle()
+        for steps in zip(*(iface.scan_steps for iface in self.locks)):
+            for step in steps:
+                step()
+
+    def main_loop(self):
+        """
+        Starts up the shared scan loop, stopping on an exception or KeyboardInterrupt.
+        """
+        self.logger.log("Multi-lock main loop started with {} locks", len(self.locks))
+        self.scheduler.start()
+        try:
+            while self._run_loop:
+                if self.scheduler.wait():
+                    self.logger.logd("no key activity, dropped to idle scan rate")
+                self.scan_cycle()
+        except Exception as ex:
+            self.logger.loge(ex)
+        except KeyboardInterrupt:
+            self.logger.log("Beginning shutdown")
+
+    def cleanup(self):
+        """
+        Stops the scan loop. Each lock's interface wrapper is cleaned up on its own.
+        """
+        self._run_loop = False
@@ -0,0 +1,203 @@
+#! /usr/bin/env python3
+import collections
+import datetime
+import gzip
+import io
+import os
+import re
+import shutil
+import threading
+import traceback
+from clock import get_clock
+
+ROTATE_KEEP = 5  # rotated segments kept before the oldest are deleted
+
+
+class RotatingFile(io.TextIOBase):
+    """
+    A text file that is moved aside once it grows past max_size characters or is
+    max_age seconds old, and started afresh. The rotated segment is named with a
+    sequence number one past the highest segment already there, followed by the
+    time it was rotated (path.N.YYYYmmdd-HHMMSS), so names are never reused and
+    segments sort in the order they were rotated. Each one is then gzipped and the
+    oldest segments past the keep count deleted on a worker thread, so that the
+    writing thread only pays for a rename and an open. close waits for that work
+    to finish.
+    The age of an existing file is taken from started (given the file's first line,
+    returning its time.time() timestamp or None) if given, or else from the file's
+    modification time, so that restarting doesn't restart the age.
+    Everything else (read, seek, etc.) goes straight to the current file.
+    """
+
+    def __init__(self, path, mode="a", max_size=None, max_age=None, keep=None,
+                 compress=True, clock=None, started=None):
+        super().__init__()
+        self.path = path
+        self.mode = mode
+        self.max_size = max_size
+        self.max_age = max_age
+        self.keep = ROTATE_KEEP if keep is None else keep
+        self.compress = compress
+        self.clock = get_clock() if clock is None else clock
+        self.started = started
+        self.rotations = 0
+        self._lock = threading.Lock()  # held while writing or rotating
+        self._segments = collections.deque()  # rotated segments waiting for the worker
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self._pattern = re.compile(
+            re.escape(os.path.basename(path)) + r"\.(\d+)\.\d{8}-\d{6}(?:\.gz)?$")
+        self._sequence = max([self._segment_number(p) for p in self.segments()] + [0])
+        self._open()
+
+    def _segment_number(self, path):
+        return int(self._pattern.match(os.path.basename(path)).group(1))
+
+    def _start_time(self):
+        """
+        The time the existing file at the path was started (None if there isn't one).
+        """
+        if not os.path.isfile(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        if self.started is not None:
+            try:
+                with open(self.path) as f:
+                    started = self.started(f.readline())
+                if started is not None:
+                    return started
+            except Exception:
+                pass  # unreadable first line, so fall back to the modification time
+        return os.path.getmtime(self.path)
+
+    def _open(self):
+        started = self._start_time()
+        self._file = open(self.path, self.mode)
+        self._size = os.path.getsize(self.path)
+        self._opened = self.clock.time() if started is None else started
+
+    def _due(self):
+        if self.max_size is not None and self._size >= self.max_size:
+            return True
+        return self.max_age is not None and self.clock.time() - self._opened >= self.max_age
+
+    def write(self, s):
+        with self._lock:
+            written = self._file.write(s)
+            self._size += written
+            if self._due():
+                self._rotate()
+            return written
+
+    def rotate(self):
+        """
+        Moves the current file aside and starts a new one.
+        """
+        with self._lock:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._sequence += 1
+        segment = "{}.{}.{:%Y%m%d-%H%M%S}".format(
+            self.path, self._sequence, datetime.datetime.fromtimestamp(self.clock.time()))
+        os.rename(self.path, segment)
+        self._open()
+        self.rotations += 1
+        self._segments.append(segment)
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(
+                target=self._run, name="log-rotate", daemon=True)
+            self._thread.start()
+        self._wake.set()
+
+    def segments(self):
+        """
+        The paths of the rotated segments, oldest first.
+        """
+        folder = os.path.dirname(self.path) or "."
+        found = []
+        for name in os.listdir(folder):
+            match = self._pattern.match(name)
+            if match is not None:
+                found.append((int(match.group(1)),
+                              os.path.join(os.path.dirname(self.path), name)))
+        return [path for _, path in sorted(found)]
+
+    def _compress(self, segment):
+        with open(segment, "rb") as src, gzip.open(segment + ".gz.tmp", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(segment + ".gz.tmp", segment + ".gz")
+        os.remove(segment)
+
+    def _prune(self):
+        segments = self.segments()
+        for path in segments[:max(0, len(segments) - self.keep)]:
+            os.remove(path)
+
+    def _process(self):
+        while len(self._segments) > 0:
+            segment = self._segments.popleft()
+            try:
+                # may already have been pruned, if several were rotated at once
+                if self.compress and os.path.exists(segment):
+                    self._compress(segment)
+                self._prune()
+            except Exception:
+                traceback.print_exc()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            self._process()
+
+    def wait(self):
+        """
+        Stops the worker thread, finishing off any rotated segments first.
+        """
+        if self._running:
+            self._running = False
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self._process()
+
+    def flush(self):
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+        self.wait()
+        super().close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def readable(self):
+        return self._file.readable()
+
+    def writable(self):
+        return self._file.writable()
+
+    def seekable(self):
+        return self._file.seekable()
+
+    def fileno(self):
+        return self._file.fileno()
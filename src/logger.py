@@ -1,5 +1,12 @@
 #! /usr/bin/env python3
+import collections
 import datetime
+import functools
+import signal
+import threading
+import time
+import traceback
+from log_rotate import RotatingFile
 
 TRACE = 4
 """"The trace tracing level"""
@@ -18,9 +25,110 @@ _trace_names = {
     WARNING: "WARN",
     ERROR: "CRIT"
 }
+OVERFLOW_BLOCK = "block"
+"""Wait for the writer thread to make room in the queue"""
+OVERFLOW_DROP = "drop"
+"""Drop the new record"""
+OVERFLOW_DROP_LOWEST = "drop-lowest"
+"""Drop the queued record of the least important level, if below the new record's"""
+LOG_QUEUE_SIZE = 1024  # records that can be waiting for the writer thread
+LOG_FLUSH_SIZE = 64  # records waiting before the writer thread writes them straight away
+LOG_FLUSH_INTERVAL = 0.5  # seconds the writer thread lets records wait otherwise
+TRACE_BUFFER_SIZE = 2048  # disabled log records kept in memory for a dump
+# the level of each log method that can be switched off
+_level_methods = {
+    "logt": TRACE,
+    "logd": DEBUG,
+    "log": INFO,
+    "logw": WARNING
+}
+
+
+def _disabled(*args, **kwargs):
+    pass
+
+
+def _line_time(line):
+    """
+    The timestamp of a line in the default log format (None if it isn't in it),
+    for the age of a rotated log.
+    """
+    try:
+        return datetime.datetime.strptime(line[6:28], "[%Y-%m-%d][%H:%M:%S]").timestamp()
+    except ValueError:
+        return None
+
+
+class Lazy:
+    """
+    A log argument that is only worked out if the line is actually written,
+    e.g. logger.logd("inputs: {}", Lazy(", ".join, inputs)).
+    """
+    __slots__ = ["func", "args"]
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __format__(self, spec):
+        return format(self.func(*self.args), spec)
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class TraceBuffer:
+    """
+    A ring buffer of the last size log records, each kept as an unformatted
+    (level, monotonic time, line, args) tuple in a preallocated list, so recording
+    one is just a tuple and a store. Records are only formatted if the buffer is
+    dumped. Records from threads logging at the same moment may overwrite each other.
+    """
+    __slots__ = ["size", "_records", "_next"]
+
+    def __init__(self, size=None):
+        self.size = TRACE_BUFFER_SIZE if size is None else size
+        self._records = [None] * self.size
+        self._next = 0  # total records ever made
+
+    def __len__(self):
+        return min(self._next, self.size)
+
+    def record(self, level, line, *args):
+        i = self._next
+        self._records[i % self.size] = (level, time.monotonic(), line, args)
+        self._next = i + 1
+
+    def take(self):
+        """
+        Empties the buffer, returning the records oldest first.
+        """
+        end = self._next
+        start = max(0, end - self.size)
+        records = [self._records[i % self.size] for i in range(start, end)]
+        self._records = [None] * self.size
+        self._next = 0
+        return records
 
 
 class Logger:
+    """
+    Writes log lines at or below the trace level. Whenever the trace level is set,
+    the log methods for the levels above it are replaced with a function that does
+    nothing, so a disabled log call costs no more than an empty call.
+    In background mode a log call only queues the record, and a writer thread
+    formats and writes the records in batches, once flush_size are waiting or
+    flush_interval seconds after the first one was queued. If the queue is full the
+    overflow policy decides what happens to the new record. Since the arguments are
+    only formatted on the writer thread, they shouldn't be changed after logging.
+    cleanup writes everything still queued before closing the file.
+    If given a trace buffer, the disabled log methods record into it instead of
+    doing nothing, and the buffer is dumped into the log when loge is called, on
+    dump_signal or when dump_traces is called.
+    If given rotation (a dict of RotatingFile arguments, e.g. {"max_size": 1 << 20}),
+    the log file is rotated and compressed as it grows.
+    """
+
     @property
     def trace_level(self):
         return self._trace_lvl
@@ -29,6 +137,24 @@ class Logger:
     def trace_level(self, value):
         assert isinstance(value, int)
         self._trace_lvl = value
+        for name, level in _level_methods.items():
+            if level <= value:
+                self.__dict__.pop(name, None)  # back to the class method
+            elif self._trace_buf is not None:
+                setattr(self, name, functools.partial(self._trace_buf.record, level))
+            else:
+                setattr(self, name, _disabled)
+
+    @property
+    def trace_buffer(self):
+        """The TraceBuffer that the disabled levels are recorded into (None for none)."""
+        return self._trace_buf
+
+    @trace_buffer.setter
+    def trace_buffer(self, value):
+        assert value is None or isinstance(value, TraceBuffer)
+        self._trace_buf = value
+        self.trace_level = self._trace_lvl
 
     @property
     def log_format(self):
@@ -41,27 +167,147 @@ class Logger:
         assert isinstance(value, str)
         self._log_fmt = value
 
-    def __init__(self, log_path):
-        self._trace_lvl = INFO
+    def __init__(self, log_path, background=False, queue_size=None, overflow=None,
+                 flush_size=None, flush_interval=None, rotation=None):
+        self._trace_buf = None
+        self.trace_level = INFO
         self._log_fmt = "[{0}][{1:%Y-%m-%d}][{1:%H:%M:%S}] {2}"
-        self._out_file = open(log_path, mode='a')
+        if rotation is None:
+            self._out_file = open(log_path, mode='a')
+        else:
+            rotation = dict(rotation)
+            rotation.setdefault("started", _line_time)
+            self._out_file = RotatingFile(log_path, 'a', **rotation)
+        self.queue_size = LOG_QUEUE_SIZE if queue_size is None else queue_size
+        self.overflow = OVERFLOW_BLOCK if overflow is None else overflow
+        if self.overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP, OVERFLOW_DROP_LOWEST):
+            raise ValueError("Unknown overflow policy '{}'".format(self.overflow))
+        self.flush_size = LOG_FLUSH_SIZE if flush_size is None else flush_size
+        self.flush_interval = LOG_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._queue = collections.deque()  # of (level, time, line, args)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # keeps the batches in order
+        self._background = False
+        self._thread = None
+        self.dropped = 0
+        """The number of records dropped because the queue was full."""
+        self.max_depth = 0
+        """The deepest the queue has been."""
+        if background:
+            self._background = True
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    @property
+    def background(self):
+        return self._background
 
     def _check_level(self, required):
         if required <= self.trace_level:
             return True
         return False
 
-    def _write_log(self, level, line, *args):
-        if not self._check_level(level):
-            return
+    def _format(self, level, now, line, args):
         to_write = ""
         if len(args) == 0:
             to_write = line
         else:
             to_write = line.format(*args)
-        self._out_file.write(self.log_format.format(
-            _trace_names[level], datetime.datetime.now(), to_write) + "\n")
-    
+        return self.log_format.format(_trace_names[level], now, to_write) + "\n"
+
+    def _write_log(self, level, line, *args):
+        if not self._check_level(level):
+            return
+        self._emit(level, time.time(), line, args)
+
+    def _emit(self, level, stamp, line, args):
+        """
+        Writes a record (or queues it in background mode), whatever the trace level.
+        """
+        if self._background and self._enqueue((level, stamp, line, args)):
+            return
+        self._out_file.write(self._format(
+            level, datetime.datetime.fromtimestamp(stamp), line, args))
+
+    def _enqueue(self, record):
+        """
+        Queues a record for the writer thread, applying the overflow policy if the
+        queue is full. Returns False if the writer has stopped, so the record
+        should be written straight away.
+        """
+        with self._cond:
+            if not self._background:
+                return False
+            if len(self._queue) >= self.queue_size:
+                if self.overflow == OVERFLOW_BLOCK:
+                    while self._background and len(self._queue) >= self.queue_size:
+                        self._cond.wait()
+                    if not self._background:
+                        return False
+                elif self.overflow == OVERFLOW_DROP or not self._drop_lowest(record[0]):
+                    self.dropped += 1
+                    return True
+            self._queue.append(record)
+            depth = len(self._queue)
+            if depth > self.max_depth:
+                self.max_depth = depth
+            if depth == 1 or depth >= self.flush_size:
+                self._cond.notify_all()
+            return True
+
+    def _drop_lowest(self, level):
+        """
+        Drops the oldest of the least important queued records, if it is less
+        important than the given level. Returns whether one was dropped.
+        """
+        lowest = None
+        for i, record in enumerate(self._queue):
+            if record[0] > level and (lowest is None or record[0] > self._queue[lowest][0]):
+                lowest = i
+        if lowest is None:
+            return False
+        del self._queue[lowest]
+        self.dropped += 1
+        return True
+
+    def _drain(self):
+        """
+        Writes out everything queued so far.
+        """
+        with self._write_lock:
+            with self._cond:
+                records = list(self._queue)
+                self._queue.clear()
+                self._cond.notify_all()  # wakes anything blocked on a full queue
+            if len(records) == 0:
+                return
+            for level, stamp, line, args in records:
+                try:
+                    self._out_file.write(self._format(
+                        level, datetime.datetime.fromtimestamp(stamp), line, args))
+                except Exception:
+                    traceback.print_exc()
+            self._out_file.flush()
+
+    def _run(self):
+        running = True
+        while running:
+            with self._cond:
+                while self._background and len(self._queue) == 0:
+                    self._cond.wait()
+                if self._background and len(self._queue) < self.flush_size:
+                    self._cond.wait(self.flush_interval)
+                running = self._background
+            self._drain()
+
+    def flush(self):
+        """
+        Writes out everything logged so far.
+        """
+        if self._background:
+            self._drain()
+        self._out_file.flush()
+
     def logt(self, line, *args):
         self._write_log(TRACE, line, *args)
 
@@ -75,7 +321,48 @@ class Logger:
         self._write_log(WARNING, line, *args)
 
     def loge(self, exception, msg="An exception occured, please talk to developer"):
+        self.dump_traces("error")
         self._write_log(ERROR, "{0}\n{1}", msg, exception)
 
+    def _format_traces(self, records):
+        offset = time.time() - time.monotonic()  # to turn the record times into wall times
+        return "".join(self._format(
+            level, datetime.datetime.fromtimestamp(stamp + offset), line, args)
+            for level, stamp, line, args in records)[:-1]
+
+    def dump_traces(self, reason="on demand"):
+        """
+        Writes the records in the trace buffer into the log as a single entry and
+        empties the buffer. Returns the number of records written.
+        """
+        if self._trace_buf is None or len(self._trace_buf) == 0:
+            return 0
+        records = self._trace_buf.take()
+        self._emit(WARNING, time.time(), "trace buffer dump ({}), {} records:\n{}",
+                   (reason, len(records), Lazy(self._format_traces, records)))
+        return len(records)
+
+    def dump_signal(self, signum=signal.SIGUSR1):
+        """
+        Makes the given signal dump the trace buffer. Must be called from the main thread.
+        """
+        def handler(signum, frame):
+            # dumped from another thread, as the main thread may be part way through logging
+            threading.Thread(target=self.dump_traces, args=("signal",),
+                             name="trace-dump", daemon=True).start()
+        signal.signal(signum, handler)
+
     def cleanup(self):
+        """
+        Stops the writer thread (if in background mode), writing out everything still
+        queued, and closes the log file. Anything logged afterwards is written
+        straight away.
+        """
+        if self._thread is not None:
+            with self._cond:
+                self._background = False
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+            self._drain()
         self._out_file.close()
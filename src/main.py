@@ -3,13 +3,36 @@
 import code_lock
 from event import *
 from interface_wrapper import InterfaceWrapper
+import interface_wrapper
+from lock_controller import LockController
+from async_runtime import AsyncRuntime
 from logger import *
 from stdout import StdoutOverwrite
 
 import traceback
 
 LOG_FILE = "events.log"
+LOG_ROTATION = {"max_size": 1 << 20, "keep": 5}  # RotatingFile arguments (None to never rotate)
 DEMO_MODE = False
+ASYNC_RUNTIME = False  # run the scan loop, timeouts and handlers on one asyncio loop
+BACKGROUND_LOG = True  # write the log from its own thread, so logging never waits on the SD card
+TRACE_BUFFER = 2048  # disabled log records kept in memory and dumped on an error or SIGUSR1 (0 for none)
+PROFILE_EVENTS = False  # time every event handler, writing the profile out on exit
+EVENT_PROFILE_FILE = "event_profile.txt"
+# The locks driven by this controller, each on its own pins with its own files.
+# With more than one lock, they are scanned together by a LockController.
+LOCKS = [
+    {
+        "reg_pin": interface_wrapper.LINE_REG_CLK,
+        "io_pin": interface_wrapper.LINE_IO_SWTICH,
+        "data_pins": interface_wrapper.LINES_DATA,
+        "pword_file": code_lock.PWORD_FILE,
+        "access_log_file": code_lock.ACCESS_LOG_FILE,
+        "access_log_rotation": {"max_age": 7 * 24 * 3600, "keep": 8},
+        "gnuplot_file": code_lock.GNUPLOT_FILE,
+        "graph_file": code_lock.GRAPH_FILE,
+    },
+]
 DEMO_DIGIT_INPUT_DIGITS_IMM = [("1", 2), ("2", 2), ("5", 2),
                                ("4", 2),
                                ("8", 2),
@@ -38,16 +61,49 @@ class App:
         """
         Main entry point of application
         """
-        self._cleanup_event = Event()
+        if PROFILE_EVENTS:
+            enable_profiling()
+        self._cleanup_event = Event(name="cleanup")
         self.stdout = StdoutOverwrite()
-        self.logger = Logger(LOG_FILE)
+        self.logger = Logger(LOG_FILE, background=BACKGROUND_LOG, rotation=LOG_ROTATION)
         self.logger.trace_level = INFO
-        self.iface = InterfaceWrapper(self.logger, DEMO_MODE)
-        self.internal = code_lock.CodeLock(
-            self.iface, self.logger, self.stdout, DEMO_MODE)
-        self.wrap(self.stdout, self.logger, self.iface, self.internal)
+        if TRACE_BUFFER > 0:
+            self.logger.trace_buffer = TraceBuffer(TRACE_BUFFER)
+            self.logger.dump_signal()
+        self.controller = None
+        self.locks = []
+        self.runtime = None
+        if ASYNC_RUNTIME and not DEMO_MODE:
+            self.runtime = AsyncRuntime(self.logger)
+            self.runtime.install()  # before any timeouts are made
+        if DEMO_MODE or len(LOCKS) == 1:
+            self.iface = InterfaceWrapper(self.logger, DEMO_MODE,
+                                          data_pins=LOCKS[0]["data_pins"],
+                                          reg_pin=LOCKS[0]["reg_pin"],
+                                          io_pin=LOCKS[0]["io_pin"])
+            self.internal = self.create_lock(self.iface, LOCKS[0])
+        else:
+            self.controller = LockController(self.logger)
+            self.wrap(self.controller)
+            for cfg in LOCKS:
+                iface = self.controller.add_lock(
+                    cfg["reg_pin"], cfg["io_pin"], cfg["data_pins"])
+                self.create_lock(iface, cfg)
+            self.iface, self.internal = self.locks[0]
+        self.wrap(self.stdout)
+        for iface, internal in self.locks:
+            self.wrap(iface, internal)
+            if self.runtime is not None:
+                self.runtime.attach(iface)
+        if self.runtime is not None:
+            self.wrap(self.runtime)
+        self.wrap(self.logger)  # last, so that everything logged on cleanup is written
 
-        if not DEMO_MODE:
+        if self.runtime is not None:
+            self.runtime.run(self.iface if self.controller is None else self.controller)
+        elif self.controller is not None:
+            self.controller.main_loop()  # this cannot except unless logger causes an issue
+        elif not DEMO_MODE:
             self.iface.main_loop()  # this cannot except unless logger causes an issue
         else:
             import time
@@ -81,6 +137,18 @@ class App:
             print(ex)
             for e in ex._exc:
                 print(e)
+        if PROFILE_EVENTS:
+            with open(EVENT_PROFILE_FILE, "w") as f:
+                f.write(profile_report() + "\n")
+
+    def create_lock(self, iface, cfg):
+        internal = code_lock.CodeLock(
+            iface, self.logger, self.stdout, DEMO_MODE, pword_file=cfg["pword_file"],
+            access_log_file=cfg["access_log_file"],
+            access_log_rotation=cfg.get("access_log_rotation"),
+            gnuplot_file=cfg["gnuplot_file"], graph_file=cfg["graph_file"])
+        self.locks.append((iface, internal))
+        return internal
 
     def wrap(self, *args):
         for c in args:
@@ -0,0 +1,88 @@
+#! /usr/bin/env python3
+OUTPUT_PULSES = 2  # register latches given to each output pulse
+OUTPUT_SLOT_BUDGET = 1  # output slots allowed in a row before a keypad row must be scanned
+
+# Priorities (lower goes first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class OutputQueue:
+    """
+    Queues the pulses for the decoder outputs (LEDs, buzzer) that share the data lines
+    with the keypad rows. Each write phase asks for the next slot, which is either an
+    output to latch or None for a keypad row. Only OUTPUT_SLOT_BUDGET output slots are
+    given out before a keypad row slot, so keys are still scanned while feedback is
+    being driven. Requests for an output that is already queued are merged.
+    """
+
+    def __init__(self, slot_budget=None):
+        self.slot_budget = OUTPUT_SLOT_BUDGET if slot_budget is None else slot_budget
+        self._pending = {}  # output -> [priority, order, pulses left]
+        self._traces = {}  # output -> key trace id that asked for it
+        self._order = 0
+        self._run = 0  # output slots given out since the last row slot
+        self.merged = 0
+        """The number of requests merged into an already queued one."""
+        self.output_slots = 0
+        self.row_slots = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def request(self, output, priority=PRIORITY_NORMAL, pulses=None, trace=None):
+        """
+        Queues pulses for the output. If it is already queued, the remaining pulses
+        are topped back up and the higher of the two priorities is kept.
+        The trace is the id of the key trace to mark when the output is first latched.
+        """
+        if pulses is None:
+            pulses = OUTPUT_PULSES
+        if trace is not None:
+            self._traces[output] = trace
+        if output in self._pending:
+            p = self._pending[output]
+            p[0] = min(p[0], priority)
+            p[2] = max(p[2], pulses)
+            self.merged += 1
+        else:
+            self._pending[output] = [priority, self._order, pulses]
+            self._order += 1
+
+    def pending(self, output):
+        """
+        Gets the number of pulses left for the output.
+        """
+        if output not in self._pending:
+            return 0
+        return self._pending[output][2]
+
+    def next_slot(self):
+        """
+        Gets the output to latch in the next write phase, or None if it should be
+        given to the keypad.
+        """
+        if len(self._pending) == 0 or self._run >= self.slot_budget:
+            self._run = 0
+            self.row_slots += 1
+            return None
+        output = min(self._pending, key=lambda o: self._pending[o][:2])
+        p = self._pending[output]
+        p[2] -= 1
+        if p[2] <= 0:
+            del self._pending[output]
+        self._run += 1
+        self.output_slots += 1
+        return output
+
+    def take_trace(self, output):
+        """
+        Gets (and forgets) the key trace id waiting on the output, if there is one.
+        """
+        return self._traces.pop(output, None)
+
+    def clear(self):
+        self._pending = {}
+        self._traces = {}
+        self._run = 0
@@ -0,0 +1,122 @@
+#! /usr/bin/env python3
+from clock import get_clock
+from gpio_wrapper import precise_sleep
+
+# A cycle takes about 70ms with the settle waits (about 14 cycles per second), so
+# the rates are set below that for the scheduler to have time to pace them.
+SCAN_RATE = 12  # target scan cycles per second while in use
+IDLE_SCAN_RATE = 6  # scan cycles per second once idle
+IDLE_AFTER = 10  # seconds without key activity before going idle
+
+
+class ScanScheduler:
+    """
+    Paces the scan loop against a monotonic deadline. Each call to wait sleeps
+    until the next cycle is due, and records how late it woke up (the jitter).
+    After IDLE_AFTER seconds with no key activity it drops to the idle scan rate,
+    and goes back to the full rate as soon as activity is reported.
+    The deadlines and sleeps use the clock (the module clock if not given), the
+    same as the settle waits.
+    """
+
+    def __init__(self, rate=None, idle_rate=None, idle_after=None, clock=None):
+        self.rate = SCAN_RATE if rate is None else rate
+        self.idle_rate = IDLE_SCAN_RATE if idle_rate is None else idle_rate
+        self.idle_after = IDLE_AFTER if idle_after is None else idle_after
+        self._clock = clock
+        self._deadline = None
+        self._last_activity = self.clock.perf_counter()
+        self._idle = False
+        self.cycles = 0
+        """The number of cycles that have been waited for."""
+        self.overruns = 0
+        """The number of cycles that started after their deadline had already passed."""
+        self.jitter_max = 0
+        self.jitter_total = 0
+
+    @property
+    def clock(self):
+        return get_clock() if self._clock is None else self._clock
+
+    @property
+    def idle(self):
+        return self._idle
+
+    @property
+    def period(self):
+        return 1 / (self.idle_rate if self._idle else self.rate)
+
+    @property
+    def jitter_mean(self):
+        if self.cycles == 0:
+            return 0
+        return self.jitter_total / self.cycles
+
+    def start(self):
+        """
+        Starts the deadlines from the current time.
+        """
+        self._deadline = self.clock.perf_counter()
+        self._last_activity = self._deadline
+
+    def activity(self):
+        """
+        Reports key activity, switching back to the full scan rate if idle.
+        Returns whether the rate changed.
+        """
+        now = self.clock.perf_counter()
+        self._last_activity = now
+        if not self._idle:
+            return False
+        self._idle = False
+        # don't make the next cycle wait out the rest of the idle period
+        if self._deadline is not None and self._deadline > now:
+            self._deadline = now
+        return True
+
+    def wait(self):
+        """
+        Waits until the next cycle is due. Returns whether the rate changed
+        (from dropping to idle).
+        """
+        changed, delay = self.advance()
+        if delay > 0:
+            precise_sleep(delay, self._clock)
+        self.woke()
+        return changed
+
+    def advance(self):
+        """
+        Moves on to the next cycle's deadline without waiting for it, for loops that
+        do their own sleeping. Returns whether the rate changed and how long to sleep
+        for, and woke must be called once the sleep is over.
+        """
+        if self._deadline is None:
+            self.start()
+        now = self.clock.perf_counter()
+        changed = False
+        if not self._idle and now - self._last_activity >= self.idle_after:
+            self._idle = True
+            changed = True
+        self._deadline += self.period
+        if self._deadline < now:
+            # too late to make the deadline, start again from now rather than
+            # trying to catch up
+            self.overruns += 1
+            self._deadline = now
+            return changed, 0
+        return changed, self._deadline - now
+
+    def woke(self):
+        """
+        Records how late the cycle started.
+        """
+        jitter = self.clock.perf_counter() - self._deadline
+        self.cycles += 1
+        self.jitter_total += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+
+    def __repr__(self):
+        return "scan cycles: {}, overruns: {}, jitter mean: {:.3f}ms, max: {:.3f}ms".format(
+            self.cycles, self.overruns, self.jitter_mean * 1000, self.jitter_max * 1000)
@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+import time
+
+HISTOGRAM_BUCKETS = 24  # bucket n holds durations below 2^n microseconds
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Scan loop phases
+PHASE_WRITE = "write"
+PHASE_REGISTER = "register"
+PHASE_READ_SETUP = "read setup"
+PHASE_SAMPLE = "sample"
+PHASE_DISPATCH = "dispatch"
+PHASE_SETTLE = "settle"  # the settle waits, which the other phases leave out
+PHASES = [PHASE_WRITE, PHASE_REGISTER, PHASE_READ_SETUP, PHASE_SAMPLE, PHASE_DISPATCH,
+          PHASE_SETTLE]
+
+
+class Histogram:
+    """
+    A histogram of durations, using power of 2 microsecond buckets (the last one
+    catching everything larger) so that recording is cheap and the memory used is
+    fixed. Percentiles are given as the upper edge of the bucket they fall in
+    (capped to the largest duration seen).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buckets = [0] * (HISTOGRAM_BUCKETS + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, seconds):
+        us = int(seconds * 1000000)
+        bucket = us.bit_length()
+        if bucket > HISTOGRAM_BUCKETS:
+            bucket = HISTOGRAM_BUCKETS
+        self._buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        if self.count == 0:
+            return 0
+        return self.total / self.count
+
+    def percentile(self, p):
+        """
+        Gets the duration (in seconds) that p percent of the recorded durations are below.
+        """
+        if self.count == 0:
+            return 0
+        target = self.count * p / 100
+        seen = 0
+        for b in range(len(self._buckets)):
+            seen += self._buckets[b]
+            if seen >= target:
+                if b == HISTOGRAM_BUCKETS:  # overflow bucket
+                    return self.max
+                return min((1 << b) / 1000000, self.max)
+        return self.max
+
+    def percentiles(self, ps=DEFAULT_PERCENTILES):
+        return {p: self.percentile(p) for p in ps}
+
+
+class ScanStats:
+    """
+    Keeps a duration histogram for each phase of the scan loop, and counts the scan
+    cycles to give the cycle rate.
+    """
+
+    def __init__(self, phases=None):
+        self.histograms = {p: Histogram() for p in (PHASES if phases is None else phases)}
+        self.reset()
+
+    def reset(self):
+        for h in self.histograms.values():
+            h.reset()
+        self.cycles = 0
+        self._start = time.perf_counter()
+
+    def record(self, phase, seconds):
+        self.histograms[phase].record(seconds)
+
+    def cycle(self):
+        self.cycles += 1
+
+    @property
+    def cycles_per_second(self):
+        elapsed = time.perf_counter() - self._start
+        if elapsed <= 0:
+            return 0
+        return self.cycles / elapsed
+
+    def stats(self, ps=DEFAULT_PERCENTILES):
+        """
+        Gets the count, mean, max and percentiles (in seconds) of each phase,
+        along with the cycle count and rate.
+        """
+        phases = {}
+        for name, h in self.histograms.items():
+            phases[name] = {
+                "count": h.count,
+                "mean": h.mean,
+                "max": h.max,
+                "percentiles": h.percentiles(ps)
+            }
+        return {
+            "cycles": self.cycles,
+            "cycles_per_second": self.cycles_per_second,
+            "phases": phases
+        }
+
+    def summary(self, ps=DEFAULT_PERCENTILES):
+        """
+        Gets a printable summary of the stats, with times in milliseconds.
+        """
+        st = self.stats(ps)
+        lines = ["scan cycles: {}, {:.1f} per second".format(
+            st["cycles"], st["cycles_per_second"])]
+        for name, ph in st["phases"].items():
+            lines.append("{}: n={} mean={:.3f} max={:.3f} {}".format(
+                name, ph["count"], ph["mean"] * 1000, ph["max"] * 1000,
+                " ".join("p{}={:.3f}".format(p, v * 1000) for p, v in ph["percentiles"].items())))
+        return "\n".join(lines)
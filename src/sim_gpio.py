@@ -0,0 +1,353 @@
+#! /usr/bin/env python3
+"""
+A simulated stand-in for the RPi.GPIO module that models the lock hardware:
+the flip-flop latched by the register clock line, the 3-bit decoder driving
+the keypad rows, LEDs and buzzer, the 3-state switch in front of the keypad
+columns, and the keypad matrix itself.
+
+Calling install() puts this module into sys.modules as RPi.GPIO, so that
+gpio_wrapper and interface_wrapper can be run unmodified on any machine.
+"""
+import random
+import sys
+import threading
+from clock import get_clock
+
+# RPi.GPIO constants
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+# default wiring (mirrors interface_wrapper)
+SIM_LINE_REG_CLK = 14
+SIM_LINE_IO_SWITCH = 15
+SIM_LINES_DATA = [10, 9, 11]
+SIM_KEYPAD = [
+    ["1", "2", "3"],
+    ["4", "5", "6"],
+    ["7", "8", "9"],
+    ["*", "0", "#"],
+]
+SIM_OUTPUT_NAMES = {4: "green", 5: "red", 6: "buzzer"}
+
+# default timing model (seconds)
+SIM_PROPAGATION_DELAY = 0.0001  # flip-flop + decoder settle after a clock edge
+SIM_SWITCH_DELAY = 0.0001  # 3-state switch enable/disable
+SIM_BOUNCE_TIME = 0.002  # contact bounce after a key press or release
+
+
+class SimCircuit:
+    """
+    The simulated hardware. All times are taken from the clock's monotonic time
+    (the module clock if not given), and a line's level only changes once its
+    propagation delay has passed.
+    """
+
+    def __init__(self, reg=SIM_LINE_REG_CLK, io=SIM_LINE_IO_SWITCH, data=None,
+                 keypad=None, outputs=None, propagation_delay=SIM_PROPAGATION_DELAY,
+                 switch_delay=SIM_SWITCH_DELAY, bounce_time=SIM_BOUNCE_TIME, seed=None,
+                 clock=None):
+        self.reg_pin = reg
+        self.io_pin = io
+        self.data_pins = list(SIM_LINES_DATA if data is None else data)
+        self.keypad = SIM_KEYPAD if keypad is None else keypad
+        self.outputs = dict(SIM_OUTPUT_NAMES if outputs is None else outputs)
+        self.propagation_delay = propagation_delay
+        self.switch_delay = switch_delay
+        self.bounce_time = bounce_time
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._lock = threading.RLock()
+
+        self.mode = None
+        self.warnings = True
+        self._directions = {}  # pin -> IN/OUT
+        self._levels = {}  # pin -> driven output level
+        self._edge_detect = {}  # pin -> (edge, callback)
+        self._edge_last = {}  # pin -> last level reported to edge detection
+        # (change time, old value, new value) for delayed signals
+        self._latched = (0.0, 0, 0)
+        self._switch = (0.0, False, False)
+        self._key = None  # (row, column, press time) of the held key
+        self._released = None  # (row, column, release time) for bounce
+
+        self.latch_count = 0
+        """The number of rising edges on the register clock line."""
+        self.pulses = {name: 0 for name in self.outputs.values()}
+        """The number of times each monostable output has been triggered."""
+        self.gpio_calls = 0
+        """The total number of RPi.GPIO calls made against the circuit."""
+
+    @property
+    def pins(self):
+        """The pins wired to the circuit."""
+        return [self.reg_pin, self.io_pin] + self.data_pins
+
+    @property
+    def clock(self):
+        return get_clock() if self._clock is None else self._clock
+
+    # helpers
+    def _now(self):
+        return self.clock.monotonic()
+
+    @staticmethod
+    def _delayed(signal, delay, now):
+        changed, old, new = signal
+        return new if now - changed >= delay else old
+
+    def key_position(self, key):
+        for r in range(len(self.keypad)):
+            if key in self.keypad[r]:
+                return r, self.keypad[r].index(key)
+        raise KeyError("Key {} not on keypad".format(key))
+
+    def latched_output(self, now=None):
+        """The decoder output that is currently pulled low."""
+        return self._delayed(self._latched, self.propagation_delay,
+                             self._now() if now is None else now)
+
+    def switch_enabled(self, now=None):
+        return self._delayed(self._switch, self.switch_delay,
+                             self._now() if now is None else now)
+
+    def _contact(self, row, column, now):
+        """Whether the key contact at the position is closed, including bounce."""
+        for held, closed in ((self._key, True), (self._released, False)):
+            if held is None or held[0] != row or held[1] != column:
+                continue
+            since = now - held[2]
+            if since < self.bounce_time:
+                return self._random.random() < 0.5
+            return closed
+        return False
+
+    def _column_level(self, column, now):
+        row = self.latched_output(now)
+        if row >= len(self.keypad) or column >= len(self.keypad[row]):
+            return HIGH
+        return LOW if self._contact(row, column, now) else HIGH
+
+    def level(self, pin, now=None):
+        """The level currently seen on the pin."""
+        now = self._now() if now is None else now
+        if self._directions.get(pin) == OUT:
+            return self._levels.get(pin, LOW)
+        if pin in self.data_pins and self.switch_enabled(now):
+            return self._column_level(self.data_pins.index(pin), now)
+        return HIGH  # floating lines read as pulled up
+
+    def _data_value(self):
+        value = 0
+        for i in range(len(self.data_pins)):
+            if self._levels.get(self.data_pins[i], LOW):
+                value |= 1 << i
+        return value
+
+    def _check_edges(self):
+        now = self._now()
+        fire = []
+        for pin, (edge, callback) in list(self._edge_detect.items()):
+            lvl = self.level(pin, now)
+            last = self._edge_last.get(pin, lvl)
+            self._edge_last[pin] = lvl
+            if lvl == last:
+                continue
+            if edge == BOTH or (edge == RISING and lvl) or (edge == FALLING and not lvl):
+                fire.append((callback, pin))
+        for callback, pin in fire:
+            if callback is not None:
+                callback(pin)
+
+    # RPi.GPIO API
+    def setwarnings(self, flag):
+        self.warnings = flag
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction, pull_up_down=PUD_OFF, initial=None):
+        self.gpio_calls += 1
+        with self._lock:
+            # like the real chip, the output latch keeps its level while the
+            # pin is an input
+            self._directions[pin] = direction
+            if direction == OUT and initial is not None:
+                self._levels[pin] = int(bool(initial))
+        self._check_edges()
+
+    def output(self, pin, value):
+        self.gpio_calls += 1
+        value = int(bool(value))
+        with self._lock:
+            if self._directions.get(pin) != OUT:
+                raise RuntimeError(
+                    "The GPIO channel has not been set up as an OUTPUT")
+            old = self._levels.get(pin, LOW)
+            self._levels[pin] = value
+            now = self._now()
+            if pin == self.reg_pin and value and not old:
+                self._latch(now)
+            elif pin == self.io_pin:
+                # the switch is enabled while the io line is low
+                self._switch = (now, self.switch_enabled(now), not value)
+        self._check_edges()
+
+    def _latch(self, now):
+        value = self._data_value()
+        self._latched = (now, self.latched_output(now), value)
+        self.latch_count += 1
+        if value in self.outputs:
+            self.pulses[self.outputs[value]] += 1
+
+    def input(self, pin):
+        self.gpio_calls += 1
+        with self._lock:
+            return self.level(pin)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.gpio_calls += 1
+        with self._lock:
+            if self._directions.get(pin) != IN:
+                raise RuntimeError(
+                    "You must setup() the GPIO channel as an input first")
+            if pin in self._edge_detect:
+                raise RuntimeError(
+                    "Conflicting edge detection already enabled for this GPIO channel")
+            self._edge_detect[pin] = (edge, callback)
+            self._edge_last[pin] = self.level(pin)
+
+    def remove_event_detect(self, pin):
+        self.gpio_calls += 1
+        with self._lock:
+            self._edge_detect.pop(pin, None)
+            self._edge_last.pop(pin, None)
+
+    def cleanup(self, pins=None):
+        with self._lock:
+            for pin in list(self._directions.keys()):
+                if pins is None or pin in pins:
+                    self._directions.pop(pin)
+                    self._levels.pop(pin, None)
+                    self._edge_detect.pop(pin, None)
+
+    # simulation controls
+    def press(self, key):
+        """Presses and holds the given key."""
+        row, column = self.key_position(key)
+        with self._lock:
+            self._key = (row, column, self._now())
+            self._released = None
+        self._check_edges()
+
+    def release(self):
+        """Releases whichever key is held."""
+        with self._lock:
+            if self._key is not None:
+                self._released = (self._key[0], self._key[1], self._now())
+            self._key = None
+        self._check_edges()
+
+    @property
+    def held_key(self):
+        if self._key is None:
+            return None
+        return self.keypad[self._key[0]][self._key[1]]
+
+
+circuit = SimCircuit()
+"""The circuit that the module level RPi.GPIO functions act on."""
+extra_circuits = []
+"""Further circuits on their own pins (for running several locks)."""
+
+
+def reset(**kwargs):
+    """
+    Replaces the module circuit with a new one built from the given arguments,
+    and removes any extra circuits.
+    """
+    global circuit
+    circuit = SimCircuit(**kwargs)
+    extra_circuits.clear()
+    return circuit
+
+
+def add_circuit(**kwargs):
+    """
+    Adds another circuit built from the given arguments. Its pins must not overlap
+    with any other circuit's.
+    """
+    c = SimCircuit(**kwargs)
+    for other in [circuit] + extra_circuits:
+        if set(c.pins) & set(other.pins):
+            raise ValueError("Circuit pins overlap with an existing circuit")
+    extra_circuits.append(c)
+    return c
+
+
+def _circuit_for(pin):
+    for c in extra_circuits:
+        if pin in c.pins:
+            return c
+    return circuit
+
+
+def setwarnings(flag):
+    for c in [circuit] + extra_circuits:
+        c.setwarnings(flag)
+
+
+def setmode(mode):
+    for c in [circuit] + extra_circuits:
+        c.setmode(mode)
+
+
+def setup(pin, direction, pull_up_down=PUD_OFF, initial=None):
+    _circuit_for(pin).setup(pin, direction, pull_up_down, initial)
+
+
+def output(pin, value):
+    _circuit_for(pin).output(pin, value)
+
+
+def input(pin):
+    return _circuit_for(pin).input(pin)
+
+
+def add_event_detect(pin, edge, callback=None, bouncetime=None):
+    _circuit_for(pin).add_event_detect(pin, edge, callback, bouncetime)
+
+
+def remove_event_detect(pin):
+    _circuit_for(pin).remove_event_detect(pin)
+
+
+def cleanup(pins=None):
+    for c in [circuit] + extra_circuits:
+        c.cleanup(pins)
+
+
+def install():
+    """
+    Registers this module as RPi.GPIO (unless the real one is already imported).
+    """
+    import types
+    if "RPi.GPIO" in sys.modules:
+        return sys.modules["RPi.GPIO"]
+    pkg = sys.modules.get("RPi")
+    if pkg is None:
+        pkg = types.ModuleType("RPi")
+        pkg.__path__ = []
+        sys.modules["RPi"] = pkg
+    pkg.GPIO = sys.modules[__name__]
+    sys.modules["RPi.GPIO"] = sys.modules[__name__]
+    return sys.modules[__name__]
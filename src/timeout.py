@@ -1,21 +1,70 @@
 #! /usr/bin/env python3
 import threading
 import event
+from clock import get_clock
+from timer_wheel import TimerWheel
+
+
+class ThreadTimerScheduler(object):
+    """
+    Runs each timeout on its own threading.Timer.
+    """
+
+    def timer(self, length, callback):
+        """
+        Creates an unstarted timer that calls the callback once the length has passed.
+        The timer must have start, cancel and is_alive methods and an interval.
+        """
+        return threading.Timer(length, callback)
+
+
+timer_wheel = TimerWheel()
+"""The timer wheel shared by every timeout by default."""
+_timer_scheduler = timer_wheel
+
+
+def use_timer_scheduler(scheduler):
+    """
+    Sets the scheduler that new timeouts create their timers with (None for the
+    shared timer wheel).
+    """
+    global _timer_scheduler
+    _timer_scheduler = timer_wheel if scheduler is None else scheduler
+
+
+def get_timer_scheduler():
+    return _timer_scheduler
 
 
 class Timeout(object):
     """
     The timeout class used to raise an event when the given time has elapsed.
+    The timers come from the given scheduler, or the clock's scheduler (for a
+    virtual clock), or the module one.
     """
 
-    def __init__(self, length):
+    def __init__(self, length, scheduler=None, clock=None):
         self.length = length
+        self._scheduler = scheduler
+        self._clock = clock
         self._setup_timer()
-        self.elapsed = event.Event()
+        self.elapsed = event.Event(name="{}({}).elapsed".format(type(self).__name__, length))
         """The elapsed event, fires when timeout completes."""
 
+    @property
+    def clock(self):
+        return get_clock() if self._clock is None else self._clock
+
+    def _new_timer(self, length, callback):
+        scheduler = self._scheduler
+        if scheduler is None:
+            scheduler = self.clock.scheduler
+        if scheduler is None:
+            scheduler = _timer_scheduler
+        return scheduler.timer(length, callback)
+
     def _setup_timer(self):
-        self._timer = threading.Timer(self.length, self._timed_out)
+        self._timer = self._new_timer(self.length, self._timed_out)
 
     def start(self):
         """
@@ -50,3 +99,125 @@ class Timeout(object):
         Cleans up class.
         """
         self.reset()
+
+
+class ProgressTimeout(Timeout):
+    """
+    A timeout that also fires its progress event at set points on the way, with the
+    point (a fraction of the length) that has been reached. Each point gets a timer
+    for exactly when it is due, so nothing has to poll to find out how far along
+    the timeout is.
+    """
+
+    def __init__(self, length, points, scheduler=None, clock=None):
+        self.points = sorted(p for p in points if 0 < p < 1)
+        """The fractions of the length to fire the progress event at."""
+        self._point_timer = None
+        self._run = 0  # bumped on every start and reset, so late point timers are ignored
+        self._started_at = None
+        self._next_point = 0
+        super().__init__(length, scheduler, clock)
+        self.progress = event.Event(name="{}({}).progress".format(type(self).__name__, length))
+        """The progress event, fires with the point reached."""
+
+    def start(self):
+        self._started_at = self.clock.monotonic()
+        self._next_point = 0
+        super().start()
+        self._arm_point()
+
+    def _arm_point(self):
+        if self._next_point >= len(self.points):
+            self._point_timer = None
+            return
+        due = self._started_at + self.points[self._next_point] * self.length
+        run = self._run
+        self._point_timer = self._new_timer(max(0, due - self.clock.monotonic()),
+                                            lambda: self._point_reached(run))
+        self._point_timer.start()
+
+    def _point_reached(self, run):
+        if run != self._run:
+            return
+        point = self.points[self._next_point]
+        self._next_point += 1
+        self._arm_point()
+        self.progress.fire(point)
+
+    def reset(self):
+        self._run += 1
+        if self._point_timer is not None:
+            self._point_timer.cancel()
+            self._point_timer = None
+        super().reset()
+
+
+class PeriodicTimeout(Timeout):
+    """
+    A timeout that keeps firing its elapsed event every length seconds once started.
+    The ticks are fixed to the start time on the monotonic clock, and the next tick is
+    set up before the handlers run, so neither timer lateness nor handler runtime makes
+    them drift. If a tick is so late that later ones were due, they are counted as
+    missed and the tick count skips ahead. It stops by itself after count ticks, or
+    at the last tick within duration seconds of starting (if either is given).
+    """
+
+    def __init__(self, length, count=None, duration=None, scheduler=None, clock=None):
+        self.count = count
+        self.duration = duration
+        self._run = 0  # bumped on every reset, so late ticks from a previous run are ignored
+        self._started_at = None
+        self.ticks = 0
+        """The number of ticks since the timeout was started (including missed ones)."""
+        self.missed = 0
+        """The number of ticks that were skipped because they were due at the same time as a later one."""
+        super().__init__(length, scheduler, clock)
+
+    @property
+    def last_tick(self):
+        """The tick the timeout will stop after (None if it doesn't stop)."""
+        last = self.count
+        if self.duration is not None:
+            # a small allowance so that e.g. 0.1 * 3 still counts as within 0.3
+            by_duration = int(self.duration / self.length + 1e-9)
+            last = by_duration if last is None else min(last, by_duration)
+        return last
+
+    @property
+    def time_left(self):
+        """The time until the last tick (None if it doesn't stop or hasn't been started)."""
+        if self.last_tick is None or self._started_at is None:
+            return None
+        return max(0, self._started_at + self.last_tick * self.length - self.clock.monotonic())
+
+    def _setup_timer(self):
+        run = self._run
+        self._timer = self._new_timer(self.length, lambda: self._tick(run))
+
+    def start(self):
+        self._started_at = self.clock.monotonic()
+        self.ticks = 0
+        self.missed = 0
+        super().start()
+
+    def _tick(self, run):
+        if run != self._run:
+            return
+        now = self.clock.monotonic()
+        tick = max(self.ticks + 1, int((now - self._started_at) / self.length))
+        last = self.last_tick
+        if last is not None:
+            tick = min(tick, last)
+        self.missed += tick - self.ticks - 1
+        self.ticks = tick
+        if last is None or tick < last:
+            due = self._started_at + (tick + 1) * self.length
+            self._timer = self._new_timer(max(0, due - now), lambda: self._tick(run))
+            self._timer.start()
+        else:
+            self._setup_timer()
+        self.elapsed.fire()
+
+    def reset(self):
+        self._run += 1
+        super().reset()
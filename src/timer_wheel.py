@@ -0,0 +1,154 @@
+#! /usr/bin/env python3
+import math
+import threading
+import time
+import traceback
+
+TIMER_TICK = 0.005  # seconds per slot of the wheel
+TIMER_SLOTS = 256  # slots in the wheel (one turn is TIMER_TICK * TIMER_SLOTS seconds)
+
+
+class WheelTimer:
+    """
+    A timer on a TimerWheel, with the same interface as threading.Timer.
+    """
+    __slots__ = ["interval", "function", "_wheel", "_slot", "_rounds", "_started",
+                 "_armed", "_cancelled"]
+
+    def __init__(self, wheel, interval, function):
+        self.interval = interval
+        self.function = function
+        self._wheel = wheel
+        self._slot = None
+        self._rounds = 0
+        self._started = False
+        self._armed = False
+        self._cancelled = False
+
+    def start(self):
+        if self._started:
+            raise RuntimeError("timers can only be started once")
+        self._started = True
+        self._wheel.arm(self)
+
+    def cancel(self):
+        self._wheel.cancel(self)
+
+    def is_alive(self):
+        return self._armed
+
+
+class TimerWheel:
+    """
+    A hashed timing wheel run by a single thread, which every timeout can share
+    instead of each one starting a thread. A timer is put in the slot its deadline
+    falls in, along with the number of full turns of the wheel to wait, so arming
+    and cancelling a timer are just a set add and discard. The thread moves on one
+    slot every tick, firing the timers in it that have no turns left. While there are
+    no timers the thread sleeps until one is armed rather than ticking.
+    Timers fire on the wheel thread, up to one tick after they are due.
+    """
+
+    def __init__(self, tick=None, slots=None):
+        self.tick = TIMER_TICK if tick is None else tick
+        self._slots = [set() for _ in range(TIMER_SLOTS if slots is None else slots)]
+        self._cond = threading.Condition()
+        self._origin = time.monotonic()  # the time of tick 0
+        self._current = 0  # the last tick processed
+        self._count = 0
+        self._thread = None
+        self._running = False
+        self.armed = 0
+        self.cancelled = 0
+        self.fired = 0
+
+    def __len__(self):
+        return self._count
+
+    def timer(self, length, callback):
+        """
+        Creates an unstarted timer on the wheel (so the wheel can be used as a
+        Timeout scheduler).
+        """
+        return WheelTimer(self, length, callback)
+
+    def arm(self, timer):
+        with self._cond:
+            if timer._cancelled or timer._armed:
+                return
+            now = time.monotonic()
+            if self._count == 0:
+                # nothing has been ticking, so line the current tick up with now
+                self._origin = now - self._current * self.tick
+            due = math.ceil((now + timer.interval - self._origin) / self.tick)
+            ticks = max(1, due - self._current)
+            timer._slot = (self._current + ticks) % len(self._slots)
+            timer._rounds = (ticks - 1) // len(self._slots)
+            self._slots[timer._slot].add(timer)
+            timer._armed = True
+            self._count += 1
+            self.armed += 1
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(
+                    target=self._run, name="timer-wheel", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, timer):
+        with self._cond:
+            timer._cancelled = True
+            if not timer._armed:
+                return
+            self._slots[timer._slot].discard(timer)
+            timer._armed = False
+            self._count -= 1
+            self.cancelled += 1
+
+    def _advance(self):
+        """
+        Processes the next tick, returning the timers that expired.
+        """
+        self._current += 1
+        slot = self._slots[self._current % len(self._slots)]
+        expired = []
+        for timer in slot:
+            if timer._rounds == 0:
+                expired.append(timer)
+            else:
+                timer._rounds -= 1
+        for timer in expired:
+            slot.discard(timer)
+            timer._armed = False
+        self._count -= len(expired)
+        self.fired += len(expired)
+        return expired
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._count == 0:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                delay = self._origin + (self._current + 1) * self.tick - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                expired = self._advance()
+            for timer in expired:
+                try:
+                    timer.function()
+                except Exception:
+                    traceback.print_exc()
+
+    def stop(self):
+        """
+        Stops the wheel thread. Any timers still armed won't fire.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
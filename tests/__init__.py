@@ -20,31 +20,57 @@ def test_source():
     sys.path.append("../src")
     sys.path.append("../lib")
 
-    gpio_available = None
     try:
         import RPi.GPIO as gpio
-        gpio_available = True
     except ImportError:
-        gpio_available = False
+        # not on a Pi, run the hardware tests against the simulated circuit
+        import sim_gpio
+        sim_gpio.install()
 
+    from . import test_async_runtime
+    from . import test_clock
     from . import test_code_lock
-    if gpio_available:
-        from . import test_gpio_wrapper
-        from . import test_interface_wrapper
+    from . import test_event
+    from . import test_gpio_mem
+    from . import test_gpio_wrapper
+    from . import test_interface_wrapper
+    from . import test_key_dispatch
+    from . import test_key_trace
+    from . import test_keypad
+    from . import test_lock_controller
+    from . import test_log_rotate
     from . import test_logger
+    from . import test_output_queue
+    from . import test_scan_scheduler
+    from . import test_scan_stats
+    from . import test_sim_gpio
     from . import test_timeout
+    from . import test_timer_wheel
 
     # init testing
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
 
     # load tests from modules to suite
+    suite.addTests(loader.loadTestsFromModule(test_async_runtime))
+    suite.addTests(loader.loadTestsFromModule(test_clock))
     suite.addTests(loader.loadTestsFromModule(test_code_lock))
-    if gpio_available:
-        suite.addTests(loader.loadTestsFromModule(test_gpio_wrapper))
-        suite.addTests(loader.loadTestsFromModule(test_interface_wrapper))
+    suite.addTests(loader.loadTestsFromModule(test_event))
+    suite.addTests(loader.loadTestsFromModule(test_gpio_mem))
+    suite.addTests(loader.loadTestsFromModule(test_gpio_wrapper))
+    suite.addTests(loader.loadTestsFromModule(test_interface_wrapper))
+    suite.addTests(loader.loadTestsFromModule(test_key_dispatch))
+    suite.addTests(loader.loadTestsFromModule(test_key_trace))
+    suite.addTests(loader.loadTestsFromModule(test_keypad))
+    suite.addTests(loader.loadTestsFromModule(test_lock_controller))
+    suite.addTests(loader.loadTestsFromModule(test_log_rotate))
     suite.addTests(loader.loadTestsFromModule(test_logger))
+    suite.addTests(loader.loadTestsFromModule(test_output_queue))
+    suite.addTests(loader.loadTestsFromModule(test_scan_scheduler))
+    suite.addTests(loader.loadTestsFromModule(test_scan_stats))
+    suite.addTests(loader.loadTestsFromModule(test_sim_gpio))
     suite.addTests(loader.loadTestsFromModule(test_timeout))
+    suite.addTests(loader.loadTestsFromModule(test_timer_wheel))
 
     # init runner and begin testing
     os.chdir(TMP_DIR + "/")
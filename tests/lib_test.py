@@ -2,6 +2,9 @@
 import event
 import logger
 import io
+import sim_gpio
+import gpio_wrapper
+import interface_wrapper
 
 TMP_LOG_FILE = "test.log"
 
@@ -47,3 +50,21 @@ class Logger_Test(logger.Logger):
         super().__init__(TMP_LOG_FILE)
         self._out_file.close()
         self._out_file = io.StringIO()
+
+
+class SimGpio_Test:
+    """
+    Mixin for test cases that run the real GpioWrapper and InterfaceWrapper against
+    the simulated circuit, whatever the other tests have swapped in.
+    """
+
+    def use_sim_gpio(self):
+        self._gpio_store = (gpio_wrapper.gpio, interface_wrapper.gpio,
+                            interface_wrapper.GpioWrapper)
+        gpio_wrapper.gpio = sim_gpio
+        interface_wrapper.gpio = sim_gpio
+        interface_wrapper.GpioWrapper = gpio_wrapper.GpioWrapper
+
+    def restore_gpio(self):
+        gpio_wrapper.gpio, interface_wrapper.gpio, \
+            interface_wrapper.GpioWrapper = self._gpio_store
@@ -0,0 +1,112 @@
+#! /usr/bin/env python3
+import unittest
+from .lib_test import *
+import asyncio
+import threading
+import async_runtime
+import interface_wrapper
+import scan_scheduler
+import sim_gpio
+import timeout
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncTimerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.tm = timeout.Timeout(0.01, async_runtime.AsyncTimerScheduler(self.loop))
+        self.fired = []
+        self.tm.elapsed.bind(lambda: self.fired.append(threading.current_thread()))
+
+    def tearDown(self):
+        self.tm.cleanup()
+        self.loop.close()
+
+    def run_loop(self, length):
+        self.loop.run_until_complete(asyncio.sleep(length))
+
+    def test_fired(self):
+        self.tm.start()
+        self.assertTrue(self.tm.active)
+        self.run_loop(0.03)
+        self.assertEqual(self.fired, [threading.current_thread()])
+        self.assertFalse(self.tm.active)
+
+    def test_reset(self):
+        self.tm.start()
+        self.tm.reset()
+        self.assertFalse(self.tm.active)
+        self.run_loop(0.03)
+        self.assertEqual(self.fired, [])
+
+    def test_start_from_thread(self):
+        t = threading.Thread(target=self.tm.start)
+        t.start()
+        t.join()
+        self.run_loop(0.03)
+        self.assertEqual(len(self.fired), 1)
+
+    def test_executor(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        tm = timeout.Timeout(0.01, async_runtime.AsyncTimerScheduler(self.loop, executor))
+        tm.elapsed.bind(lambda: self.fired.append(threading.current_thread()))
+        tm.start()
+        self.run_loop(0.03)
+        executor.shutdown(wait=True)
+        self.assertEqual(len(self.fired), 1)
+        self.assertIsNot(self.fired[0], threading.current_thread())
+
+    def test_start_twice(self):
+        self.tm._timer.start()
+        self.assertRaises(RuntimeError, self.tm._timer.start)
+
+
+class AsyncRuntimeTest(SimGpio_Test, unittest.TestCase):
+    def setUp(self):
+        self.use_sim_gpio()
+        self.sim = sim_gpio.reset(bounce_time=0.001)
+        self.runtime = async_runtime.AsyncRuntime(Logger_Test())
+        self.runtime.install()
+        self.iface = interface_wrapper.InterfaceWrapper(
+            Logger_Test(), scheduler=scan_scheduler.ScanScheduler(200))
+        self.runtime.attach(self.iface)
+
+    def tearDown(self):
+        self.iface.cleanup()
+        self.runtime.cleanup()
+        self.restore_gpio()
+
+    def test_install(self):
+        tm = timeout.Timeout(1)
+        self.assertTrue(isinstance(tm._timer, async_runtime.AsyncTimer))
+        self.runtime.cleanup()
+        tm = timeout.Timeout(1)
+        self.assertIs(tm._timer._wheel, timeout.timer_wheel)
+
+    def test_digit_handlers(self):
+        threads = []
+
+        def received(digit):
+            threads.append((digit, threading.current_thread()))
+            self.iface.beep_buzzer()
+            tm.start()
+
+        # stop once the key's feedback has been scanned out
+        tm = timeout.Timeout(0.3)
+        tm.elapsed.bind(self.runtime.stop)
+        self.iface.digit_received.bind(received)
+        self.sim.press("9")
+        self.runtime.run(self.iface)
+        self.assertEqual(len(threads), 1)
+        self.assertEqual(threads[0][0], "9")
+        self.assertTrue(threads[0][1].name.startswith("handlers"))
+        self.assertEqual(self.sim.pulses["buzzer"], 2)
+
+    def test_interrupt(self):
+        class Interrupted:
+            scheduler = scan_scheduler.ScanScheduler(200)
+
+            def scan_cycle(self):
+                raise KeyboardInterrupt()
+        self.runtime.run(Interrupted())
+        self.assertIn("Beginning shutdown", self.runtime.logger._out_file.getvalue())
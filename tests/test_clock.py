@@ -0,0 +1,79 @@
+#! /usr/bin/env python3
+import unittest
+import clock
+import datetime
+import threading
+
+
+class VirtualClockTest(unittest.TestCase):
+    def setUp(self):
+        self.clk = clock.VirtualClock()
+        self.fired = []
+
+    def timer(self, length, name):
+        t = self.clk.timer(length, lambda: self.fired.append((name, self.clk.monotonic())))
+        t.start()
+        return t
+
+    def test_time(self):
+        self.assertEqual(self.clk.monotonic(), 0)
+        self.clk.advance(1.5)
+        self.assertEqual(self.clk.monotonic(), 1.5)
+        self.assertEqual(self.clk.perf_counter_ns(), 1500000000)
+        self.assertEqual(self.clk.now(), datetime.datetime(2000, 1, 1, 0, 0, 1, 500000))
+        self.assertEqual(self.clk.time(), datetime.datetime(2000, 1, 1).timestamp() + 1.5)
+
+    def test_sleep(self):
+        self.clk.sleep(2)
+        self.assertEqual(self.clk.monotonic(), 2)
+
+    def test_step(self):
+        self.clk = clock.VirtualClock(step=0.001)
+        self.assertAlmostEqual(self.clk.monotonic(), 0.001)
+        self.assertAlmostEqual(self.clk.monotonic(), 0.002)
+
+    def test_timers(self):
+        self.timer(2, "b")
+        self.timer(1, "a")
+        self.timer(5, "c")
+        self.assertEqual(self.clk.pending, 3)
+        self.clk.advance(3)
+        self.assertEqual(self.fired, [("a", 1), ("b", 2)])
+        self.assertEqual(self.clk.monotonic(), 3)
+        self.assertEqual(self.clk.pending, 1)
+
+    def test_cancel(self):
+        t = self.timer(1, "a")
+        self.assertTrue(t.is_alive())
+        t.cancel()
+        self.assertFalse(t.is_alive())
+        self.clk.advance(2)
+        self.assertEqual(self.fired, [])
+
+    def test_chained(self):
+        # timers started while firing are run within the same advance
+        def fire():
+            self.fired.append(self.clk.monotonic())
+            if len(self.fired) < 3:
+                self.clk.timer(1, fire).start()
+        self.clk.timer(1, fire).start()
+        self.clk.advance(10)
+        self.assertEqual(self.fired, [1, 2, 3])
+
+    def test_not_real(self):
+        self.clk.timer(1000, lambda: self.fired.append(threading.current_thread())).start()
+        self.clk.advance(1000)
+        self.assertEqual(self.fired, [threading.current_thread()])
+
+
+class ClockTest(unittest.TestCase):
+    def tearDown(self):
+        clock.use_clock(None)
+
+    def test_use_clock(self):
+        self.assertFalse(clock.get_clock().virtual)
+        clk = clock.VirtualClock()
+        clock.use_clock(clk)
+        self.assertIs(clock.get_clock(), clk)
+        clock.use_clock(None)
+        self.assertFalse(clock.get_clock().virtual)
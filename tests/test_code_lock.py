@@ -6,6 +6,7 @@ import timeout
 import os
 import datetime
 import time
+import clock
 
 code_lock.PRINT_MSGS = False
 code_lock.IMMEDIATE_REJECT = False
@@ -73,9 +74,43 @@ class CodeLockTest(unittest.TestCase):
         self.assertEqual(self.clk.locked_out, False)
         self.assertTrue(isinstance(self.clk.locked_timeout, timeout.Timeout))
         self.assertEqual(self.clk.locked_timeout._timer.interval, 1)
+        self.assertEqual(self.clk.locked_timeout.count, code_lock.LOCKED_OUT_TIME)
         self.assertEqual(self.clk.incorrect_attempts, 0)
         self.assertEqual(self.clk.locked_time_left, 0)
 
+    def test_lock_files(self):
+        with open("door2_password.txt", "w") as f:
+            f.write("9876\n")
+        clk = code_lock.CodeLock(InferfaceWrapper_Test(), Logger_Test(), Stdout_Test(),
+                                 pword_file="door2_password.txt",
+                                 access_log_file="door2_access_log.csv",
+                                 gnuplot_file="door2_gnuplot_data.csv")
+        try:
+            self.assertEqual(clk.password, "9876")
+            clk.access_log.flush()
+            with open("door2_access_log.csv") as f:
+                self.assertTrue(f.read().startswith("startup,"))
+        finally:
+            clk.cleanup()
+        self.assertTrue(os.path.isfile("door2_gnuplot_data.csv"))
+
+    def test_access_log_rotation(self):
+        clk = code_lock.CodeLock(InferfaceWrapper_Test(), Logger_Test(), Stdout_Test(),
+                                 access_log_file="door3_access_log.csv",
+                                 access_log_rotation={"max_size": 60})
+        try:
+            clk.access_log_append("code", True)
+            clk.access_log_append("code", False)
+            self.assertGreater(clk.access_log.rotations, 0)
+            clk.access_log.flush()
+            clk.access_log.wait()
+            lines = [l.split(",")[0] for l in clk.access_log_lines()]
+            self.assertEqual(lines, ["startup", "code", "code"])
+        finally:
+            clk.cleanup()
+        self.assertEqual(code_lock.access_log_time("startup,2020-06-01T12:00:00,None"),
+                         datetime.datetime(2020, 6, 1, 12).timestamp())
+
     def test_access_log_append(self):
         l = self.get_file_length(self.clk.access_log)
         self.clk.access_log_append("event", True)
@@ -120,18 +155,15 @@ class CodeLockTest(unittest.TestCase):
         self.assertEqual(self.clk.locked_time_left, code_lock.LOCKED_OUT_TIME)
 
     def test_locked_timeout_elapsed(self):
-        test_time = 10
+        test_time = code_lock.LOCKED_OUT_TIME
         self.clk.locked_time_left = test_time
         self.clk.locked_out = True
+        # the ticks come from the periodic timeout, step them through by hand
         for i in range(1, test_time + 1):
+            self.clk.locked_timeout.ticks = i
             self.clk.locked_timeout_elapsed()
             self.assertEqual(self.clk.locked_time_left, test_time - i)
-            if i < test_time:
-                self.assertTrue(self.clk.locked_timeout.active)
-                self.clk.locked_timeout.reset()
-            else:
-                self.assertFalse(self.clk.locked_timeout.active)
-                self.assertFalse(self.clk.locked_out)
+            self.assertEqual(self.clk.locked_out, i < test_time)
 
     def test_digit_received_handler(self):
         self.clk.locked_out = True
@@ -346,6 +378,35 @@ class CodeLockTest(unittest.TestCase):
         self.assertTrue(self.iface.led_red_flashed)
         self.assertEqual(self.clk.incorrect_attempts, 0)
 
+    def test_digit_timeout_progress(self):
+        self.assertEqual(self.clk.digit_timeout.length, code_lock.DIGIT_TIMEOUT_LENGTH)
+        if code_lock.pi_leds_available:
+            self.assertEqual(len(self.clk.digit_timeout.points),
+                             len(code_lock.pi_leds.LED_GPIO))
+        self.clk.digit_timeout_progress(0.36)
+        self.assertFalse(self.iface.led_red_flashed)
+
+    def test_virtual_clock(self):
+        clk = clock.VirtualClock(epoch=datetime.datetime(2020, 6, 1, 12, 0))
+        self.clk.cleanup()
+        self.clk = code_lock.CodeLock(self.iface, self.log, self.stdout, clock=clk)
+        self.clk.password = "12"
+        self.clk.digit_received_handler("1")
+        clk.advance(code_lock.DIGIT_TIMEOUT_LENGTH - 0.01)
+        self.assertFalse(self.iface.led_red_flashed)
+        clk.advance(0.02)
+        self.assertTrue(self.iface.led_red_flashed)
+        self.assertEqual(self.clk.current_input, [])
+        # a full lockout countdown
+        self.clk.lockout()
+        clk.advance(code_lock.LOCKED_OUT_TIME - 1)
+        self.assertTrue(self.clk.locked_out)
+        self.assertEqual(self.clk.locked_time_left, 1)
+        clk.advance(1)
+        self.assertFalse(self.clk.locked_out)
+        self.assertEqual(clk.pending, 0)
+        self.assertIn("2020-06-01T12:00:00", self.get_file_contents(self.clk.access_log))
+
     def test_cleanup(self):
         self.clk.cleanup()
         self.assertFalse(self.clk.digit_timeout.active)
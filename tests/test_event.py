@@ -0,0 +1,156 @@
+#! /usr/bin/env python3
+import unittest
+import asyncio
+import event
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EventTest(unittest.TestCase):
+    def setUp(self):
+        self.ev = event.Event()
+        self.pool = ThreadPoolExecutor(4)
+        self.threads = []
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def handler(self, value):
+        self.threads.append(threading.current_thread())
+        return value * 2
+
+    def failing(self, value):
+        raise ValueError(value)
+
+    def test_fire(self):
+        self.ev.bind(self.handler)
+        self.assertEqual(self.ev.fire(1), [])
+        self.assertEqual(self.threads, [threading.current_thread()])
+
+    def test_fire_exception(self):
+        self.ev.bind(self.handler)
+        self.ev.bind(self.failing)
+        self.assertRaises(event.EventException, self.ev.fire, 1)
+        self.assertEqual(len(self.threads), 1)
+
+    def test_fire_deferred(self):
+        self.ev = event.Event(self.pool)
+        self.ev.bind(self.handler, deferred=True)
+        futures = self.ev.fire(2)
+        self.assertEqual([f.result() for f in futures], [4])
+        self.assertNotEqual(self.threads, [threading.current_thread()])
+
+    def test_fire_deferred_no_executor(self):
+        self.ev.bind(self.handler, deferred=True)
+        self.assertEqual(self.ev.fire(2), [])
+        self.assertEqual(self.threads, [threading.current_thread()])
+
+    def test_fire_in(self):
+        self.ev.bind(lambda v: time.sleep(0.05) or v)
+        self.ev.bind(self.handler)
+        start = time.perf_counter()
+        future = self.ev.fire_in(self.pool, 3)
+        # neither handler holds up the firing thread
+        self.assertLess(time.perf_counter() - start, 0.04)
+        self.assertEqual(sorted(future.result(1)), [3, 6])
+
+    def test_fire_in_inline(self):
+        self.ev.bind(self.handler, deferred=False)
+        future = self.ev.fire_in(self.pool, 1)
+        self.assertEqual(self.threads, [threading.current_thread()])
+        self.assertEqual(future.result(1), [2])
+
+    def test_fire_in_exception(self):
+        self.ev.bind(self.handler)
+        self.ev.bind(self.failing)
+        future = self.ev.fire_in(self.pool, 1)
+        self.assertRaises(event.EventException, future.result, 1)
+        self.assertEqual(len(future.exception()._exc), 1)
+
+    def test_fire_async(self):
+        async def coro(value):
+            await asyncio.sleep(0.01)
+            return value + 1
+        self.ev.bind(self.handler)
+        self.ev.bind(coro)
+        results = asyncio.run(self.ev.fire_async(5))
+        self.assertEqual(sorted(results), [6, 10])
+        self.assertNotEqual(self.threads, [threading.current_thread()])
+
+    def test_fire_async_exception(self):
+        self.ev.bind(self.failing)
+        self.assertRaises(event.EventException, asyncio.run, self.ev.fire_async(1))
+
+    def test_unbind_deferred(self):
+        self.ev.bind(self.handler, deferred=True)
+        self.ev.unbind(self.handler)
+        self.ev.bind(self.handler)
+        self.ev.fire_in(self.pool, 1).result(1)
+        self.assertNotEqual(self.threads, [threading.current_thread()])
+
+
+class EventProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.ev = event.Event(name="test", profile=True)
+
+    def tearDown(self):
+        event.enable_profiling(False)
+
+    def slow(self):
+        time.sleep(0.01)
+
+    def failing(self):
+        raise ValueError()
+
+    def test_stats(self):
+        self.ev.bind(self.slow)
+        self.ev.bind(self.failing)
+        for _ in range(3):
+            self.assertRaises(event.EventException, self.ev.fire)
+        slow = self.ev.handler_stats(self.slow)
+        self.assertEqual(slow.name, "EventProfileTest.slow")
+        self.assertEqual(slow.calls, 3)
+        self.assertGreaterEqual(slow.total, 0.03)
+        self.assertGreaterEqual(slow.max, 0.01)
+        self.assertEqual(slow.errors, 0)
+        self.assertEqual(self.ev.handler_stats(self.failing).errors, 3)
+
+    def test_same_name(self):
+        calls = []
+        first = lambda: calls.append(1)
+        second = lambda: calls.append(2)
+        self.ev.bind(first)
+        self.ev.bind(second)
+        self.ev.fire()
+        self.ev.unbind(second)
+        self.ev.fire()
+        self.assertEqual(len(self.ev.stats()), 2)
+        self.assertEqual(self.ev.handler_stats(first).calls, 2)
+        self.assertEqual(self.ev.handler_stats(second).calls, 1)
+        self.assertEqual(self.ev.handler_stats(first).name,
+                         self.ev.handler_stats(second).name)
+
+    def test_executor(self):
+        self.ev.bind(self.slow)
+        with ThreadPoolExecutor(2) as pool:
+            self.ev.fire_in(pool).result(1)
+        self.assertEqual(self.ev.handler_stats(self.slow).calls, 1)
+
+    def test_not_profiled(self):
+        ev = event.Event()
+        ev.bind(self.slow)
+        ev.fire()
+        self.assertEqual(ev.stats(), {})
+        event.enable_profiling()
+        ev.fire()
+        self.assertEqual(ev.handler_stats(self.slow).calls, 1)
+
+    def test_report(self):
+        self.ev.bind(self.slow)
+        self.ev.fire()
+        report = event.profile_report()
+        self.assertIn("test:\n  EventProfileTest.slow: calls=1", report)
+        self.assertIn(self.ev, event.events())
+        event.reset_profiles()
+        self.assertEqual(self.ev.stats(), {})
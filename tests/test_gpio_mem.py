@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+import unittest
+from .lib_test import *
+import gpio_mem
+import gpio_wrapper
+import interface_wrapper
+import struct
+
+TMP_MEM_FILE = "gpiomem.bin"
+
+
+class GpioMemTest(unittest.TestCase):
+    def setUp(self):
+        with open(TMP_MEM_FILE, "wb") as f:
+            f.write(bytes(gpio_mem.GPIO_BLOCK_SIZE))
+        self.mem = gpio_mem.GpioMem(TMP_MEM_FILE)
+
+    def tearDown(self):
+        gpio_wrapper.use_gpio_mem(None)
+        self.mem.close()
+
+    def read_word(self, offset):
+        with open(TMP_MEM_FILE, "rb") as f:
+            f.seek(offset)
+            return struct.unpack("I", f.read(4))[0]
+
+    def write_word(self, offset, value):
+        with open(TMP_MEM_FILE, "r+b") as f:
+            f.seek(offset)
+            f.write(struct.pack("I", value))
+
+    def test_mask(self):
+        self.assertEqual(gpio_mem.GpioMem.mask([0, 3, 10]), 0b10000001001)
+
+    def test_write_mask(self):
+        self.mem.write_mask(0b1110, 0b0110)
+        self.assertEqual(self.read_word(gpio_mem.GPSET0), 0b0110)
+        self.assertEqual(self.read_word(gpio_mem.GPCLR0), 0b1000)
+
+    def test_levels(self):
+        self.write_word(gpio_mem.GPLEV0, 0b101 << 9)
+        self.assertEqual(self.mem.levels(), 0b101 << 9)
+
+    def test_set_multiple_output(self):
+        gpio_wrapper.use_gpio_mem(self.mem)
+        a = gpio_wrapper.GpioWrapper(10)
+        b = gpio_wrapper.GpioWrapper(9)
+        c = gpio_wrapper.GpioWrapper(11)
+        gpio_wrapper.GpioWrapper.set_multiple_output(
+            (a, True), (b, False), (c, True))
+        self.assertEqual(self.read_word(gpio_mem.GPSET0), (1 << 10) | (1 << 11))
+        self.assertEqual(self.read_word(gpio_mem.GPCLR0), 1 << 9)
+
+    def test_d_sample(self):
+        gpio_wrapper.use_gpio_mem(self.mem)
+        lines = interface_wrapper.GpioLines()
+        # d0 = 10, d1 = 9, d2 = 11
+        self.write_word(gpio_mem.GPLEV0, (1 << 10) | (1 << 11))
+        self.assertEqual(lines.d_sample(), 0b101)
+        self.assertFalse(lines.d_all_high())
+        self.write_word(gpio_mem.GPLEV0, 0xFFFFFFFF)
+        self.assertTrue(lines.d_all_high())
@@ -3,6 +3,8 @@
 # to the hardware-interaction nature of the module
 import unittest
 import gpio_wrapper
+import time
+import clock
 import RPi.GPIO as gpio
 
 
@@ -16,3 +18,158 @@ class GpioWrapperTest(unittest.TestCase):
         gw = gpio_wrapper.GpioWrapper(10)
         self.assertEqual(gw._pin, 10)
         self.assertTrue(gw._io_inp)
+
+    def test_cached_direction(self):
+        gw = gpio_wrapper.GpioWrapper(10)
+        stats = gpio_wrapper.call_stats
+        stats.reset()
+        gw.input()
+        self.assertEqual((stats.made, stats.skipped), (0, 1))
+        gw.output()
+        self.assertFalse(gw.is_input)
+        self.assertEqual((stats.made, stats.skipped), (1, 1))
+        gw.input()
+
+    def test_direction_waits(self):
+        clk = clock.VirtualClock()
+        st = gpio_wrapper.SettleTracker(0.02, clk)
+        gw = gpio_wrapper.GpioWrapper(10, settle_tracker=st)
+        gw2 = gpio_wrapper.GpioWrapper(11, settle_tracker=st)
+        start = clk.monotonic()
+        gw.output()
+        self.assertAlmostEqual(clk.monotonic() - start, 0.02)  # the setup of gw2 settling
+        gpio_wrapper.GpioWrapper.set_multiple_io((gw, gpio.IN), (gw2, gpio.OUT))
+        self.assertAlmostEqual(clk.monotonic() - start, 0.04)  # one wait for both
+        self.assertTrue(gw.is_input)
+        self.assertFalse(gw2.is_input)
+        gw2.input()
+
+    def test_cached_level(self):
+        gw = gpio_wrapper.GpioWrapper(10)
+        gw.output()
+        stats = gpio_wrapper.call_stats
+        stats.reset()
+        gw.high()
+        gw.high()
+        self.assertTrue(gw.level)
+        self.assertEqual((stats.made, stats.skipped), (1, 1))
+        gw2 = gpio_wrapper.GpioWrapper(9)
+        gw2.output()
+        stats.reset()
+        gpio_wrapper.GpioWrapper.set_multiple_output((gw, True), (gw2, False))
+        self.assertEqual((stats.made, stats.skipped), (1, 1))
+        self.assertFalse(gw2.level)
+        gw.input()
+        gw2.input()
+
+
+class DebounceTest(unittest.TestCase):
+    def reader(self, samples):
+        it = iter(samples)
+        last = [samples[-1]]
+
+        def read():
+            last[0] = next(it, last[0])
+            return last[0]
+        return read
+
+    def test_integrate_stable(self):
+        value, samples = gpio_wrapper.debounce_integrate(self.reader([1]), 4, stable_time=0)
+        self.assertEqual(value, 1)
+        self.assertEqual(samples, 4)
+
+    def test_integrate_bounce(self):
+        value, samples = gpio_wrapper.debounce_integrate(
+            self.reader([1, 0, 1, 0, 0, 1, 0]), 4, stable_time=0)
+        self.assertEqual(value, 0)
+        self.assertEqual(samples, 10)
+
+    def test_integrate_vector(self):
+        value, samples = gpio_wrapper.debounce_integrate(
+            self.reader([(1, 0), (1, 1), (1, 1)]), 3, stable_time=0)
+        self.assertEqual(value, (1, 1))
+        self.assertEqual(samples, 4)
+
+    def test_integrate_unstable(self):
+        flip = [0]
+
+        def read():
+            flip[0] ^= 1
+            return flip[0]
+        value, samples = gpio_wrapper.debounce_integrate(read, 2, stable_time=0)
+        self.assertIn(value, (0, 1))
+        self.assertGreater(samples, 2)
+
+    def test_integrate_stable_time(self):
+        # each read moves the clock on 0.1ms, so the 0.5ms quiet gaps in the bounce
+        # are enough samples but not long enough
+        clk = clock.VirtualClock(step=0.0001)
+        value, samples = gpio_wrapper.debounce_integrate(
+            self.reader([1] * 5 + [0] + [1] * 5 + [0]), 4, clk, 0.001)
+        self.assertEqual(value, 0)
+        self.assertEqual(samples, 22)
+
+    def test_average(self):
+        value, samples = gpio_wrapper.debounce_average(self.reader([0, 1, 1]))
+        self.assertEqual(value, 1)
+        self.assertGreater(samples, 3)
+
+    def test_average_vector(self):
+        value, samples = gpio_wrapper.debounce_average(
+            self.reader([(0, 1), (1, 1), (1, 0), (1, 1)]))
+        self.assertEqual(value, (1, 1))
+
+    def test_average_virtual_clock(self):
+        # each reading of the clock moves it on 1ms, so the window is 5 samples
+        clk = clock.VirtualClock(step=0.001)
+        value, samples = gpio_wrapper.debounce_average(self.reader([0, 1, 1]), clock=clk)
+        self.assertEqual(value, 1)
+        self.assertEqual(samples, 5)
+
+    def test_state_samples(self):
+        gw = gpio_wrapper.GpioWrapper(10)
+        gw.state()
+        self.assertGreater(gw.last_samples, 0)
+
+
+class SettleTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.st = gpio_wrapper.SettleTracker(0.02)
+
+    def test_no_change(self):
+        self.assertEqual(self.st.remaining(), 0)
+        self.st.wait()
+        self.assertEqual(self.st.skipped, 1)
+        self.assertEqual(self.st.waits, 0)
+
+    def test_wait(self):
+        self.st.mark()
+        start = time.perf_counter()
+        self.st.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.015)
+        self.assertEqual(self.st.waits, 1)
+
+    def test_already_settled(self):
+        self.st.mark()
+        time.sleep(0.025)
+        start = time.perf_counter()
+        self.st.wait()
+        self.assertLess(time.perf_counter() - start, 0.005)
+        self.assertEqual(self.st.skipped, 1)
+
+    def test_precise_sleep(self):
+        start = time.perf_counter()
+        gpio_wrapper.precise_sleep(0.01)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.01)
+
+    def test_virtual_clock(self):
+        clk = clock.VirtualClock()
+        self.st = gpio_wrapper.SettleTracker(0.02, clk)
+        self.st.mark()
+        clk.advance(0.005)
+        self.assertAlmostEqual(self.st.remaining(), 0.015)
+        start = time.perf_counter()
+        self.st.wait()
+        self.assertLess(time.perf_counter() - start, 0.005)
+        self.assertAlmostEqual(clk.monotonic(), 0.02)
+        self.assertEqual(self.st.remaining(), 0)
@@ -2,24 +2,40 @@
 import unittest
 from .lib_test import *
 import interface_wrapper
+from interface_wrapper import DPOS_GREEN_LED, DPOS_RED_LED, DPOS_BUZZER
 import RPi.GPIO as gpio
 import event
+import threading
 
 
 class GpioWrapper_Test:
-    def __init__(self, pin):
+    def __init__(self, pin, debounce=None, settle_tracker=None):
         self._pin = pin
         self._io_inp = True
         self._mode = None
         self._output = False
         self._check_state = 0
+        self._edge_callback = None
         self.input()
 
+    @staticmethod
+    def wait():
+        pass
+
+    @property
+    def pin(self):
+        return self._pin
+
     @staticmethod
     def set_multiple_output(*args):
         for t in args:
             t[0]._apply_output(t[1])
 
+    @staticmethod
+    def set_multiple_io(*args):
+        for t in args:
+            t[0].set_io(t[1])
+
     def set_io(self, state):
         self._mode = state
 
@@ -42,6 +58,20 @@ class GpioWrapper_Test:
     def low(self):
         self.set_output(False)
 
+    def raw_state(self):
+        return self._check_state
+
+    def add_edge_detect(self, callback, edge=None):
+        self._edge_callback = callback
+
+    def remove_edge_detect(self):
+        self._edge_callback = None
+
+    def inject_edge(self, state):
+        self._check_state = state
+        if self._edge_callback is not None:
+            self._edge_callback(self._pin)
+
     def state(self):
         return self._check_state
 
@@ -72,9 +102,7 @@ class InterfaceWrapperTest(unittest.TestCase):
         self.assertTrue(self.iface._run_loop)
         self.assertEqual(self.iface._current_digit, 0)
         self.assertFalse(self.iface._digit_down)
-        self.assertFalse(self.iface._led_green_apply)
-        self.assertFalse(self.iface._led_red_apply)
-        self.assertFalse(self.iface._buzzer_apply)
+        self.assertEqual(len(self.iface.outputs), 0)
 
         self.assertEqual(self.iface.gpio.reg._mode, gpio.OUT)
         self.assertEqual(self.iface.gpio.io._mode, gpio.OUT)
@@ -85,12 +113,17 @@ class InterfaceWrapperTest(unittest.TestCase):
         self.assertEqual(self.iface.gpio._lines["d0"]._mode, gpio.IN)
         self.assertEqual(self.iface.gpio._lines["d1"]._mode, gpio.IN)
         self.assertEqual(self.iface.gpio._lines["d2"]._mode, gpio.IN)
-        self.assertTrue(self.iface.gpio.io._output)
+        self.assertFalse(self.iface.gpio.io._output)
 
     def fired_test(self, digit):
         self.fired = True
         self._rcv_digit = digit
 
+    def read_row(self, row):
+        self.iface._current_digit = row
+        self.iface._do_write_phase()
+        self.iface._do_read_phase()
+
     def test_do_read_phase(self):
         self.iface.digit_received.bind(self.fired_test)
         self.fired = False
@@ -99,62 +132,89 @@ class InterfaceWrapperTest(unittest.TestCase):
         self.iface.gpio._lines["d2"]._check_state = True
         self.iface._do_read_phase()
         self.assertFalse(self.fired)
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertFalse(self.fired)
 
         self.iface.gpio._lines["d0"]._check_state = False
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertTrue(self.fired)
         self.assertEqual(self._rcv_digit, "1")
 
         self.fired = False
         self._rcv_digit = None
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertFalse(self.fired)
 
         self.iface.gpio._lines["d0"]._check_state = True
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertFalse(self.iface._digit_down)
         self.assertFalse(self.fired)
 
         self.iface.gpio._lines["d1"]._check_state = False
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertTrue(self.fired)
         self.assertEqual(self._rcv_digit, "2")
 
         self.fired = False
         self._rcv_digit = None
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertFalse(self.fired)
 
         self.iface.gpio._lines["d1"]._check_state = True
-        self.iface._do_read_phase()
+        self.read_row(0)
         self.assertFalse(self.iface._digit_down)
         self.assertFalse(self.fired)
 
-        self.iface._current_digit = 1
         self.iface.gpio._lines["d0"]._check_state = False
-        self.iface._do_read_phase()
+        self.read_row(1)
         self.assertTrue(self.fired)
         self.assertEqual(self._rcv_digit, "4")
 
         self.fired = False
         self._rcv_digit = None
-        self.iface._do_read_phase()
+        self.read_row(1)
         self.assertFalse(self.fired)
 
         self.iface.gpio._lines["d0"]._check_state = True
-        self.iface._do_read_phase()
+        self.read_row(1)
         self.assertFalse(self.iface._digit_down)
         self.assertFalse(self.fired)
 
+    def test_d_sample(self):
+        lines = self.iface.gpio
+        lines._lines["d0"]._check_state = True
+        lines._lines["d1"]._check_state = False
+        lines._lines["d2"]._check_state = True
+        bits = lines.d_sample()
+        self.assertEqual(bits, 0b101)
+        self.assertGreater(lines.last_samples, 0)
+        self.assertEqual(lines.d_states(bits), [1, 0, 1])
+        self.assertFalse(lines.d_all_high(bits))
+        self.assertTrue(lines.d_all_high(0b111))
+        lines._lines["d1"]._check_state = True
+        self.assertTrue(lines.d_all_high())
+
+    def test_transaction(self):
+        d0 = self.iface.gpio._lines["d0"]
+        d1 = self.iface.gpio._lines["d1"]
+        with self.iface.gpio.transaction() as tx:
+            tx.output(d0)
+            tx.set(d0, True)
+            tx.set(d1, True)
+            tx.set(d1, False)
+            self.assertEqual(d0._mode, gpio.IN)
+            self.assertFalse(d0._output)
+        self.assertEqual(d0._mode, gpio.OUT)
+        self.assertTrue(d0._output)
+        self.assertFalse(d1._output)
+
     def test_start_write(self):
         self.iface._start_write()
-        self.assertTrue(self.iface.gpio.reg._output)
+        self.assertFalse(self.iface.gpio.reg._output)
         self.assertEqual(self.iface.gpio._lines["d0"]._mode, gpio.OUT)
         self.assertEqual(self.iface.gpio._lines["d1"]._mode, gpio.OUT)
         self.assertEqual(self.iface.gpio._lines["d2"]._mode, gpio.OUT)
-        self.assertFalse(self.iface.gpio.io._output)
+        self.assertTrue(self.iface.gpio.io._output)
 
     def get_digit_output(self):
         return [self.iface.gpio._lines["d2"]._output,
@@ -174,26 +234,37 @@ class InterfaceWrapperTest(unittest.TestCase):
         self.iface.flash_green_led()
         self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, False, False])
-        self.assertEqual(self.iface._led_green_apply, 1)
+        self.assertEqual(self.iface.outputs.pending(DPOS_GREEN_LED), 1)
+        self.iface._do_write_phase()
+        self.assertEqual(self.get_digit_output(), [False, False, False])
         self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, False, False])
-        self.assertEqual(self.iface._led_green_apply, 0)
+        self.assertEqual(self.iface.outputs.pending(DPOS_GREEN_LED), 0)
 
+        # a keypad row is always scanned between output slots
         self.iface.flash_red_led()
         self.iface._do_write_phase()
+        self.assertEqual(self.get_digit_output(), [False, False, True])
+        self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, False, True])
-        self.assertEqual(self.iface._led_red_apply, 1)
+        self.assertEqual(self.iface.outputs.pending(DPOS_RED_LED), 1)
+        self.iface._do_write_phase()
+        self.assertEqual(self.get_digit_output(), [False, True, False])
         self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, False, True])
-        self.assertEqual(self.iface._led_red_apply, 0)
+        self.assertEqual(self.iface.outputs.pending(DPOS_RED_LED), 0)
 
         self.iface.beep_buzzer()
         self.iface._do_write_phase()
+        self.assertEqual(self.get_digit_output(), [False, True, True])
+        self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, True, False])
-        self.assertEqual(self.iface._buzzer_apply, 1)
+        self.assertEqual(self.iface.outputs.pending(DPOS_BUZZER), 1)
+        self.iface._do_write_phase()
+        self.assertEqual(self.get_digit_output(), [False, False, False])
         self.iface._do_write_phase()
         self.assertEqual(self.get_digit_output(), [True, True, False])
-        self.assertEqual(self.iface._buzzer_apply, 0)
+        self.assertEqual(self.iface.outputs.pending(DPOS_BUZZER), 0)
 
     def test_cleanup(self):
         self.iface.cleanup()
@@ -201,12 +272,98 @@ class InterfaceWrapperTest(unittest.TestCase):
 
     def test_flash_green_led(self):
         self.iface.flash_green_led()
-        self.assertEqual(self.iface._led_green_apply, 2)
+        self.assertEqual(self.iface.outputs.pending(DPOS_GREEN_LED), 2)
 
     def test_flash_red_led(self):
         self.iface.flash_red_led()
-        self.assertEqual(self.iface._led_red_apply, 2)
+        self.assertEqual(self.iface.outputs.pending(DPOS_RED_LED), 2)
 
     def test_beep_buzzer(self):
         self.iface.beep_buzzer()
-        self.assertEqual(self.iface._buzzer_apply, 2)
+        self.assertEqual(self.iface.outputs.pending(DPOS_BUZZER), 2)
+
+
+class InterfaceWrapperEdgeTest(unittest.TestCase):
+    def setUp(self):
+        self.log = Logger_Test()
+        self.iface = interface_wrapper.InterfaceWrapper(
+            self.log, edge_detect=True)
+        self.iface.digit_received.bind(self.fired_test)
+        self.fired = False
+        self._rcv_digit = None
+        for d in ["d0", "d1", "d2"]:
+            self.iface.gpio._lines[d]._check_state = True
+        self.iface.scheduler._idle = True  # edges are only waited for while idle
+
+    def tearDown(self):
+        self.iface.cleanup()
+
+    def fired_test(self, digit):
+        self.fired = True
+        self._rcv_digit = digit
+
+    def test_init(self):
+        self.assertTrue(self.iface.edge_detect)
+
+    def test_active_polls(self):
+        self.iface.scheduler._idle = False
+        self.iface._do_write_phase()
+        d2 = self.iface.gpio._lines["d2"]
+        d2.add_edge_detect = None  # would fail if the edges were armed
+        self.iface._do_read_phase()
+        self.assertFalse(self.fired)
+
+    def test_no_edge(self):
+        self.iface._do_write_phase()
+        self.iface._do_read_phase()
+        self.assertFalse(self.fired)
+        for d in ["d0", "d1", "d2"]:
+            self.assertIsNone(self.iface.gpio._lines[d]._edge_callback)
+
+    def test_already_low(self):
+        self.iface._do_write_phase()
+        self.iface.gpio._lines["d1"]._check_state = False
+        self.iface._do_read_phase()
+        self.assertTrue(self.fired)
+        self.assertEqual(self._rcv_digit, "2")
+
+    def test_injected_edge(self):
+        interface_wrapper.EDGE_ROW_DWELL = 5
+        try:
+            self.iface._do_write_phase()
+            d2 = self.iface.gpio._lines["d2"]
+            threading.Timer(0.05, d2.inject_edge, (False,)).start()
+            self.iface._do_read_phase()
+        finally:
+            interface_wrapper.EDGE_ROW_DWELL = 0.020
+        self.assertTrue(self.fired)
+        self.assertEqual(self._rcv_digit, "3")
+
+    def test_release(self):
+        self.iface._do_write_phase()
+        self.iface.gpio._lines["d0"]._check_state = False
+        self.iface._do_read_phase()
+        self.assertTrue(self.iface._digit_down)
+        self.iface._do_write_phase()
+        self.iface._do_read_phase()
+        self.assertTrue(self.iface._digit_down)
+        self.iface._do_write_phase()
+        self.iface.gpio._lines["d0"]._check_state = True
+        self.iface._do_read_phase()
+        self.assertFalse(self.iface._digit_down)
+
+
+class InterfaceWrapperAsyncTest(unittest.TestCase):
+    def test_async_dispatch(self):
+        iface = interface_wrapper.InterfaceWrapper(
+            Logger_Test(), async_dispatch=True)
+        received = []
+        iface.digit_received.bind(received.append)
+        for d in ["d0", "d1", "d2"]:
+            iface.gpio._lines[d]._check_state = True
+        iface._do_write_phase()
+        iface.gpio._lines["d2"]._check_state = False
+        iface._do_read_phase()
+        iface.cleanup()
+        self.assertEqual(received, ["3"])
+        self.assertEqual(iface.dispatcher.delivered, 1)
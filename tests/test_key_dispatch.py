@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+import unittest
+from .lib_test import *
+import key_dispatch
+import event
+import threading
+import time
+
+
+class DigitDispatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.event = event.Event()
+        self.received = []
+        self.threads = []
+        self.event.bind(self.handler)
+        self.dsp = key_dispatch.DigitDispatcher(self.event, Logger_Test(), 4)
+
+    def tearDown(self):
+        self.dsp.stop()
+
+    def handler(self, digit):
+        self.received.append(digit)
+        self.threads.append(threading.current_thread())
+
+    def test_dispatch(self):
+        self.dsp.start()
+        self.assertTrue(self.dsp.push("1"))
+        self.assertTrue(self.dsp.push("2"))
+        self.dsp.stop()
+        self.assertEqual(self.received, ["1", "2"])
+        self.assertEqual(self.dsp.delivered, 2)
+        self.assertNotIn(threading.current_thread(), self.threads)
+
+    def test_drop(self):
+        for d in "123456":
+            self.dsp.push(d)
+        self.assertEqual(self.dsp.depth, 4)
+        self.assertEqual(self.dsp.dropped, 2)
+        self.assertEqual(self.dsp.max_depth, 4)
+        self.dsp.start()
+        self.dsp.stop()
+        self.assertEqual(self.received, ["1", "2", "3", "4"])
+
+    def test_handler_exception(self):
+        def bad(digit):
+            raise ValueError(digit)
+        self.event.bind(bad)
+        self.dsp.start()
+        self.dsp.push("5")
+        self.dsp.push("6")
+        self.dsp.stop()
+        self.assertEqual(self.received, ["5", "6"])
+        self.assertGreater(len(self.dsp.logger._out_file.getvalue()), 0)
+
+    def test_slow_handler(self):
+        def slow(digit):
+            time.sleep(0.05)
+        self.event.bind(slow)
+        self.dsp.start()
+        start = time.perf_counter()
+        self.dsp.push("1")
+        self.dsp.push("2")
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.dsp.stop()
+        self.assertEqual(self.received, ["1", "2"])
@@ -0,0 +1,53 @@
+#! /usr/bin/env python3
+import unittest
+import key_trace
+import event
+
+TMP_TRACE_FILE = "key_trace.csv"
+
+
+class KeyTracerTest(unittest.TestCase):
+    def setUp(self):
+        self.kt = key_trace.KeyTracer(3)
+
+    def test_begin(self):
+        a = self.kt.begin("1")
+        b = self.kt.begin("2")
+        self.assertNotEqual(a, b)
+        self.assertEqual([t.digit for t in self.kt.traces()], ["1", "2"])
+
+    def test_history(self):
+        for d in "12345":
+            self.kt.begin(d)
+        self.assertEqual([t.digit for t in self.kt.traces()], ["3", "4", "5"])
+
+    def test_fire(self):
+        ev = event.Event()
+        seen = []
+        ev.bind(lambda d: seen.append(self.kt.current))
+        tid = self.kt.begin("1")
+        self.kt.fire(tid, ev, "1")
+        self.assertEqual(seen, [tid])
+        self.assertIsNone(self.kt.current)
+        trace = self.kt.traces()[0]
+        self.assertGreaterEqual(trace.latency(key_trace.STAGE_HANDLED),
+                                trace.latency(key_trace.STAGE_FIRED))
+        self.assertIsNone(trace.latency(key_trace.STAGE_LATCHED))
+
+    def test_percentiles(self):
+        for i in range(3):
+            tid = self.kt.begin(str(i), 0)
+            self.kt._traces[tid].times[key_trace.STAGE_FIRED] = i + 1
+        self.assertEqual(self.kt.percentiles(key_trace.STAGE_FIRED, (0, 50, 100)),
+                         {0: 1, 50: 2, 100: 3})
+        self.assertEqual(self.kt.percentiles(key_trace.STAGE_LATCHED, (50,)), {50: 0})
+        self.assertIn(key_trace.STAGE_LATCHED, self.kt.stats())
+
+    def test_export_csv(self):
+        tid = self.kt.begin("5")
+        self.kt.mark(tid, key_trace.STAGE_FIRED)
+        self.kt.export_csv(TMP_TRACE_FILE)
+        with open(TMP_TRACE_FILE) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "id,digit,detected,fired,handled,latched")
+        self.assertRegex(lines[1], r"^\d+,5,[\d.]+,[\d.]+,,$")
@@ -0,0 +1,49 @@
+#! /usr/bin/env python3
+import unittest
+import keypad
+import interface_wrapper
+
+KEYS_4X4 = [
+    ["1", "2", "3", "A"],
+    ["4", "5", "6", "B"],
+    ["7", "8", "9", "C"],
+    ["*", "0", "#", "D"],
+]
+
+
+class KeypadLayoutTest(unittest.TestCase):
+    def test_default_layout(self):
+        kp = interface_wrapper.DEFAULT_KEYPAD
+        self.assertEqual(kp.rows, 4)
+        self.assertEqual(kp.data_bits, 3)
+        for out, states in interface_wrapper.DPOS_CONVERT.items():
+            self.assertEqual(list(kp.output_states[out]), states)
+        self.assertEqual(kp.outputs["buzzer"], interface_wrapper.DPOS_BUZZER)
+
+    def test_default_lookup(self):
+        kp = interface_wrapper.DEFAULT_KEYPAD
+        for r in range(4):
+            for c in range(3):
+                reading = 0b111 & ~(1 << c)
+                self.assertEqual(kp.key_at(r, reading), interface_wrapper.DIGIT_CONVERT[r][c])
+        self.assertIsNone(kp.key_at(0, 0b111))
+        # the first low column wins
+        self.assertEqual(kp.key_at(1, 0b000), "4")
+
+    def test_4x4(self):
+        kp = keypad.KeypadLayout(KEYS_4X4, outputs={"green": 4})
+        self.assertEqual(kp.data_bits, 4)
+        self.assertEqual(len(kp.output_states), 16)
+        self.assertEqual(kp.key_at(3, 0b0111), "D")
+        self.assertEqual(kp.row_states[2], (False, True, False, False))
+
+    def test_short_row(self):
+        kp = keypad.KeypadLayout([["1", "2"], ["3"]])
+        self.assertEqual(kp.key_at(1, 0b01), None)
+        self.assertEqual(kp.key_at(1, 0b10), "3")
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, keypad.KeypadLayout, KEYS_4X4, data_bits=3)
+        self.assertRaises(ValueError, keypad.KeypadLayout, KEYS_4X4, row_outputs=[0, 1])
+        self.assertRaises(ValueError, keypad.KeypadLayout,
+                          [["1", "2", "3"]], outputs={"green": 8}, data_bits=3)
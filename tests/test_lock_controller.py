@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+import unittest
+from .lib_test import *
+import sim_gpio
+import interface_wrapper
+import lock_controller
+import time
+
+LOCK_PINS = [
+    (sim_gpio.SIM_LINE_REG_CLK, sim_gpio.SIM_LINE_IO_SWITCH, sim_gpio.SIM_LINES_DATA),
+    (17, 27, [22, 23, 24]),
+]
+
+
+class LockControllerTest(SimGpio_Test, unittest.TestCase):
+    """
+    Runs two locks against two simulated circuits.
+    """
+
+    def setUp(self):
+        self.use_sim_gpio()
+        self.sims = [sim_gpio.reset(bounce_time=0.001)]
+        reg, io, data = LOCK_PINS[1]
+        self.sims.append(sim_gpio.add_circuit(reg=reg, io=io, data=data, bounce_time=0.001))
+        self.ctrl = lock_controller.LockController(Logger_Test())
+        self.digits = []
+        for i in range(len(LOCK_PINS)):
+            iface = self.ctrl.add_lock(*LOCK_PINS[i])
+            iface.digit_received.bind(lambda d, i=i: self.digits.append((i, d)))
+
+    def tearDown(self):
+        self.ctrl.cleanup()
+        for iface in self.ctrl.locks:
+            iface.cleanup()
+        sim_gpio.reset()
+        self.restore_gpio()
+
+    def test_separate_keypads(self):
+        self.sims[1].press("6")
+        for _ in range(interface_wrapper.DPOS_NDIGITS + 1):
+            self.ctrl.scan_cycle()
+        self.assertEqual(self.digits, [(1, "6")])
+        self.sims[0].press("0")
+        for _ in range(interface_wrapper.DPOS_NDIGITS + 1):
+            self.ctrl.scan_cycle()
+        self.assertEqual(self.digits, [(1, "6"), (0, "0")])
+
+    def test_separate_outputs(self):
+        self.ctrl.locks[0].flash_green_led()
+        self.ctrl.locks[1].beep_buzzer()
+        for _ in range(3):
+            self.ctrl.scan_cycle()
+        self.assertEqual(self.sims[0].pulses, {"green": 2, "red": 0, "buzzer": 0})
+        self.assertEqual(self.sims[1].pulses, {"green": 0, "red": 0, "buzzer": 2})
+
+    def test_settle_overlap(self):
+        self.ctrl.scan_cycle()
+        start = time.perf_counter()
+        self.ctrl.scan_cycle()
+        two = time.perf_counter() - start
+        single = self.ctrl.locks[:1]
+        self.ctrl.locks, others = single, self.ctrl.locks
+        start = time.perf_counter()
+        self.ctrl.scan_cycle()
+        one = time.perf_counter() - start
+        self.ctrl.locks = others
+        # the second lock's settle waits happen during the first's
+        self.assertLess(two, one * 1.5)
+
+    def test_cleanup(self):
+        self.ctrl.locks[0].cleanup()
+        self.assertEqual(self.sims[0]._directions, {})
+        self.assertEqual(set(self.sims[1]._directions), set(self.sims[1].pins))
+
+    def test_shared_scheduler(self):
+        for iface in self.ctrl.locks:
+            self.assertIs(iface.scheduler, self.ctrl.scheduler)
+        self.assertIsNot(self.ctrl.locks[0].gpio.settle, self.ctrl.locks[1].gpio.settle)
+
+    def test_overlapping_pins(self):
+        self.assertRaises(ValueError, self.ctrl.add_lock, 5, 6, [7, 8, sim_gpio.SIM_LINES_DATA[0]])
+
+    def test_no_edge_detect(self):
+        self.assertRaises(ValueError, self.ctrl.add_lock, 5, 6, [7, 8, 12], edge_detect=True)
@@ -0,0 +1,139 @@
+#! /usr/bin/env python3
+import unittest
+import gzip
+import io
+import os
+import clock
+import log_rotate
+
+TMP_ROTATE_FILE = "rotate.log"
+
+
+class RotatingFileTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = clock.VirtualClock(start=0)
+        self.file = None
+
+    def tearDown(self):
+        if self.file is not None:
+            self.file.close()
+        for name in os.listdir("."):
+            if name.startswith(TMP_ROTATE_FILE):
+                os.remove(name)
+
+    def open(self, **kwargs):
+        self.file = log_rotate.RotatingFile(TMP_ROTATE_FILE, clock=self.clock, **kwargs)
+        return self.file
+
+    def test_init(self):
+        f = self.open()
+        self.assertTrue(isinstance(f, io.IOBase))
+        self.assertEqual(f.keep, log_rotate.ROTATE_KEEP)
+        self.assertEqual(f.segments(), [])
+        f.write("line\n")
+        f.flush()
+        with open(TMP_ROTATE_FILE) as r:
+            self.assertEqual(r.read(), "line\n")
+
+    def test_max_size(self):
+        f = self.open(max_size=10)
+        f.write("12345\n")
+        self.assertEqual(f.rotations, 0)
+        f.write("67890\n")
+        self.assertEqual(f.rotations, 1)
+        f.write("new\n")
+        f.wait()
+        segments = f.segments()
+        self.assertEqual(len(segments), 1)
+        self.assertTrue(segments[0].endswith(".gz"))
+        with gzip.open(segments[0], "rt") as r:
+            self.assertEqual(r.read(), "12345\n67890\n")
+        f.flush()
+        with open(TMP_ROTATE_FILE) as r:
+            self.assertEqual(r.read(), "new\n")
+
+    def test_existing_size(self):
+        with open(TMP_ROTATE_FILE, "w") as w:
+            w.write("0123456789")
+        f = self.open(max_size=12)
+        f.write("ab")
+        self.assertEqual(f.rotations, 1)
+
+    def test_max_age(self):
+        f = self.open(max_age=60, compress=False)
+        f.write("first\n")
+        self.clock.advance(59)
+        f.write("second\n")
+        self.assertEqual(f.rotations, 0)
+        self.clock.advance(1)
+        f.write("third\n")
+        self.assertEqual(f.rotations, 1)
+        f.wait()
+        segments = f.segments()
+        self.assertEqual(len(segments), 1)
+        with open(segments[0]) as r:
+            self.assertEqual(r.read(), "first\nsecond\nthird\n")
+
+    def test_keep(self):
+        f = self.open(max_size=1, keep=3)
+        for i in range(6):
+            f.write("{}\n".format(i))  # all in the same second
+        self.assertEqual(f.rotations, 6)
+        f.wait()
+        segments = f.segments()
+        self.assertEqual(len(segments), 3)
+        contents = []
+        for path in segments:
+            with gzip.open(path, "rt") as r:
+                contents.append(r.read())
+        self.assertEqual(contents, ["3\n", "4\n", "5\n"])
+
+    def test_sequence(self):
+        f = self.open(max_size=1, keep=2)
+        f.write("a\n")
+        f.write("b\n")
+        f.close()
+        f = self.open(max_size=1, keep=2)
+        f.write("c\n")
+        f.wait()
+        segments = f.segments()
+        self.assertEqual([f._segment_number(p) for p in segments], [2, 3])
+        with gzip.open(segments[-1], "rt") as r:
+            self.assertEqual(r.read(), "c\n")
+
+    def test_age_from_file(self):
+        def started(line):
+            return float(line.split(",")[0])
+        with open(TMP_ROTATE_FILE, "w") as w:
+            w.write("{},first\n".format(self.clock.time() - 50))
+        f = self.open(max_age=60, compress=False, started=started)
+        self.clock.advance(9)
+        f.write("second\n")
+        self.assertEqual(f.rotations, 0)
+        self.clock.advance(1)
+        f.write("third\n")
+        self.assertEqual(f.rotations, 1)
+
+    def test_age_from_mtime(self):
+        with open(TMP_ROTATE_FILE, "w") as w:
+            w.write("first\n")
+        os.utime(TMP_ROTATE_FILE, (self.clock.time() - 100, self.clock.time() - 100))
+        f = self.open(max_age=60, compress=False, started=lambda line: None)
+        f.write("second\n")
+        self.assertEqual(f.rotations, 1)
+
+    def test_read(self):
+        f = self.open(mode="a+", max_size=100)
+        f.write("line\n")
+        f.flush()
+        f.seek(0)
+        self.assertEqual(f.read(), "line\n")
+
+    def test_close(self):
+        f = self.open(max_size=1)
+        f.write("a\n")
+        f.close()
+        self.assertTrue(f.closed)
+        self.assertEqual(len(f.segments()), 1)
+        self.assertTrue(f.segments()[0].endswith(".gz"))
+        self.assertRaises(ValueError, f.write, "b\n")
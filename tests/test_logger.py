@@ -3,6 +3,9 @@ import unittest
 import logger
 import io
 import datetime
+import os
+import signal
+import time
 
 TMP_LOG = "test.log"
 
@@ -187,6 +190,172 @@ class LoggerTest(unittest.TestCase):
         log.loge(ex)
         self.assertGreater(self.getlength(log), 0)
 
+    def test_disabled_methods(self):
+        log = self.get_logger()
+        log.trace_level = logger.INFO
+        self.assertIs(log.logt, logger._disabled)
+        self.assertIs(log.logd, logger._disabled)
+        self.assertIsNot(log.log, logger._disabled)
+        log.trace_level = logger.TRACE
+        self.assertIsNot(log.logt, logger._disabled)
+        log.logt("test {}", 1)
+        self.assertRegex(self.getcontents(log), "TRCE.*test 1\\n")
+
+    def test_lazy(self):
+        log = self.get_logger()
+        calls = []
+
+        def expensive(v):
+            calls.append(v)
+            return v * 2
+        log.logd("value {:>4}", logger.Lazy(expensive, 3))
+        self.assertEqual(calls, [])
+        log.log("value {:>4}", logger.Lazy(expensive, 3))
+        self.assertEqual(calls, [3])
+        self.assertRegex(self.getcontents(log), "value    6\\n")
+
+    def get_background_logger(self, **kwargs):
+        log = logger.Logger(TMP_LOG, background=True, **kwargs)
+        log._out_file.close()
+        log._out_file = io.StringIO()
+        return log
+
+    def test_background(self):
+        log = self.get_background_logger(flush_interval=10)
+        self.assertTrue(log.background)
+        log.log("test {}", 1)
+        log.logw("test2")
+        log.flush()
+        self.assertRegex(self.getcontents(log), "\\A\\[INFO\\].*test 1\\n\\[WARN\\].*test2\\n\\Z")
+        log.cleanup()
+        self.assertFalse(log.background)
+        self.assertRaises(ValueError, log.log, "test log")
+
+    def test_background_drain(self):
+        log = self.get_background_logger(flush_interval=10, flush_size=1000)
+        out = log._out_file
+        out.close = lambda: None
+        for i in range(100):
+            log.log("line {}", i)
+        log.cleanup()
+        self.assertEqual(len(out.getvalue().splitlines()), 100)
+
+    def test_background_flush_size(self):
+        log = self.get_background_logger(flush_interval=10, flush_size=4)
+        for i in range(4):
+            log.log("line {}", i)
+        for _ in range(100):
+            if len(log._queue) == 0:
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(log._queue), 0)
+        log.cleanup()
+
+    def test_overflow_block(self):
+        log = self.get_background_logger(queue_size=1, flush_size=1)
+        out = log._out_file
+        out.close = lambda: None
+        for i in range(50):
+            log.log("line {}", i)
+        log.cleanup()
+        self.assertEqual(log.dropped, 0)
+        self.assertEqual(out.getvalue().splitlines()[-1][-7:], "line 49")
+
+    def test_overflow_drop(self):
+        log = self.get_background_logger(
+            queue_size=2, overflow=logger.OVERFLOW_DROP, flush_size=100, flush_interval=10)
+        out = log._out_file
+        out.close = lambda: None
+        log.trace_level = logger.TRACE
+        log.logt("one")
+        log.log("two")
+        log.logw("three")
+        log.cleanup()
+        self.assertEqual(log.dropped, 1)
+        self.assertEqual(log.max_depth, 2)
+        self.assertRegex(out.getvalue(), "\\A\\[TRCE\\].*one\\n\\[INFO\\].*two\\n\\Z")
+
+    def test_overflow_drop_lowest(self):
+        log = self.get_background_logger(
+            queue_size=2, overflow=logger.OVERFLOW_DROP_LOWEST, flush_size=100,
+            flush_interval=10)
+        out = log._out_file
+        out.close = lambda: None
+        log.trace_level = logger.TRACE
+        log.logt("one")
+        log.log("two")
+        log.logw("three")
+        log.logw("four")
+        log.log("five")
+        log.cleanup()
+        self.assertEqual(log.dropped, 3)
+        self.assertRegex(out.getvalue(), "\\A\\[WARN\\].*three\\n\\[WARN\\].*four\\n\\Z")
+
+    def test_overflow_policy(self):
+        self.assertRaises(ValueError, logger.Logger, TMP_LOG, overflow="none")
+
+    def test_trace_buffer(self):
+        buf = logger.TraceBuffer(3)
+        self.assertEqual(len(buf), 0)
+        for i in range(5):
+            buf.record(logger.TRACE, "line {}", i)
+        self.assertEqual(len(buf), 3)
+        self.assertEqual([r[3] for r in buf.take()], [(2,), (3,), (4,)])
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.take(), [])
+
+    def test_dump_traces(self):
+        log = self.get_logger()
+        self.assertEqual(log.dump_traces(), 0)
+        log.trace_buffer = logger.TraceBuffer(8)
+        log.logt("trace {}", 1)
+        log.logd("debug {}", 2)
+        log.log("info")
+        self.assertRegex(self.getcontents(log), "\\A\\[INFO\\].*info\\n\\Z")
+        self.clearcontents(log)
+        self.assertEqual(log.dump_traces(), 2)
+        self.assertRegex(self.getcontents(log),
+                         "\\A\\[WARN\\].*trace buffer dump \\(on demand\\), 2 records:\\n"
+                         "\\[TRCE\\].*trace 1\\n\\[DBUG\\].*debug 2\\n\\Z")
+        self.assertEqual(log.dump_traces(), 0)
+        log.trace_buffer = None
+        self.assertIs(log.logt, logger._disabled)
+
+    def test_dump_on_error(self):
+        log = self.get_logger()
+        log.trace_buffer = logger.TraceBuffer(8)
+        log.logt("before")
+        log.loge(Exception("failed"))
+        self.assertRegex(self.getcontents(log),
+                         "\\A\\[WARN\\].*\\(error\\), 1 records:\\n\\[TRCE\\].*before\\n"
+                         "\\[CRIT\\].*\\nfailed\\n\\Z")
+
+    def test_dump_signal(self):
+        log = self.get_logger()
+        log.trace_buffer = logger.TraceBuffer(8)
+        old = signal.getsignal(signal.SIGUSR1)
+        try:
+            log.dump_signal()
+            log.logt("before")
+            os.kill(os.getpid(), signal.SIGUSR1)
+            for _ in range(100):
+                if self.getlength(log) > 0:
+                    break
+                time.sleep(0.01)
+            self.assertRegex(self.getcontents(log), "\\(signal\\), 1 records:\\n.*before\\n")
+        finally:
+            signal.signal(signal.SIGUSR1, old)
+
+    def test_rotation(self):
+        log = logger.Logger("rotated.log", rotation={"max_size": 40, "keep": 2})
+        try:
+            for i in range(5):
+                log.log("line {}", i)
+            self.assertGreater(log._out_file.rotations, 0)
+        finally:
+            log.cleanup()
+        self.assertEqual(len(log._out_file.segments()), 2)
+
     def test_cleanup(self):
         log = logger.Logger(TMP_LOG)
         log.cleanup()
@@ -0,0 +1,40 @@
+#! /usr/bin/env python3
+import unittest
+import output_queue
+
+
+class OutputQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.oq = output_queue.OutputQueue(1)
+
+    def slots(self, n):
+        return [self.oq.next_slot() for _ in range(n)]
+
+    def test_empty(self):
+        self.assertEqual(self.slots(3), [None, None, None])
+        self.assertEqual(self.oq.row_slots, 3)
+
+    def test_interleave(self):
+        self.oq.request(6, pulses=2)
+        self.assertEqual(self.slots(4), [6, None, 6, None])
+        self.assertEqual(len(self.oq), 0)
+
+    def test_budget(self):
+        self.oq = output_queue.OutputQueue(2)
+        self.oq.request(4, pulses=2)
+        self.oq.request(6, pulses=2)
+        self.assertEqual(self.slots(7), [4, 4, None, 6, 6, None, None])
+
+    def test_priority(self):
+        self.oq.request(6, output_queue.PRIORITY_NORMAL, 1)
+        self.oq.request(5, output_queue.PRIORITY_HIGH, 1)
+        self.oq.request(4, output_queue.PRIORITY_NORMAL, 1)
+        self.assertEqual(self.slots(6), [5, None, 6, None, 4, None])
+
+    def test_merge(self):
+        self.oq.request(6, output_queue.PRIORITY_LOW)
+        self.assertEqual(self.oq.next_slot(), 6)
+        self.oq.request(6, output_queue.PRIORITY_HIGH)
+        self.assertEqual(self.oq.pending(6), 2)
+        self.assertEqual(self.oq.merged, 1)
+        self.assertEqual(len(self.oq), 1)
@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+import unittest
+import scan_scheduler
+import time
+import clock
+
+
+class ScanSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.sch = scan_scheduler.ScanScheduler(100, 20, 0.1)
+
+    def test_init(self):
+        self.assertFalse(self.sch.idle)
+        self.assertEqual(self.sch.period, 0.01)
+        self.assertEqual(self.sch.cycles, 0)
+
+    def test_rate(self):
+        self.sch.start()
+        start = time.perf_counter()
+        for i in range(5):
+            self.sch.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        self.assertEqual(self.sch.cycles, 5)
+        self.assertGreaterEqual(self.sch.jitter_max, 0)
+
+    def test_overrun(self):
+        self.sch.start()
+        time.sleep(0.03)
+        self.sch.wait()
+        self.assertEqual(self.sch.overruns, 1)
+        start = time.perf_counter()
+        self.sch.wait()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.009)
+
+    def test_idle(self):
+        self.sch.start()
+        time.sleep(0.1)
+        self.assertTrue(self.sch.wait())
+        self.assertTrue(self.sch.idle)
+        self.assertEqual(self.sch.period, 0.05)
+        self.assertTrue(self.sch.activity())
+        self.assertFalse(self.sch.idle)
+        self.assertFalse(self.sch.activity())
+        start = time.perf_counter()
+        self.sch.wait()
+        self.assertLess(time.perf_counter() - start, 0.04)
+
+    def test_virtual_clock(self):
+        clk = clock.VirtualClock()
+        self.sch = scan_scheduler.ScanScheduler(100, 20, 0.1, clk)
+        self.sch.start()
+        start = time.perf_counter()
+        for i in range(5):
+            self.sch.wait()
+        self.assertLess(time.perf_counter() - start, 0.01)
+        self.assertAlmostEqual(clk.perf_counter(), 0.05)
+        self.assertEqual(self.sch.overruns, 0)
+        self.assertAlmostEqual(self.sch.jitter_max, 0)
@@ -0,0 +1,53 @@
+#! /usr/bin/env python3
+import unittest
+import scan_stats
+
+
+class HistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.h = scan_stats.Histogram()
+
+    def test_empty(self):
+        self.assertEqual(self.h.count, 0)
+        self.assertEqual(self.h.mean, 0)
+        self.assertEqual(self.h.percentile(50), 0)
+
+    def test_record(self):
+        for i in range(90):
+            self.h.record(0.0001)
+        for i in range(10):
+            self.h.record(0.010)
+        self.assertEqual(self.h.count, 100)
+        self.assertAlmostEqual(self.h.mean, 0.00109)
+        self.assertEqual(self.h.max, 0.010)
+        # 100us falls in the 128us bucket
+        self.assertEqual(self.h.percentile(50), 0.000128)
+        self.assertEqual(self.h.percentile(90), 0.000128)
+        self.assertEqual(self.h.percentile(99), 0.010)
+
+    def test_overflow(self):
+        self.h.record(1000)
+        self.assertEqual(self.h.percentile(100), 1000)
+
+
+class ScanStatsTest(unittest.TestCase):
+    def test_stats(self):
+        st = scan_stats.ScanStats()
+        st.record(scan_stats.PHASE_SAMPLE, 0.001)
+        st.cycle()
+        st.cycle()
+        res = st.stats()
+        self.assertEqual(res["cycles"], 2)
+        self.assertGreater(res["cycles_per_second"], 0)
+        self.assertEqual(set(res["phases"].keys()), set(scan_stats.PHASES))
+        self.assertEqual(res["phases"][scan_stats.PHASE_SAMPLE]["count"], 1)
+        self.assertIn(50, res["phases"][scan_stats.PHASE_SAMPLE]["percentiles"])
+        self.assertIn(scan_stats.PHASE_DISPATCH, st.summary())
+
+    def test_reset(self):
+        st = scan_stats.ScanStats()
+        st.record(scan_stats.PHASE_WRITE, 0.001)
+        st.cycle()
+        st.reset()
+        self.assertEqual(st.cycles, 0)
+        self.assertEqual(st.histograms[scan_stats.PHASE_WRITE].count, 0)
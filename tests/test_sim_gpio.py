@@ -0,0 +1,202 @@
+#! /usr/bin/env python3
+import unittest
+from .lib_test import *
+import clock
+import sim_gpio
+import gpio_wrapper
+import interface_wrapper
+import key_trace
+import keypad
+import scan_stats
+import time
+from scan_scheduler import ScanScheduler
+
+REG = sim_gpio.SIM_LINE_REG_CLK
+IO = sim_gpio.SIM_LINE_IO_SWITCH
+DATA = sim_gpio.SIM_LINES_DATA
+
+
+class SimCircuitTest(unittest.TestCase):
+    def setUp(self):
+        self.sim = sim_gpio.SimCircuit(
+            propagation_delay=0, switch_delay=0, bounce_time=0)
+        self.sim.setup(REG, sim_gpio.OUT)
+        self.sim.setup(IO, sim_gpio.OUT)
+
+    def latch(self, value):
+        self.sim.output(IO, True)
+        for i in range(len(DATA)):
+            self.sim.setup(DATA[i], sim_gpio.OUT)
+            self.sim.output(DATA[i], bool(value & (1 << i)))
+        self.sim.output(REG, True)
+        self.sim.output(REG, False)
+        for d in DATA:
+            self.sim.setup(d, sim_gpio.IN)
+        self.sim.output(IO, False)
+
+    def columns(self):
+        return [self.sim.input(d) for d in DATA]
+
+    def test_latch(self):
+        self.latch(3)
+        self.assertEqual(self.sim.latched_output(), 3)
+        self.assertEqual(self.sim.latch_count, 1)
+
+    def test_keypad(self):
+        self.sim.press("5")
+        self.latch(0)
+        self.assertEqual(self.columns(), [1, 1, 1])
+        self.latch(1)
+        self.assertEqual(self.columns(), [1, 0, 1])
+        self.sim.release()
+        self.assertEqual(self.columns(), [1, 1, 1])
+
+    def test_switch_disabled(self):
+        self.sim.press("1")
+        self.latch(0)
+        self.assertEqual(self.columns()[0], 0)
+        self.sim.output(IO, True)
+        self.assertEqual(self.columns()[0], 1)
+
+    def test_pulses(self):
+        self.latch(4)
+        self.latch(6)
+        self.latch(6)
+        self.assertEqual(self.sim.pulses,
+                         {"green": 1, "red": 0, "buzzer": 2})
+
+    def test_output_not_setup(self):
+        self.assertRaises(RuntimeError, self.sim.output, 20, True)
+
+    def test_propagation_delay(self):
+        self.sim.propagation_delay = 0.05
+        self.latch(2)
+        self.assertEqual(self.sim.latched_output(), 0)
+        time.sleep(0.06)
+        self.assertEqual(self.sim.latched_output(), 2)
+
+    def test_virtual_clock(self):
+        clk = clock.VirtualClock()
+        self.sim = sim_gpio.SimCircuit(
+            propagation_delay=0.05, switch_delay=0, bounce_time=0, clock=clk)
+        self.sim.setup(REG, sim_gpio.OUT)
+        self.sim.setup(IO, sim_gpio.OUT)
+        self.latch(2)
+        self.assertEqual(self.sim.latched_output(), 0)
+        clk.advance(0.05)
+        self.assertEqual(self.sim.latched_output(), 2)
+
+    def test_bounce(self):
+        self.sim = sim_gpio.SimCircuit(
+            propagation_delay=0, switch_delay=0, bounce_time=10, seed=1)
+        self.sim.setup(REG, sim_gpio.OUT)
+        self.sim.setup(IO, sim_gpio.OUT)
+        self.sim.press("1")
+        self.latch(0)
+        readings = set(self.sim.input(DATA[0]) for _ in range(50))
+        self.assertEqual(readings, {0, 1})
+
+    def test_edges(self):
+        edges = []
+        self.latch(0)
+        self.sim.add_event_detect(DATA[2], sim_gpio.FALLING, edges.append)
+        self.sim.press("3")
+        self.sim.release()
+        self.assertEqual(edges, [DATA[2]])
+
+
+class SimInterfaceTest(SimGpio_Test, unittest.TestCase):
+    """
+    Runs the real GpioWrapper and InterfaceWrapper against the simulator.
+    """
+
+    def setUp(self):
+        self.use_sim_gpio()
+        self.sim = sim_gpio.reset(bounce_time=0.001)
+        self.iface = interface_wrapper.InterfaceWrapper(Logger_Test())
+        self.digits = []
+        self.iface.digit_received.bind(self.digits.append)
+
+    def tearDown(self):
+        self.iface.cleanup()
+        self.restore_gpio()
+
+    def cycle(self):
+        self.iface._start_write()
+        self.iface._do_write_phase()
+        self.iface._start_read()
+        self.iface._do_read_phase()
+
+    def test_key_press(self):
+        self.sim.press("8")
+        for _ in range(interface_wrapper.DPOS_NDIGITS + 1):
+            self.cycle()
+        self.assertEqual(self.digits, ["8"])
+        self.sim.release()
+        for _ in range(2):
+            self.cycle()
+        self.assertFalse(self.iface._digit_down)
+
+    def test_key_trace(self):
+        self.iface.digit_received.bind(lambda d: self.iface.beep_buzzer())
+        self.sim.press("1")
+        for _ in range(interface_wrapper.DPOS_NDIGITS + 2):
+            self.cycle()
+        trace = self.iface.tracer.traces()[0]
+        self.assertEqual(trace.digit, "1")
+        self.assertEqual(set(trace.times.keys()), set(key_trace.STAGES))
+        self.assertGreater(trace.latency(key_trace.STAGE_LATCHED),
+                           trace.latency(key_trace.STAGE_HANDLED))
+        # detected once sampled, so the settle wait before it isn't counted
+        self.assertLess(trace.latency(key_trace.STAGE_FIRED), gpio_wrapper.HARDWARE_WAIT)
+
+    def test_phase_settle(self):
+        for _ in range(3):
+            self.cycle()
+        histograms = self.iface.stats.histograms
+        # the settle waits are taken out of the phases they happen in
+        self.assertGreaterEqual(histograms[scan_stats.PHASE_SETTLE].max,
+                                gpio_wrapper.HARDWARE_WAIT / 2)
+        for phase in (scan_stats.PHASE_REGISTER, scan_stats.PHASE_SAMPLE):
+            self.assertLess(histograms[phase].max, gpio_wrapper.HARDWARE_WAIT)
+
+    def test_buzzer(self):
+        self.iface.beep_buzzer()
+        for _ in range(3):
+            self.cycle()
+        self.assertEqual(self.sim.pulses["buzzer"], 2)
+        self.assertEqual(self.sim.latch_count, 3)
+
+    def test_virtual_clock(self):
+        # the clock is only moved on by the settle waits and the debounce samples,
+        # and the simulated delays and bounce are all timed on it
+        clk = clock.VirtualClock()
+        self.iface.cleanup()
+        self.sim = sim_gpio.reset(clock=clk)
+        self.iface = interface_wrapper.InterfaceWrapper(
+            Logger_Test(), settle_tracker=gpio_wrapper.SettleTracker(clock=clk),
+            scheduler=ScanScheduler(clock=clk))
+        self.iface.digit_received.bind(self.digits.append)
+        self.sim.press("8")
+        for _ in range(interface_wrapper.DPOS_NDIGITS + 1):
+            self.iface.scan_cycle()
+        self.assertEqual(self.digits, ["8"])
+        self.assertGreater(clk.monotonic(), 0)
+
+    def test_4x4_keypad(self):
+        keys = [["1", "2", "3", "A"], ["4", "5", "6", "B"],
+                ["7", "8", "9", "C"], ["*", "0", "#", "D"]]
+        data = DATA + [8]
+        self.iface.cleanup()
+        self.sim = sim_gpio.reset(bounce_time=0.001, data=data, keypad=keys)
+        self.iface = interface_wrapper.InterfaceWrapper(
+            Logger_Test(), keypad=keypad.KeypadLayout(keys), data_pins=data)
+        self.iface.digit_received.bind(self.digits.append)
+        self.sim.press("C")
+        for _ in range(5):
+            self.cycle()
+        self.assertEqual(self.digits, ["C"])
+
+    def test_keypad_data_lines(self):
+        self.assertRaises(ValueError, interface_wrapper.InterfaceWrapper, Logger_Test(),
+                          keypad=keypad.KeypadLayout([["1"]], data_bits=4))
@@ -1,6 +1,8 @@
 #! /usr/bin/env python3
 import unittest
 import timeout
+import timer_wheel
+import clock
 import threading
 import time
 
@@ -13,7 +15,7 @@ class TimeoutTest(unittest.TestCase):
         self.tm.cleanup()
 
     def test_init(self):
-        self.assertTrue(isinstance(self.tm._timer, threading.Timer))
+        self.assertTrue(isinstance(self.tm._timer, timer_wheel.WheelTimer))
         self.assertEqual(self.tm._timer.interval, 1)
     
     def test_start(self):
@@ -29,12 +31,25 @@ class TimeoutTest(unittest.TestCase):
         self.fired = True
 
     def test_fired(self):
+        clk = clock.VirtualClock()
+        self.tm = timeout.Timeout(1, clock=clk)
         self.fired = False
         self.tm.elapsed.bind(self.fired_tester_func)
         self.tm.start()
-        time.sleep(0.9)
+        clk.advance(0.9)
         self.assertFalse(self.fired)
-        time.sleep(0.11)
+        clk.advance(0.11)
+        self.assertTrue(self.fired)
+        self.assertFalse(self.tm.active)
+
+    def test_fired_real(self):
+        self.tm = timeout.Timeout(0.05)
+        self.fired = False
+        self.tm.elapsed.bind(self.fired_tester_func)
+        self.tm.start()
+        time.sleep(0.04)
+        self.assertFalse(self.fired)
+        time.sleep(0.03)
         self.assertTrue(self.fired)
     
     def test_reset(self):
@@ -59,3 +74,111 @@ class TimeoutTest(unittest.TestCase):
         self.tm.cleanup()
         time.sleep(0.001)
         self.assertFalse(self.tm.active)
+
+    def test_thread_scheduler(self):
+        tm = timeout.Timeout(0.01, timeout.ThreadTimerScheduler())
+        self.assertTrue(isinstance(tm._timer, threading.Timer))
+        tm.start()
+        self.assertTrue(tm.active)
+        tm.cleanup()
+
+
+class ProgressTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.tm = timeout.ProgressTimeout(0.1, [0.5, 0.25, 1])
+        self.points = []
+        self.fired = []
+        self.tm.progress.bind(lambda p: self.points.append((p, time.monotonic())))
+        self.tm.elapsed.bind(lambda: self.fired.append(time.monotonic()))
+
+    def tearDown(self):
+        self.tm.cleanup()
+
+    def test_points(self):
+        self.assertEqual(self.tm.points, [0.25, 0.5])
+        start = time.monotonic()
+        self.tm.start()
+        time.sleep(0.15)
+        self.assertEqual([p[0] for p in self.points], [0.25, 0.5])
+        self.assertGreaterEqual(self.points[0][1] - start, 0.025)
+        self.assertGreaterEqual(self.points[1][1] - start, 0.05)
+        self.assertEqual(len(self.fired), 1)
+        self.assertGreaterEqual(self.fired[0] - start, 0.1)
+
+    def test_restart(self):
+        self.tm.start()
+        time.sleep(0.035)
+        self.tm.restart()
+        time.sleep(0.035)
+        self.assertEqual([p[0] for p in self.points], [0.25, 0.25])
+        self.tm.reset()
+        time.sleep(0.1)
+        self.assertEqual(len(self.points), 2)
+        self.assertEqual(self.fired, [])
+
+
+class PeriodicTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.tm = timeout.PeriodicTimeout(0.02, 5)
+        self.ticks = []
+        self.tm.elapsed.bind(lambda: self.ticks.append((self.tm.ticks, time.monotonic())))
+
+    def tearDown(self):
+        self.tm.cleanup()
+
+    def test_ticks(self):
+        start = time.monotonic()
+        self.tm.start()
+        time.sleep(0.05)
+        self.assertTrue(self.tm.active)
+        time.sleep(0.08)
+        self.assertEqual([t[0] for t in self.ticks], [1, 2, 3, 4, 5])
+        self.assertFalse(self.tm.active)
+        for n, at in self.ticks:
+            self.assertGreaterEqual(at - start, n * 0.02)
+        self.assertEqual(self.tm.missed, 0)
+
+    def test_no_drift(self):
+        # handlers that take most of a period don't push the later ticks back
+        self.tm.elapsed.bind(lambda: time.sleep(0.015))
+        start = time.monotonic()
+        self.tm.start()
+        time.sleep(0.15)
+        self.assertEqual(len(self.ticks), 5)
+        self.assertLess(self.ticks[-1][1] - start, 0.1 + 0.015)
+
+    def test_missed(self):
+        self.tm.elapsed.bind(lambda: time.sleep(0.05) if self.tm.ticks == 1 else None)
+        self.tm.start()
+        time.sleep(0.15)
+        self.assertEqual(self.ticks[-1][0], 5)
+        self.assertGreater(self.tm.missed, 0)
+        self.assertEqual(len(self.ticks) + self.tm.missed, 5)
+
+    def test_duration(self):
+        self.tm = timeout.PeriodicTimeout(0.02, duration=0.06)
+        self.tm.elapsed.bind(lambda: self.ticks.append((self.tm.ticks, time.monotonic())))
+        self.assertEqual(self.tm.last_tick, 3)
+        self.tm.start()
+        self.assertGreater(self.tm.time_left, 0.05)
+        time.sleep(0.1)
+        self.assertEqual([t[0] for t in self.ticks], [1, 2, 3])
+        self.assertEqual(self.tm.time_left, 0)
+
+    def test_reset(self):
+        self.tm.start()
+        time.sleep(0.03)
+        self.tm.reset()
+        time.sleep(0.05)
+        self.assertEqual(len(self.ticks), 1)
+        self.assertFalse(self.tm.active)
+
+    def test_virtual_clock(self):
+        clk = clock.VirtualClock()
+        self.tm = timeout.PeriodicTimeout(1, 60, clock=clk)
+        self.tm.elapsed.bind(lambda: self.ticks.append((self.tm.ticks, clk.monotonic())))
+        self.tm.start()
+        clk.advance(3600)
+        self.assertEqual([t[0] for t in self.ticks], list(range(1, 61)))
+        self.assertEqual([t[1] for t in self.ticks], [float(i) for i in range(1, 61)])
+        self.assertEqual(self.tm.missed, 0)
@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+import unittest
+import timer_wheel
+import threading
+import time
+
+
+class TimerWheelTest(unittest.TestCase):
+    def setUp(self):
+        self.wheel = timer_wheel.TimerWheel(0.005, 8)
+        self.fired = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.wheel.stop()
+
+    def timer(self, length, name):
+        def fire():
+            with self.lock:
+                self.fired.append((name, time.monotonic()))
+        return self.wheel.timer(length, fire)
+
+    def test_order(self):
+        start = time.monotonic()
+        for length, name in ((0.03, "b"), (0.01, "a"), (0.05, "c")):
+            self.timer(length, name).start()
+        self.assertEqual(len(self.wheel), 3)
+        time.sleep(0.08)
+        self.assertEqual([f[0] for f in self.fired], ["a", "b", "c"])
+        self.assertGreaterEqual(self.fired[0][1] - start, 0.01)
+        self.assertEqual(len(self.wheel), 0)
+        self.assertEqual(self.wheel.fired, 3)
+
+    def test_rounds(self):
+        # longer than a full turn of the wheel (0.04s)
+        start = time.monotonic()
+        t = self.timer(0.1, "a")
+        t.start()
+        time.sleep(0.07)
+        self.assertTrue(t.is_alive())
+        self.assertEqual(self.fired, [])
+        time.sleep(0.06)
+        self.assertEqual(len(self.fired), 1)
+        self.assertGreaterEqual(self.fired[0][1] - start, 0.1)
+        self.assertFalse(t.is_alive())
+
+    def test_cancel(self):
+        t = self.timer(0.01, "a")
+        t.start()
+        t.cancel()
+        self.assertFalse(t.is_alive())
+        self.assertEqual(len(self.wheel), 0)
+        time.sleep(0.03)
+        self.assertEqual(self.fired, [])
+        self.assertEqual(self.wheel.cancelled, 1)
+
+    def test_cancel_before_start(self):
+        t = self.timer(0.01, "a")
+        t.cancel()
+        t.start()
+        self.assertFalse(t.is_alive())
+
+    def test_start_twice(self):
+        t = self.timer(0.01, "a")
+        t.start()
+        self.assertRaises(RuntimeError, t.start)
+
+    def test_rearm_from_callback(self):
+        def fire():
+            self.fired.append(time.monotonic())
+            if len(self.fired) < 3:
+                self.wheel.timer(0.01, fire).start()
+        self.wheel.timer(0.01, fire).start()
+        time.sleep(0.06)
+        self.assertEqual(len(self.fired), 3)
+
+    def test_single_thread(self):
+        threads = set()
+        for i in range(20):
+            self.wheel.timer(0.005 * (i % 4 + 1),
+                             lambda: threads.add(threading.current_thread())).start()
+        time.sleep(0.05)
+        self.assertEqual(len(threads), 1)